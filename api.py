@@ -1,13 +1,19 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
-from sqlalchemy.orm import joinedload
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload, selectinload
+import json
+import threading
 import uvicorn
 
-from database.models import DatabaseManager, Category, Post, Attachment, ScrapeLog
+from database.models import DatabaseManager, Category, Post, PostCategory, Attachment, AttachmentText, ScrapeLog
 from config.config import API_CONFIG, DATABASE_URL
+from scraper.entities import lookup_recalls
+from scraper.inventory import RecallInventoryIndex, read_inventory
 
 # Pydantic models for API responses
 class AttachmentResponse(BaseModel):
@@ -15,6 +21,9 @@ class AttachmentResponse(BaseModel):
     file_url: str
     file_name: Optional[str]
     file_type: Optional[str]
+    file_size: Optional[int] = None
+    content_type: Optional[str] = None
+    last_modified: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -29,6 +38,7 @@ class PostResponse(BaseModel):
     tags: Optional[str]
     category_id: Optional[int]
     category_name: Optional[str]
+    category_ids: List[int] = []  # Every category listing the post
     attachments: List[AttachmentResponse] = []
     scraped_at: datetime
     
@@ -47,6 +57,25 @@ class CategoryResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ScrapeLogCategoryResponse(BaseModel):
+    scope: str  # Category slug, or a stage such as 'feed-discovery'
+    status: Optional[str]
+    error: Optional[str] = None
+    posts_scraped: int = 0
+    posts_new: int = 0
+    posts_updated: int = 0
+    duration_ms: Optional[int]
+    requests: int = 0
+    bytes_fetched: int = 0
+    fetch_ms: int = 0
+    parse_ms: int = 0
+    db_ms: int = 0
+    retries: int = 0
+    fetch_errors: int = 0
+    status_counts: Dict[str, int] = {}
+    latency_histogram: Dict[str, int] = {}
+    pipeline_stats: Dict[str, Dict[str, float]] = {}  # Stage -> items, busy/blocked ms, queue depths
+
 class ScrapeLogResponse(BaseModel):
     id: int
     start_time: datetime
@@ -56,10 +85,18 @@ class ScrapeLogResponse(BaseModel):
     posts_new: int
     posts_updated: int
     duration_seconds: Optional[int]
+    categories: List[ScrapeLogCategoryResponse] = []  # Per-category metrics of the run
     
     class Config:
         from_attributes = True
 
+class RecallMatchResponse(BaseModel):
+    post_id: int
+    title: str
+    url: str
+    publish_date: Optional[datetime]
+    entities: Dict[str, List[str]]  # Products, lots, expiry dates and MAHs of the recall
+
 # Initialize FastAPI app
 app = FastAPI(
     title="EOF Scraper API",
@@ -79,6 +116,24 @@ app.add_middleware(
 # Initialize database
 db_manager = DatabaseManager(DATABASE_URL)
 
+def in_category(session, category_id):
+    """Filter for posts listed in a category, whether first found there or not"""
+    return or_(
+        Post.category_id == category_id,
+        Post.id.in_(session.query(PostCategory.post_id).filter(PostCategory.category_id == category_id))
+    )
+
+# Recalled lots and products for inventory checks, rebuilt when the recall index changes
+_inventory_index = None
+_inventory_index_lock = threading.Lock()
+
+def get_inventory_index(session):
+    global _inventory_index
+    with _inventory_index_lock:
+        if _inventory_index is None or not _inventory_index.is_current(session):
+            _inventory_index = RecallInventoryIndex.load(session)
+        return _inventory_index
+
 @app.get("/")
 def read_root():
     return {
@@ -114,7 +169,7 @@ def get_categories(
             }
             
             if include_counts:
-                cat_dict["post_count"] = session.query(Post).filter(Post.category_id == cat.id).count()
+                cat_dict["post_count"] = session.query(Post).filter(in_category(session, cat.id)).count()
             
             response.append(CategoryResponse(**cat_dict))
         
@@ -154,17 +209,22 @@ def get_posts(
     """Get posts with pagination and filtering"""
     session = db_manager.get_session()
     try:
-        query = session.query(Post).options(joinedload(Post.attachments), joinedload(Post.category))
+        query = session.query(Post).options(
+            joinedload(Post.attachments), joinedload(Post.category), selectinload(Post.categories)
+        )
         
         # Apply filters
         if category_id:
-            query = query.filter(Post.category_id == category_id)
+            query = query.filter(in_category(session, category_id))
         
         if search:
             search_term = f"%{search}%"
             query = query.filter(
                 (Post.title.ilike(search_term)) |
-                (Post.content.ilike(search_term))
+                (Post.content.ilike(search_term)) |
+                (Post.id.in_(
+                    session.query(AttachmentText.post_id).filter(AttachmentText.text.ilike(search_term))
+                ))
             )
         
         # Apply sorting
@@ -190,13 +250,17 @@ def get_posts(
                 "tags": post.tags,
                 "category_id": post.category_id,
                 "category_name": post.category.name if post.category else None,
+                "category_ids": [category.id for category in post.categories],
                 "scraped_at": post.scraped_at,
                 "attachments": [
                     AttachmentResponse(
                         id=att.id,
                         file_url=att.file_url,
                         file_name=att.file_name,
-                        file_type=att.file_type
+                        file_type=att.file_type,
+                        file_size=att.file_size,
+                        content_type=att.content_type,
+                        last_modified=att.file_last_modified
                     ) for att in post.attachments
                 ]
             }
@@ -213,7 +277,8 @@ def get_post(post_id: int):
     try:
         post = session.query(Post).options(
             joinedload(Post.attachments),
-            joinedload(Post.category)
+            joinedload(Post.category),
+            selectinload(Post.categories)
         ).filter(Post.id == post_id).first()
         
         if not post:
@@ -229,13 +294,17 @@ def get_post(post_id: int):
             tags=post.tags,
             category_id=post.category_id,
             category_name=post.category.name if post.category else None,
+            category_ids=[category.id for category in post.categories],
             scraped_at=post.scraped_at,
             attachments=[
                 AttachmentResponse(
                     id=att.id,
                     file_url=att.file_url,
                     file_name=att.file_name,
-                    file_type=att.file_type
+                    file_type=att.file_type,
+                    file_size=att.file_size,
+                    content_type=att.content_type,
+                    last_modified=att.file_last_modified
                 ) for att in post.attachments
             ]
         )
@@ -250,12 +319,16 @@ def get_recent_posts(limit: int = Query(10, ge=1, le=50)):
 @app.get("/scrape-logs", response_model=List[ScrapeLogResponse])
 def get_scrape_logs(
     status: Optional[str] = None,
-    limit: int = Query(20, ge=1, le=100)
+    limit: int = Query(20, ge=1, le=100),
+    include_metrics: bool = True
 ):
-    """Get scrape logs"""
+    """Get scrape logs, with the per-category metrics of each run unless
+    include_metrics is false"""
     session = db_manager.get_session()
     try:
         query = session.query(ScrapeLog)
+        if include_metrics:
+            query = query.options(selectinload(ScrapeLog.categories))
         
         if status:
             query = query.filter(ScrapeLog.status == status)
@@ -271,12 +344,88 @@ def get_scrape_logs(
                 posts_scraped=log.posts_scraped,
                 posts_new=log.posts_new,
                 posts_updated=log.posts_updated,
-                duration_seconds=log.duration_seconds
+                duration_seconds=log.duration_seconds,
+                categories=[
+                    ScrapeLogCategoryResponse(
+                        scope=entry.scope,
+                        status=entry.status,
+                        error=entry.error,
+                        posts_scraped=entry.posts_scraped or 0,
+                        posts_new=entry.posts_new or 0,
+                        posts_updated=entry.posts_updated or 0,
+                        duration_ms=entry.duration_ms,
+                        requests=entry.requests or 0,
+                        bytes_fetched=entry.bytes_fetched or 0,
+                        fetch_ms=entry.fetch_ms or 0,
+                        parse_ms=entry.parse_ms or 0,
+                        db_ms=entry.db_ms or 0,
+                        retries=entry.retries or 0,
+                        fetch_errors=entry.fetch_errors or 0,
+                        status_counts=json.loads(entry.status_counts or '{}'),
+                        latency_histogram=json.loads(entry.latency_histogram or '{}'),
+                        pipeline_stats=json.loads(entry.pipeline_stats or '{}')
+                    ) for entry in log.categories
+                ] if include_metrics else []
             ) for log in logs
         ]
     finally:
         session.close()
 
+@app.get("/recalls/lookup", response_model=List[RecallMatchResponse])
+def lookup_recall(
+    lot: Optional[str] = None,
+    product: Optional[str] = None,
+    mah: Optional[str] = None,
+    expiry: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200)
+):
+    """Recalls matching all given entities exactly, ignoring case, accents
+    and punctuation in lot numbers. Expiry is matched by month (YYYY-MM, MM/YYYY
+    or a full date)."""
+    if not any([lot, product, mah, expiry]):
+        raise HTTPException(status_code=400, detail="Give at least one of lot, product, mah or expiry")
+    session = db_manager.get_session()
+    try:
+        return [
+            RecallMatchResponse(**match)
+            for match in lookup_recalls(session, product=product, lot=lot, expiry=expiry, mah=mah, limit=limit)
+        ]
+    finally:
+        session.close()
+
+@app.post("/recalls/inventory-check")
+def check_inventory(file: UploadFile = File(...)):
+    """Check an inventory against recalls.
+
+    Upload a CSV (product and lot columns, ',' ';' or tab separated) or an
+    NDJSON file (.ndjson/.jsonl, objects with product and lot keys). Matches
+    are streamed back as NDJSON, one object per matching recall of a line,
+    followed by a summary object."""
+    ndjson = (file.filename or '').lower().endswith(('.ndjson', '.jsonl')) or 'ndjson' in (file.content_type or '')
+    session = db_manager.get_session()
+    try:
+        index = get_inventory_index(session)
+    finally:
+        session.close()
+
+    def results():
+        lines = matches = 0
+        buffer = []
+        for number, product, lot in read_inventory(file.file, ndjson):
+            lines += 1
+            for match_type, post in index.match(product, lot):
+                matches += 1
+                buffer.append(json.dumps(
+                    dict(post, line=number, product=product, lot=lot, match=match_type), ensure_ascii=False
+                ) + '\n')
+            if len(buffer) >= 100:
+                yield ''.join(buffer)
+                buffer = []
+        buffer.append(json.dumps({'summary': {'lines': lines, 'matches': matches}}) + '\n')
+        yield ''.join(buffer)
+
+    return StreamingResponse(results(), media_type='application/x-ndjson')
+
 @app.get("/stats")
 def get_stats():
     """Get overall statistics"""
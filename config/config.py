@@ -24,16 +24,68 @@ DATABASE_URL = DATABASE_CONFIG[DATABASE_TYPE]['url']
 # Scraper configuration
 SCRAPER_CONFIG = {
     'base_url': 'https://www.eof.gr',
-    'max_pages_per_category': 10,  # Limit pages to scrape per category
+    'max_pages_per_category': 10,  # listing pages walked after the first one per category, 0 = all
     'request_timeout': 30,
-    'retry_attempts': 3,
-    'delay_between_requests': 1,  # seconds
+    'retry_attempts': 3,  # attempts per failed post/category within a run, see scraper/retry_queue.py
+    'retry_backoff_seconds': 4,  # wait before the first retry, doubled for each further one
+    'failed_fetch_max_attempts': 10,  # attempts over all runs before a failing post is given up
+    # Seconds between request starts to the same host; lower it (e.g.
+    # SCRAPER_REQUEST_DELAY=0.1) only when the site is known to allow it
+    'delay_between_requests': float(os.getenv('SCRAPER_REQUEST_DELAY', '1')),
+    'max_concurrency_per_host': 4,  # parallel requests per host
+    # Categories scraped in parallel by run_full_scrape, each worker with its
+    # own HTTP and DB session. The per-host delay and concurrency above and
+    # max_requests_per_second apply to all workers together.
+    'category_workers': 4,
+    'max_requests_per_second': 20,  # 0 = no cap
+    'parser_backend': 'lxml',  # 'lxml' (fast) or 'bs4', see scraper/parsing.py
+    'commit_chunk_size': 50,  # posts written and committed per transaction, keeps SQLite write locks short
+    # Threads of the fetch and parse stages of the post pipeline, see
+    # scraper/pipeline.py (None = max_concurrency_per_host for fetch and
+    # parse_workers, or 1, for parse), and the size of the bounded queue in
+    # front of each stage, which bounds the pages held in memory
+    'pipeline_workers': {'fetch': None, 'parse': None},
+    'pipeline_queue_size': 50,
+    # Lease that keeps scrape runs from overlapping, see scraper/lease.py.
+    # Renewed every lease_heartbeat_seconds; a crashed run's lease can be
+    # taken over after lease_ttl_seconds.
+    'lease_ttl_seconds': 300,
+    'lease_heartbeat_seconds': 60,
+    'discovery': 'feed',  # 'feed' (WordPress REST API, falls back to crawling) or 'crawl'
+    # Worker processes for HTML parsing, 0 = parse in the scraper process.
+    # Workers are spawned; scrape_all_categories.py and the --parse-workers
+    # option of scripts/run_scraper.py and scripts/benchmark_scraper.py create
+    # the scraper under their `if __name__ == '__main__'` guard.
+    'parse_workers': 0,
+    # Attachments are HEAD-probed and their PDF text extracted by a background
+    # job of the scheduler every attachment_job_minutes, outside the scrape
+    'attachment_probe_limit': 500,  # attachment URLs HEAD-probed per job run, 0 = off
+    'attachment_text_limit': 200,  # PDFs downloaded for text extraction per job run, 0 = off
+    'attachment_text_workers': 2,  # text extraction processes, spawned by the attachment job only
+    'recall_index_limit': 2000,  # recall posts (re)indexed for entity lookups after each scrape, 0 = off
+    # Compressed archive of every fetched page for offline re-parsing
+    # (scripts/reparse_archive.py). Off unless a directory is set, preferably
+    # outside the code tree, e.g. HTML_ARCHIVE_DIR=/var/lib/drugalert/html_archive.
+    # Pruned once a day to html_archive_max_age_days (the latest copy of each
+    # page is kept) and then to html_archive_max_mb; 0 = no limit.
+    'html_archive_dir': os.getenv('HTML_ARCHIVE_DIR', ''),
+    'html_archive_max_age_days': 90,
+    'html_archive_max_mb': 2048,
     'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
 
 # Scheduler configuration
 SCHEDULER_CONFIG = {
     'interval_minutes': 15,
+    # Poll each category on an interval learned from its publication rate
+    # instead of everything every interval_minutes, see scraper/polling.py
+    'adaptive_polling': True,
+    'min_poll_minutes': 5,
+    'max_poll_minutes': 360,
+    'poll_fraction': 0.01,  # poll interval as a fraction of the learned time between posts
+    'poll_history': 20,  # latest posts used to learn a category's publication rate
+    'recall_watch_seconds': 60,  # first-page checks of the recall subcategories, 0 = off
+    'attachment_job_minutes': 30,  # attachment probing and PDF text extraction, 0 = off
     'run_on_startup': True,
     'max_log_size_mb': 10,
     'log_backup_count': 5
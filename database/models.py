@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index, text
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index, UniqueConstraint, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 from datetime import datetime
@@ -44,9 +44,11 @@ class Post(Base):
     scraped_at = Column(DateTime, default=datetime.utcnow)
     last_modified = Column(DateTime, default=datetime.utcnow)
     category_type = Column(String(50), nullable=True)  # farmaka, ktiniatrika, kallintika, etc.
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the scraped content, see scraper/fingerprint.py
     
     # Relationships
-    category = relationship("Category", back_populates="posts")
+    category = relationship("Category", back_populates="posts")  # Category the post was first found in
+    categories = relationship("Category", secondary="post_categories", viewonly=True)  # Every category listing it
     attachments = relationship("Attachment", back_populates="post", cascade="all, delete-orphan")
     
     __table_args__ = (
@@ -56,6 +58,17 @@ class Post(Base):
         Index('idx_post_active', 'is_active'),
     )
 
+class PostCategory(Base):
+    __tablename__ = 'post_categories'
+    
+    post_id = Column(Integer, ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
+    category_id = Column(Integer, ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('idx_post_category_category', 'category_id'),
+    )
+
 class Attachment(Base):
     __tablename__ = 'attachments'
     
@@ -65,6 +78,12 @@ class Attachment(Base):
     file_name = Column(String(255))
     file_type = Column(String(50))
     file_size = Column(Integer)
+    # Filled in by the HEAD probe, see scraper/attachments.py
+    content_type = Column(String(100))
+    file_last_modified = Column(DateTime)
+    etag = Column(String(255))
+    probe_status = Column(Integer)  # HTTP status of the last probe, e.g. 404 once the file is gone
+    probed_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -72,8 +91,53 @@ class Attachment(Base):
     
     __table_args__ = (
         Index('idx_attachment_post', 'post_id'),
+        Index('idx_attachment_file_url', 'file_url'),
+        UniqueConstraint('post_id', 'file_url', name='uq_attachment_post_file'),
+    )
+
+class AttachmentText(Base):
+    __tablename__ = 'attachment_texts'
+    
+    id = Column(Integer, primary_key=True)
+    attachment_id = Column(Integer, ForeignKey('attachments.id', ondelete='CASCADE'), unique=True, nullable=False)
+    post_id = Column(Integer, ForeignKey('posts.id', ondelete='CASCADE'), nullable=False)
+    file_url = Column(String(500), nullable=False)
+    etag = Column(String(255))  # ETag and size of the downloaded file, to skip unchanged files
+    file_size = Column(Integer)
+    content_sha256 = Column(String(64))
+    page_count = Column(Integer)
+    text = Column(Text)
+    error = Column(Text)  # Why no text could be extracted, e.g. a corrupt PDF
+    extracted_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('idx_attachment_text_post', 'post_id'),
+        Index('idx_attachment_text_url', 'file_url'),
     )
 
+class RecallEntity(Base):
+    __tablename__ = 'recall_entities'
+
+    id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, ForeignKey('posts.id', ondelete='CASCADE'), nullable=False)
+    entity_type = Column(String(20), nullable=False)  # 'product', 'lot', 'expiry' or 'mah'
+    value = Column(String(255), nullable=False)  # As written in the post
+    normalized = Column(String(255), nullable=False)  # Lookup key, see scraper/entities.py
+    source = Column(String(20))  # 'post' or 'attachment'
+
+    __table_args__ = (
+        Index('idx_recall_entity_lookup', 'entity_type', 'normalized'),
+        Index('idx_recall_entity_post', 'post_id'),
+    )
+
+class RecallIndexState(Base):
+    __tablename__ = 'recall_index_state'
+
+    id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, ForeignKey('posts.id', ondelete='CASCADE'), unique=True, nullable=False)
+    fingerprint = Column(String(64))  # Hash of the post and attachment texts the entities came from
+    indexed_at = Column(DateTime, default=datetime.utcnow)
+
 class ScrapeLog(Base):
     __tablename__ = 'scrape_logs'
     
@@ -87,11 +151,103 @@ class ScrapeLog(Base):
     errors = Column(Text)
     duration_seconds = Column(Integer)
     
+    # Relationships
+    categories = relationship("ScrapeLogCategory", back_populates="scrape_log", cascade="all, delete-orphan",
+                              order_by="ScrapeLogCategory.id")
+    
     __table_args__ = (
         Index('idx_scrape_log_start', 'start_time'),
         Index('idx_scrape_log_status', 'status'),
     )
 
+class ScrapeLogCategory(Base):
+    __tablename__ = 'scrape_log_categories'
+    
+    id = Column(Integer, primary_key=True)
+    scrape_log_id = Column(Integer, ForeignKey('scrape_logs.id', ondelete='CASCADE'), nullable=False)
+    scope = Column(String(255), nullable=False)  # Category slug, or a stage such as 'feed-discovery'
+    status = Column(String(50))  # success, failed
+    error = Column(Text)
+    posts_scraped = Column(Integer, default=0)
+    posts_new = Column(Integer, default=0)
+    posts_updated = Column(Integer, default=0)
+    duration_ms = Column(Integer)
+    # Request metrics, see scraper/metrics.py
+    requests = Column(Integer, default=0)
+    bytes_fetched = Column(Integer, default=0)
+    fetch_ms = Column(Integer, default=0)  # Summed over requests
+    parse_ms = Column(Integer, default=0)
+    db_ms = Column(Integer, default=0)
+    retries = Column(Integer, default=0)
+    fetch_errors = Column(Integer, default=0)
+    status_counts = Column(Text)  # JSON: HTTP status -> count
+    latency_histogram = Column(Text)  # JSON: latency bucket -> count
+    pipeline_stats = Column(Text)  # JSON: pipeline stage -> items, busy/blocked ms and queue depths
+    
+    # Relationships
+    scrape_log = relationship("ScrapeLog", back_populates="categories")
+    
+    __table_args__ = (
+        Index('idx_scrape_log_category_log', 'scrape_log_id'),
+    )
+
+class ScrapeCheckpoint(Base):
+    __tablename__ = 'scrape_checkpoints'
+    
+    id = Column(Integer, primary_key=True)
+    category_slug = Column(String(255), unique=True, nullable=False)
+    last_page = Column(Integer, default=0)  # Last listing page fully persisted by the backfill
+    completed = Column(Boolean, default=False)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('idx_scrape_checkpoint_slug', 'category_slug'),
+    )
+
+class FailedFetch(Base):
+    __tablename__ = 'failed_fetches'
+    
+    id = Column(Integer, primary_key=True)
+    url = Column(String(500), unique=True, nullable=False)
+    category_id = Column(Integer, ForeignKey('categories.id', ondelete='CASCADE'))
+    entry = Column(Text)  # JSON listing entry (title, excerpt, publish date) to retry the post with, or listing pages to walk again
+    attempts = Column(Integer, default=0)  # Failed attempts over all runs
+    last_error = Column(Text)
+    first_failed_at = Column(DateTime, default=datetime.utcnow)
+    last_failed_at = Column(DateTime, default=datetime.utcnow)
+
+class ScrapeLease(Base):
+    __tablename__ = 'scrape_leases'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), unique=True, nullable=False)  # e.g. 'scrape', see scraper/lease.py
+    holder = Column(String(255))  # host:pid:token of the run holding it, NULL when free
+    acquired_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    expires_at = Column(DateTime)  # Free to take over after this, e.g. when the holder crashed
+
+class DiscoveryCursor(Base):
+    __tablename__ = 'discovery_cursors'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), unique=True, nullable=False)  # e.g. 'wp-rest-posts'
+    cursor = Column(String(100))  # Opaque position in the feed, e.g. a WordPress modified timestamp
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class HttpValidator(Base):
+    __tablename__ = 'http_validators'
+    
+    id = Column(Integer, primary_key=True)
+    url = Column(String(500), unique=True, nullable=False)
+    etag = Column(String(255))
+    last_modified = Column(String(100))  # Raw Last-Modified header value
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('idx_http_validator_url', 'url'),
+    )
+
 class DatabaseManager:
     def __init__(self, database_url=None):
         if not database_url:
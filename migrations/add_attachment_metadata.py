@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the HEAD probe metadata columns to the attachments
+table, plus an index on attachments.file_url.
+Works on both SQLite and PostgreSQL.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from database.models import DatabaseManager
+
+NEW_COLUMNS = [
+    ('content_type', 'VARCHAR(100)'),
+    ('file_last_modified', 'TIMESTAMP'),
+    ('etag', 'VARCHAR(255)'),
+    ('probe_status', 'INTEGER'),
+    ('probed_at', 'TIMESTAMP'),
+]
+
+def migrate():
+    db_manager = DatabaseManager()
+    inspector = inspect(db_manager.engine)
+    columns = [column['name'] for column in inspector.get_columns('attachments')]
+    indexes = [index['name'] for index in inspector.get_indexes('attachments')]
+    
+    with db_manager.engine.connect() as conn:
+        for name, column_type in NEW_COLUMNS:
+            if name in columns:
+                print(f"Column '{name}' already exists in attachments table")
+                continue
+            conn.execute(text(f"ALTER TABLE attachments ADD COLUMN {name} {column_type}"))
+            print(f"Successfully added '{name}' column to attachments table")
+        
+        if 'idx_attachment_file_url' in indexes:
+            print("Index 'idx_attachment_file_url' already exists")
+        else:
+            conn.execute(text("CREATE INDEX idx_attachment_file_url ON attachments (file_url)"))
+            print("Successfully added 'idx_attachment_file_url' index")
+        conn.commit()
+    print("Existing attachments are probed on the next scrapes")
+
+if __name__ == "__main__":
+    print("Running attachment metadata migration...")
+    migrate()
+    print("Migration completed!")
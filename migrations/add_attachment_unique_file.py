@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Migration script to add a unique (post_id, file_url) index to attachments.
+Duplicate attachment rows are removed first. Works on SQLite and PostgreSQL.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from database.models import DatabaseManager
+
+def migrate():
+    db_manager = DatabaseManager()
+    inspector = inspect(db_manager.engine)
+    names = [c['name'] for c in inspector.get_unique_constraints('attachments')]
+    names += [i['name'] for i in inspector.get_indexes('attachments')]
+    
+    if 'uq_attachment_post_file' in names:
+        print("Unique index 'uq_attachment_post_file' already exists")
+        return
+    
+    with db_manager.engine.connect() as conn:
+        result = conn.execute(text("""
+            DELETE FROM attachments
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM attachments GROUP BY post_id, file_url
+            )
+        """))
+        print(f"Removed {result.rowcount} duplicate attachment rows")
+        conn.execute(text(
+            "CREATE UNIQUE INDEX uq_attachment_post_file ON attachments (post_id, file_url)"
+        ))
+        conn.commit()
+    print("Successfully added unique index on attachments (post_id, file_url)")
+
+if __name__ == "__main__":
+    print("Running attachment unique index migration...")
+    migrate()
+    print("Migration completed!")
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the post_categories table (posts listed in
+several categories) and fill it from posts.category_id.
+Works on both SQLite and PostgreSQL.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from database.models import DatabaseManager, PostCategory
+
+def migrate():
+    db_manager = DatabaseManager()
+    PostCategory.__table__.create(db_manager.engine, checkfirst=True)
+    
+    with db_manager.engine.connect() as conn:
+        result = conn.execute(text("""
+            INSERT INTO post_categories (post_id, category_id, created_at)
+            SELECT p.id, p.category_id, p.scraped_at FROM posts p
+            WHERE p.category_id IS NOT NULL
+            AND NOT EXISTS (
+                SELECT 1 FROM post_categories pc WHERE pc.post_id = p.id AND pc.category_id = p.category_id
+            )
+        """))
+        conn.commit()
+        print(f"Added {result.rowcount} post category memberships from posts.category_id")
+    print("Posts listed in further categories are linked to them on the next scrapes")
+
+if __name__ == "__main__":
+    print("Running post categories migration...")
+    migrate()
+    print("Migration completed!")
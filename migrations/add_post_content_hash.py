@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the content_hash column to the posts table.
+Works on both SQLite and PostgreSQL.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from database.models import DatabaseManager
+
+def migrate():
+    db_manager = DatabaseManager()
+    columns = [column['name'] for column in inspect(db_manager.engine).get_columns('posts')]
+    
+    if 'content_hash' in columns:
+        print("Column 'content_hash' already exists in posts table")
+        return
+    
+    with db_manager.engine.connect() as conn:
+        conn.execute(text("ALTER TABLE posts ADD COLUMN content_hash VARCHAR(64)"))
+        conn.commit()
+    print("Successfully added 'content_hash' column to posts table")
+    print("Existing posts get their hash on the next scrape, without being counted as updated")
+
+if __name__ == "__main__":
+    print("Running content_hash migration...")
+    migrate()
+    print("Migration completed!")
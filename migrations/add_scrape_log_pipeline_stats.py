@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the pipeline_stats column to the
+scrape_log_categories table.
+Works on both SQLite and PostgreSQL.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from database.models import DatabaseManager
+
+def migrate():
+    db_manager = DatabaseManager()
+    columns = [column['name'] for column in inspect(db_manager.engine).get_columns('scrape_log_categories')]
+    
+    if 'pipeline_stats' in columns:
+        print("Column 'pipeline_stats' already exists in scrape_log_categories table")
+        return
+    
+    with db_manager.engine.connect() as conn:
+        conn.execute(text("ALTER TABLE scrape_log_categories ADD COLUMN pipeline_stats TEXT"))
+        conn.commit()
+    print("Successfully added 'pipeline_stats' column to scrape_log_categories table")
+
+if __name__ == "__main__":
+    print("Running scrape log pipeline stats migration...")
+    migrate()
+    print("Migration completed!")
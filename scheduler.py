@@ -1,18 +1,24 @@
 #!/usr/bin/env python3
+import argparse
 import schedule
 import time
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 import sys
 import os
 import signal
+import threading
 from logging.handlers import RotatingFileHandler
 
 # Add the current directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from config.config import SCHEDULER_CONFIG
 from database.models import DatabaseManager
 from scraper.eof_scraper import EOFScraper
+from scraper.lease import LeaseUnavailable
+from scraper.polling import AdaptivePollPlanner
+from scraper.recall_watcher import RecallWatcher
 
 # Global flag for graceful shutdown
 shutdown_flag = False
@@ -70,16 +76,132 @@ def run_scraper():
         # Initialize scraper
         scraper = EOFScraper(db_manager, logger)
         
-        # Run the scrape
-        scraper.run_full_scrape()
+        # Run an incremental scrape: only new or changed posts are fetched
+        scraper.run_full_scrape(incremental=True)
         
         logger.info("Scheduled scrape completed successfully")
         
+    except LeaseUnavailable as e:
+        logger.info(f"Skipping scheduled scrape, another scrape is running: {str(e)}")
     except Exception as e:
         logger.error(f"Error during scheduled scrape: {str(e)}", exc_info=True)
 
+def run_due_categories(planner):
+    """Scrape the categories whose adaptive poll interval has elapsed"""
+    if shutdown_flag:
+        return
+    
+    logger = logging.getLogger(__name__)
+    
+    try:
+        scraper = EOFScraper(planner.db_manager, logger)
+        due = planner.due([target[0] for target in scraper.category_targets()])
+        if not due:
+            return
+        
+        logger.info(f"Starting scrape of {len(due)} due categories...")
+        scraper.run_full_scrape(incremental=True, categories=due)
+        planner.mark_polled(due)
+        logger.info("Scheduled scrape completed successfully")
+        
+    except LeaseUnavailable as e:
+        # Not marked as polled, so the categories are tried again next minute
+        logger.info(f"Skipping scheduled scrape, another scrape is running: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error during scheduled scrape: {str(e)}", exc_info=True)
+
+def start_recall_watcher():
+    """Watch the recall subcategories in a background thread.
+
+    The watcher runs next to the scheduled scrapes so new recalls are
+    picked up within about a minute even while a long scrape is running.
+    """
+    interval = SCHEDULER_CONFIG['recall_watch_seconds']
+    if not interval:
+        return None
+    watcher = RecallWatcher(DatabaseManager(), logging.getLogger('recall_watcher'))
+    thread = threading.Thread(
+        target=watcher.run,
+        kwargs={'interval': interval, 'should_stop': lambda: shutdown_flag},
+        name='recall-watcher',
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+def run_attachment_jobs():
+    """Probe new attachments, extract the text of PDF attachments and index
+    the recalls it mentions.
+
+    Runs apart from the scrapes and without the scrape lease: these
+    downloads are not needed to detect new posts and would otherwise make
+    every scrape wait for them.
+    """
+    logger = logging.getLogger('attachments')
+    scraper = EOFScraper(DatabaseManager(), logger)
+    try:
+        probed = scraper.probe_attachments()
+        extracted = scraper.extract_attachment_texts()
+        if extracted:
+            scraper.index_recall_entities()
+        if probed or extracted:
+            logger.info(f"Attachment job: {probed} probed, {extracted} texts extracted")
+    finally:
+        scraper.close()
+
+def start_attachment_worker():
+    """Run the attachment job every attachment_job_minutes in a background thread"""
+    interval = SCHEDULER_CONFIG['attachment_job_minutes'] * 60
+    if not interval:
+        return None
+    logger = logging.getLogger('attachments')
+    
+    def work():
+        while not shutdown_flag:
+            started = time.monotonic()
+            try:
+                run_attachment_jobs()
+            except Exception as e:
+                logger.error(f"Attachment job failed: {str(e)}", exc_info=True)
+            # Sleep in short steps so a stop request is noticed quickly
+            while not shutdown_flag and time.monotonic() - started < interval:
+                time.sleep(1)
+    
+    thread = threading.Thread(target=work, name='attachment-worker', daemon=True)
+    thread.start()
+    return thread
+
+def run_backfill():
+    """Backfill the full history of every category.
+    
+    Stops between listing pages once a shutdown signal is received; the
+    next run resumes from the per-category checkpoints.
+    """
+    if shutdown_flag:
+        return
+    
+    logger = logging.getLogger(__name__)
+    logger.info("Starting historical backfill...")
+    
+    try:
+        db_manager = DatabaseManager()
+        scraper = EOFScraper(db_manager, logger)
+        if scraper.run_backfill(should_stop=lambda: shutdown_flag):
+            logger.info("Historical backfill complete")
+        else:
+            logger.info("Historical backfill interrupted, will resume from checkpoints")
+    except LeaseUnavailable as e:
+        logger.info(f"Skipping backfill, another scrape is running: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error during backfill: {str(e)}", exc_info=True)
+
 def main():
     """Main scheduler function"""
+    parser = argparse.ArgumentParser(description='EOF scraper scheduler')
+    parser.add_argument('--backfill', action='store_true',
+                        help='Backfill the full category history (resumable) before scheduling scrapes')
+    args = parser.parse_args()
+    
     # Setup logging
     logger = setup_logging()
     logger.info("EOF Scraper Scheduler Starting...")
@@ -88,14 +210,40 @@ def main():
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
-    # Run immediately on startup
-    logger.info("Running initial scrape on startup...")
-    run_scraper()
+    recall_thread = start_recall_watcher()
+    attachment_thread = start_attachment_worker()
     
-    # Schedule to run every 15 minutes
-    schedule.every(15).minutes.do(run_scraper)
+    if args.backfill:
+        run_backfill()
     
-    logger.info("Scheduler configured to run every 15 minutes")
+    if SCHEDULER_CONFIG['adaptive_polling']:
+        planner = AdaptivePollPlanner(
+            DatabaseManager(),
+            min_interval=timedelta(minutes=SCHEDULER_CONFIG['min_poll_minutes']),
+            max_interval=timedelta(minutes=SCHEDULER_CONFIG['max_poll_minutes']),
+            fraction=SCHEDULER_CONFIG['poll_fraction'],
+            history=SCHEDULER_CONFIG['poll_history'],
+            logger=logger
+        )
+        
+        # Every category is due on startup
+        logger.info("Running initial scrape on startup...")
+        run_due_categories(planner)
+        
+        # Check every minute which categories are due
+        schedule.every(1).minutes.do(run_due_categories, planner)
+        
+        logger.info(f"Scheduler configured to poll each category every "
+                    f"{SCHEDULER_CONFIG['min_poll_minutes']}-{SCHEDULER_CONFIG['max_poll_minutes']} minutes")
+    else:
+        # Run immediately on startup
+        logger.info("Running initial scrape on startup...")
+        run_scraper()
+        
+        # Schedule to run every 15 minutes
+        schedule.every(SCHEDULER_CONFIG['interval_minutes']).minutes.do(run_scraper)
+        
+        logger.info(f"Scheduler configured to run every {SCHEDULER_CONFIG['interval_minutes']} minutes")
     
     # Keep the script running
     while not shutdown_flag:
@@ -107,6 +255,10 @@ def main():
             break
     
     logger.info("Scheduler shutting down...")
+    if recall_thread:
+        recall_thread.join(timeout=60)
+    if attachment_thread:
+        attachment_thread.join(timeout=60)
 
 if __name__ == "__main__":
     main()
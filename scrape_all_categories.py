@@ -3,9 +3,11 @@
 Script to scrape all EOF categories
 """
 import logging
+import os
 from datetime import datetime
 from database.models import DatabaseManager
 from scraper.eof_scraper import EOFScraper
+from scraper.lease import LeaseUnavailable
 
 # Set up logging
 logging.basicConfig(
@@ -17,87 +19,52 @@ logger = logging.getLogger(__name__)
 def scrape_all_categories():
     # Initialize database and scraper
     db_manager = DatabaseManager()
-    scraper = EOFScraper(db_manager, logger)
+    # A full crawl is parse-heavy, so parse pages on all cores
+    scraper = EOFScraper(db_manager, logger, parse_workers=os.cpu_count())
+    targets = scraper.category_targets()
     
     print("\n=== Starting Full EOF Category Scrape ===\n")
     print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Categories to scrape: {len(scraper.categories)}")
+    print(f"Categories to scrape: {len(scraper.categories)} ({len(targets)} with subcategories)")
     print("=" * 50)
     
-    # Track overall statistics
-    total_categories = 0
-    total_posts_scraped = 0
-    total_posts_new = 0
-    total_posts_updated = 0
-    total_errors = 0
+    # Categories are scraped in parallel (SCRAPER_CONFIG category_workers).
+    # run_full_scrape holds the scrape lease, so the scheduler and cron
+    # runs stay out, and records the per-category results in a ScrapeLog.
+    try:
+        scrape_log_id = scraper.run_full_scrape(incremental=False)
+    except LeaseUnavailable as e:
+        print(f"Another scrape is running, not starting: {e}")
+        return
+    except Exception as e:
+        print(f"✗ Scrape failed: {str(e)}")
+        logger.exception("Error during full scrape")
+        return
     
-    # Scrape each category
-    for cat_slug, cat_info in scraper.categories.items():
-        print(f"\n\nCategory: {cat_info['name']} ({cat_slug})")
-        print(f"  Type: {cat_info.get('type', 'unknown')}")
-        print(f"  URL: {cat_info['url']}")
-        print(f"  Subcategories: {len(cat_info.get('subcategories', {}))}")
+    session = db_manager.get_session()
+    try:
+        from database.models import ScrapeLog
+        scrape_log = session.get(ScrapeLog, scrape_log_id)
+        results = {row.scope: row for row in scrape_log.categories}
+        total_categories = 0
+        for slug, name, url, parent_slug, category_type in targets:
+            row = results.get(slug)
+            if row is None:
+                continue
+            indent = "    " if parent_slug else "  "
+            if row.status == 'failed':
+                print(f"{indent}✗ {name} ({slug}): {row.error}")
+            else:
+                total_categories += 1
+                print(f"{indent}✓ {name} ({slug}): {row.posts_scraped} scraped, {row.posts_new} new, "
+                      f"{row.posts_updated} updated")
         
-        try:
-            # Scrape main category
-            posts_scraped, posts_new, posts_updated = scraper.scrape_category(
-                category_slug=cat_slug,
-                category_name=cat_info['name'],
-                category_url=cat_info['url'],
-                parent_category=None,
-                category_type=cat_info.get('type', cat_slug)
-            )
-            
-            print(f"  ✓ Main category complete: {posts_scraped} scraped, {posts_new} new, {posts_updated} updated")
-            
-            total_categories += 1
-            total_posts_scraped += posts_scraped
-            total_posts_new += posts_new
-            total_posts_updated += posts_updated
-            
-            # Scrape subcategories if any
-            subcategories = cat_info.get('subcategories', {})
-            if subcategories:
-                print(f"  Scraping {len(subcategories)} subcategories...")
-                
-                # Get parent category from database
-                session = db_manager.get_session()
-                try:
-                    from database.models import Category
-                    parent_cat = session.query(Category).filter_by(slug=cat_slug).first()
-                    
-                    for subcat_slug, subcat_name in subcategories.items():
-                        subcat_url = f"{cat_info['url']}{subcat_slug}/"
-                        print(f"    - {subcat_name} ({subcat_slug})...")
-                        
-                        try:
-                            sub_scraped, sub_new, sub_updated = scraper.scrape_category(
-                                category_slug=subcat_slug,
-                                category_name=subcat_name,
-                                category_url=subcat_url,
-                                parent_category=parent_cat,
-                                category_type=cat_info.get('type', cat_slug)
-                            )
-                            
-                            print(f"      ✓ {sub_scraped} scraped, {sub_new} new, {sub_updated} updated")
-                            
-                            total_categories += 1
-                            total_posts_scraped += sub_scraped
-                            total_posts_new += sub_new
-                            total_posts_updated += sub_updated
-                            
-                        except Exception as e:
-                            print(f"      ✗ Error: {str(e)}")
-                            total_errors += 1
-                            logger.exception(f"Error scraping subcategory {subcat_slug}")
-                            
-                finally:
-                    session.close()
-                    
-        except Exception as e:
-            print(f"  ✗ Error scraping category: {str(e)}")
-            total_errors += 1
-            logger.exception(f"Error scraping category {cat_slug}")
+        total_posts_scraped = scrape_log.posts_scraped or 0
+        total_posts_new = scrape_log.posts_new or 0
+        total_posts_updated = scrape_log.posts_updated or 0
+        total_errors = len(scrape_log.errors.splitlines()) if scrape_log.errors else 0
+    finally:
+        session.close()
     
     # Print summary
     print("\n" + "=" * 50)
@@ -0,0 +1,205 @@
+"""
+Compressed, content-addressed archive of fetched HTML.
+
+Each distinct page body is stored once, gzip-compressed, under the SHA-256
+of its content::
+
+    <root>/objects/ab/ab12...ef.html.gz
+
+``index.jsonl`` records every fetch as one line of
+``{"url", "fetched_at", "sha256"}``, so the archive can answer "what did
+this URL look like at that time" and "what is the latest copy of every
+page". ``scripts/reparse_archive.py`` rebuilds posts from it without
+touching the network.
+
+``prune`` bounds the archive: it drops index entries past an age limit
+(keeping the latest copy of every URL) and then the oldest entries until
+the pages fit a size cap, and deletes pages no entry refers to any more.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from scraper.parsing import parse_listing_html, parse_post_html
+
+# Index locks by archive directory, shared by every HtmlArchive of a process
+# (e.g. the scheduler's scraper and recall watcher)
+_index_locks = {}
+_index_locks_lock = threading.Lock()
+
+
+def _index_lock(root):
+    with _index_locks_lock:
+        return _index_locks.setdefault(os.path.abspath(root), threading.Lock())
+
+
+class HtmlArchive:
+    """Stores fetched pages on disk, keyed by URL and fetch time"""
+
+    def __init__(self, root):
+        self.root = root
+        self.index_path = os.path.join(root, 'index.jsonl')
+        self._lock = _index_lock(root)
+
+    def path(self, digest):
+        """File holding the page with the given SHA-256"""
+        return os.path.join(self.root, 'objects', digest[:2], f"{digest}.html.gz")
+
+    def store(self, url, html, fetched_at=None):
+        """Archive a fetched page, returning its SHA-256"""
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write under a temporary name so readers never see a partial file
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        else:
+            # A page being archived again is recent, see prune
+            os.utime(path)
+
+        entry = {
+            'url': url,
+            'fetched_at': (fetched_at or datetime.utcnow()).isoformat(),
+            'sha256': digest,
+        }
+        with self._lock:
+            # One short line per append, so concurrent writers do not interleave
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+        return digest
+
+    def load(self, digest):
+        """HTML of an archived page"""
+        return read_archived(self.path(digest))
+
+    def entries(self):
+        """All index entries in the order they were archived"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash
+                    continue
+
+    def prune(self, max_age_days=None, max_bytes=None, now=None):
+        """Drop index entries older than ``max_age_days``, except the latest
+        entry of each URL, then the oldest entries until the pages they
+        refer to take at most ``max_bytes``, and delete unreferenced pages.
+
+        Returns the number of pages deleted. Pages written while pruning
+        are kept.
+        """
+        started = time.time()
+        with self._lock:
+            entries = list(self.entries())
+            kept = entries
+            if max_age_days:
+                cutoff = ((now or datetime.utcnow()) - timedelta(days=max_age_days)).isoformat()
+                latest = {entry['url']: position for position, entry in enumerate(entries)}
+                kept = [
+                    entry for position, entry in enumerate(entries)
+                    if entry['fetched_at'] >= cutoff or latest[entry['url']] == position
+                ]
+            if max_bytes:
+                sizes = {}
+                references = {}
+                for entry in kept:
+                    digest = entry['sha256']
+                    references[digest] = references.get(digest, 0) + 1
+                    if digest not in sizes:
+                        try:
+                            sizes[digest] = os.path.getsize(self.path(digest))
+                        except OSError:
+                            sizes[digest] = 0
+                total = sum(sizes.values())
+                dropped = 0
+                # Oldest first, until the rest fits
+                while dropped < len(kept) and total > max_bytes:
+                    digest = kept[dropped]['sha256']
+                    references[digest] -= 1
+                    if not references[digest]:
+                        total -= sizes[digest]
+                    dropped += 1
+                kept = kept[dropped:]
+
+            if len(kept) < len(entries):
+                tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for entry in kept:
+                        f.write(json.dumps(entry) + '\n')
+                os.replace(tmp_path, self.index_path)
+            referenced = {entry['sha256'] for entry in kept}
+
+        deleted = 0
+        objects = os.path.join(self.root, 'objects')
+        for directory, _, names in os.walk(objects):
+            for name in names:
+                if not name.endswith('.html.gz') or name[:-len('.html.gz')] in referenced:
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getmtime(path) < started:
+                        os.remove(path)
+                        deleted += 1
+                except OSError:
+                    pass
+        return deleted
+
+    def prune_daily(self, max_age_days=None, max_bytes=None):
+        """``prune`` if the archive was last pruned more than a day ago;
+        returns the number of pages deleted"""
+        marker = os.path.join(self.root, '.last_prune')
+        try:
+            if time.time() - os.path.getmtime(marker) < 24 * 3600:
+                return 0
+        except OSError:
+            pass
+        deleted = self.prune(max_age_days, max_bytes)
+        os.makedirs(self.root, exist_ok=True)
+        with open(marker, 'w') as f:
+            f.write(datetime.utcnow().isoformat())
+        return deleted
+
+    def latest(self):
+        """Dict of URL -> index entry of its most recent fetch"""
+        latest = {}
+        for entry in self.entries():
+            current = latest.get(entry['url'])
+            if current is None or entry['fetched_at'] >= current['fetched_at']:
+                latest[entry['url']] = entry
+        return latest
+
+
+def read_archived(path):
+    with gzip.open(path, 'rb') as f:
+        return f.read().decode('utf-8')
+
+
+def parse_archived_listing(path, base_url, backend='lxml'):
+    """Parse an archived category page: returns its post list.
+
+    Module-level so it can be sent to worker processes.
+    """
+    return parse_listing_html(read_archived(path), base_url, backend)[0]
+
+
+def parse_archived_post(path, base_url, backend='lxml'):
+    """Parse an archived post page: returns the post content dict.
+
+    Module-level so it can be sent to worker processes.
+    """
+    return parse_post_html(read_archived(path), base_url, backend)
@@ -0,0 +1,145 @@
+import logging
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from sqlalchemy import bindparam, func, select, update
+
+
+def _http_date(value):
+    """Naive UTC datetime from an HTTP date header, or None"""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class AttachmentProber:
+    """Fills in attachment size, content type and last-modified with HEAD requests.
+
+    Every unique file URL is probed once; attachments sharing a URL with an
+    already probed attachment get its metadata without a request. Probes
+    run concurrently through the scraper's ``AsyncFetcher``; with the
+    scraper's ``host_limiter`` they obey the same per-host limits as page
+    fetches.
+    """
+
+    def __init__(self, fetcher, http_session, logger=None, timeout=30, host_limiter=None):
+        self.fetcher = fetcher
+        self.http_session = http_session
+        self.logger = logger or logging.getLogger(__name__)
+        self.timeout = timeout
+        self.host_limiter = host_limiter
+
+    def head(self, url):
+        """Metadata of a file URL from its response headers"""
+        with self.host_limiter.slot(url) if self.host_limiter else nullcontext():
+            response = self.http_session.head(url, timeout=self.timeout, allow_redirects=True)
+            if response.status_code in (405, 501):
+                # HEAD not allowed: read the headers of a GET and drop the body
+                response = self.http_session.get(url, timeout=self.timeout, stream=True)
+                response.close()
+        if response.status_code >= 500:
+            response.raise_for_status()
+
+        meta = {
+            'probe_status': response.status_code,
+            'file_size': None,
+            'content_type': None,
+            'file_last_modified': None,
+            'etag': None,
+        }
+        if response.status_code >= 400:
+            # Gone or forbidden: only the status is worth keeping
+            return meta
+
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit():
+            meta['file_size'] = int(length)
+        content_type = response.headers.get('Content-Type')
+        if content_type:
+            meta['content_type'] = content_type.split(';')[0].strip()[:100]
+        meta['file_last_modified'] = _http_date(response.headers.get('Last-Modified'))
+        if response.headers.get('ETag'):
+            meta['etag'] = response.headers['ETag'][:255]
+        return meta
+
+    def probe(self, urls):
+        """Probe URLs concurrently; returns a dict of URL -> metadata.
+
+        URLs that could not be probed (network errors, 5xx) are left out
+        and retried on the next run.
+        """
+        results = self.fetcher.fetch_all(urls, self.head)
+        return {url: meta for url, meta in results.items() if not isinstance(meta, Exception)}
+
+    def probe_pending(self, session, limit=500):
+        """Probe up to ``limit`` file URLs that have never been probed.
+
+        Returns the number of URLs whose metadata was stored. The caller
+        commits the session.
+        """
+        from database.models import Attachment
+        pending = session.execute(
+            select(Attachment.file_url)
+            .where(Attachment.probed_at.is_(None))
+            .group_by(Attachment.file_url)
+            .order_by(func.max(Attachment.id).desc())
+            .limit(limit)
+        ).scalars().all()
+        if not pending:
+            return 0
+
+        # Reuse the metadata of URLs already probed for another post
+        known = {}
+        for row in session.execute(
+            select(Attachment.file_url, Attachment.file_size, Attachment.content_type,
+                   Attachment.file_last_modified, Attachment.etag, Attachment.probe_status)
+            .where(Attachment.file_url.in_(pending), Attachment.probed_at.isnot(None))
+        ):
+            known[row.file_url] = {
+                'probe_status': row.probe_status,
+                'file_size': row.file_size,
+                'content_type': row.content_type,
+                'file_last_modified': row.file_last_modified,
+                'etag': row.etag,
+            }
+
+        to_probe = [url for url in pending if url not in known]
+        metadata = dict(known)
+        metadata.update(self.probe(to_probe))
+        if not metadata:
+            return 0
+
+        now = datetime.utcnow()
+        attachments = Attachment.__table__
+        session.execute(
+            update(attachments)
+            .where(attachments.c.file_url == bindparam('b_url'), attachments.c.probed_at.is_(None))
+            .values(
+                file_size=bindparam('b_size'),
+                content_type=bindparam('b_type'),
+                file_last_modified=bindparam('b_modified'),
+                etag=bindparam('b_etag'),
+                probe_status=bindparam('b_status'),
+                probed_at=now
+            ),
+            [
+                {
+                    'b_url': url,
+                    'b_size': meta['file_size'],
+                    'b_type': meta['content_type'],
+                    'b_modified': meta['file_last_modified'],
+                    'b_etag': meta['etag'],
+                    'b_status': meta['probe_status'],
+                }
+                for url, meta in metadata.items()
+            ]
+        )
+        self.logger.info(f"Probed {len(to_probe)} attachment URLs ({len(known)} already known)")
+        return len(metadata)
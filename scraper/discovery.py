@@ -0,0 +1,123 @@
+import json
+import logging
+from urllib.parse import urljoin
+
+import lxml.html
+
+from scraper.parsing import parse_date
+
+
+def _html_text(rendered):
+    """Plain text of a rendered WordPress field (titles and excerpts are HTML)"""
+    if not rendered or not rendered.strip():
+        return ''
+    return lxml.html.fromstring(rendered).text_content().strip()
+
+
+class FeedUnavailable(Exception):
+    """The WordPress REST API could not be used for discovery"""
+
+
+class FeedDiscovery:
+    """Discovers new and changed posts through the WordPress REST API.
+
+    Instead of crawling every category listing, ``discover`` asks
+    ``/wp-json/wp/v2/posts`` for posts modified after a cursor and maps
+    their WordPress category ids to category slugs. Usually this is one
+    request per run. ``FeedUnavailable`` is raised when the API is missing
+    or broken, so the caller can fall back to the HTML listing crawl.
+
+    Requests are made with ``get``, a function like ``requests.get``; the
+    scraper passes ``EOFScraper.get`` so they count against its rate limits
+    and metrics like listing fetches.
+    """
+
+    posts_path = '/wp-json/wp/v2/posts'
+    categories_path = '/wp-json/wp/v2/categories'
+    per_page = 100
+
+    def __init__(self, get, base_url, logger=None, timeout=30):
+        self.get = get
+        self.base_url = base_url
+        self.logger = logger or logging.getLogger(__name__)
+        self.timeout = timeout
+        self._category_slugs = None
+
+    def _get_json(self, path, params):
+        """GET a REST endpoint, returning (data, total pages)"""
+        url = urljoin(self.base_url, path)
+        try:
+            response = self.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except (ValueError, json.JSONDecodeError) as e:
+            raise FeedUnavailable(f"Invalid JSON from {url}: {str(e)}")
+        except Exception as e:
+            raise FeedUnavailable(f"Error fetching {url}: {str(e)}")
+        if not isinstance(data, list):
+            raise FeedUnavailable(f"Unexpected response from {url}")
+        total_pages = int(response.headers.get('X-WP-TotalPages') or 1)
+        return data, total_pages
+
+    def _get_all(self, path, params):
+        """Follow the REST API pagination and return all items"""
+        items = []
+        page = 1
+        while True:
+            data, total_pages = self._get_json(path, dict(params, page=page, per_page=self.per_page))
+            items.extend(data)
+            if page >= total_pages or not data:
+                return items
+            page += 1
+
+    def category_slugs(self):
+        """WordPress category id -> slug, fetched once per instance"""
+        if self._category_slugs is None:
+            categories = self._get_all(self.categories_path, {'_fields': 'id,slug'})
+            self._category_slugs = {category['id']: category['slug'] for category in categories}
+        return self._category_slugs
+
+    def latest_cursor(self):
+        """The ``modified`` value of the most recently modified post"""
+        data, _ = self._get_json(self.posts_path, {
+            'orderby': 'modified',
+            'order': 'desc',
+            'per_page': 1,
+            '_fields': 'modified',
+        })
+        return data[0].get('modified') if data else None
+
+    def discover(self, modified_after):
+        """Posts modified after the cursor (a WordPress ``modified`` value).
+
+        Returns (entries, new cursor). Each entry has the keys of a listing
+        entry from ``parse_post_list`` plus ``categories``, the slugs of
+        the post's WordPress categories.
+        """
+        params = {
+            'orderby': 'modified',
+            'order': 'asc',
+            '_fields': 'link,title,excerpt,date,modified,categories',
+        }
+        if modified_after:
+            params['modified_after'] = modified_after
+        posts = self._get_all(self.posts_path, params)
+
+        slugs = self.category_slugs() if posts else {}
+        entries = []
+        cursor = modified_after
+        for post in posts:
+            if not post.get('link'):
+                continue
+            entries.append({
+                'url': post['link'],
+                'title': _html_text((post.get('title') or {}).get('rendered')),
+                'excerpt': _html_text((post.get('excerpt') or {}).get('rendered')),
+                'publish_date': parse_date(post.get('date')),
+                'categories': [slugs[cat_id] for cat_id in post.get('categories', []) if cat_id in slugs],
+            })
+            if post.get('modified') and (cursor is None or post['modified'] > cursor):
+                cursor = post['modified']
+
+        self.logger.info(f"Feed discovery: {len(entries)} posts modified after {modified_after}")
+        return entries, cursor
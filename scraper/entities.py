@@ -0,0 +1,352 @@
+"""
+Structured recall entities: products, lot numbers, expiry dates and
+marketing-authorisation holders (MAH).
+
+``extract_entities`` pulls them out of a post's title, content and
+attachment text with keyword-anchored patterns for the Greek and English
+wording EOF uses. ``RecallEntityIndexer`` stores them in the indexed
+``recall_entities`` table and ``lookup_recalls`` answers exact lookups
+("is lot X of product Y recalled?") from that index.
+
+Values are matched on a normalised form: accents and case are ignored,
+lot numbers keep only letters and digits (Greek capitals that look like
+Latin ones are read as Latin), expiry dates are reduced to YYYY-MM.
+"""
+import hashlib
+import logging
+import re
+import unicodedata
+from datetime import datetime
+
+from sqlalchemy import delete, select
+
+PRODUCT = 'product'
+LOT = 'lot'
+EXPIRY = 'expiry'
+MAH = 'mah'
+
+# Greek capitals that are printed like Latin ones in lot numbers
+_LATIN_LOOKALIKES = str.maketrans('ΑΒΕΖΗΙΚΜΝΟΡΤΥΧ', 'ABEZHIKMNOPTYX')
+
+
+def _fold(text):
+    """Lowercase, accent-free copy of ``text`` with the same length, so
+    match positions in it are valid in the original"""
+    return ''.join(unicodedata.normalize('NFD', char)[0] for char in text).lower()
+
+
+def normalize_name(value):
+    """Lookup key of a product or company name"""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char)).lower()
+    # "A.E." and "AE" are the same company suffix
+    value = re.sub(r'(?<=[^\W\d_])\.', '', value)
+    return ' '.join(re.sub(r'[^\w%]+', ' ', value).split())[:255]
+
+
+def strip_strength(name):
+    """Product name without its strength, e.g. "ZANTAC" for "ZANTAC 150mg\""""
+    return _STRENGTH.sub('', name or '').strip()
+
+
+def normalize_lot(value):
+    """Lookup key of a lot/batch number: letters and digits only, upper case"""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char)).upper()
+    return re.sub(r'[\W_]+', '', value.translate(_LATIN_LOOKALIKES))[:255]
+
+
+def normalize_expiry(value):
+    """Lookup key of an expiry date: 'YYYY-MM', or None if it is not a date"""
+    parts = [int(part) for part in re.split(r'[/.\-\s]+', (value or '').strip()) if part.isdigit()]
+    if len(parts) == 3:
+        year, month = (parts[0], parts[1]) if parts[0] > 31 else (parts[2], parts[1])
+    elif len(parts) == 2:
+        year, month = (parts[0], parts[1]) if parts[0] > 31 else (parts[1], parts[0])
+    else:
+        return None
+    if year < 100:
+        year += 2000
+    if not 1 <= month <= 12 or not 1990 <= year <= 2100:
+        return None
+    return f"{year:04d}-{month:02d}"
+
+
+NORMALIZERS = {
+    PRODUCT: normalize_name,
+    LOT: normalize_lot,
+    EXPIRY: normalize_expiry,
+    MAH: normalize_name,
+}
+
+# Patterns run on the folded text (lowercase, no accents)
+_LOT_KEYWORD = re.compile(
+    r'(?:αρ(?:ιθμος|\.)?\s*παρτιδας|παρτιδ(?:α|ας|ες|ων)|lot(?:\s*(?:no|number|nr|n°)\.?)?'
+    r'|batch(?:\s*(?:no|number|nr)\.?)?)(?![a-zα-ω])'
+)
+_EXPIRY_KEYWORD = r'(?:ημερομηνια\s+ληξης|ημ(?:ερ)?\.?\s*ληξης|ληξη(?:ς)?|exp(?:iry|iration)?(?:\s*date)?\.?)'
+_EXPIRY = re.compile(
+    _EXPIRY_KEYWORD + r'\s*[:\-–]?\s*(?:την\s+)?'
+    r'(\d{1,2}[/.\-]\d{1,2}[/.\-]\d{2,4}|\d{1,2}[/.\-]\d{4}|\d{4}[/.\-]\d{1,2}(?:[/.\-]\d{1,2})?)'
+)
+_MAH = re.compile(
+    r'(?:κατοχος\s+(?:της\s+)?αδειας\s+κυκλοφοριας|\bκ\.?α\.?κ\.?(?![a-zα-ω])|\bmah\b'
+    r'|marketing\s+authori[sz]ation\s+holder|\bεταιρει(?:ας|α)(?![a-zα-ω])|\bcompany\b)'
+    r'\s*[:\-–,(]?\s*(?:η\s+|ο\s+|της\s+|του\s+)?'
+    r'([^\n:;()«»"]{2,80}?(?:\b(?:α|a)\.?\s?(?:(?:β|b)\.?\s?)?(?:ε|e)\.?(?:\s?(?:ε|e)\.?)?'
+    r'(?:\s?(?:β|b)\.?\s?(?:ε|e)\.?)?(?![a-zα-ω])|\bε\.?π\.?ε\.?(?![a-zα-ω])'
+    r'|\bι\.?κ\.?ε\.?(?![a-zα-ω])|\bs\.?\s?a\.?(?![a-z])|\bltd\.?|\blimited\b|\bgmbh\b|\binc\.?'
+    r'|\bb\.?v\.?(?![a-z])|\bs\.?p\.?a\.?(?![a-z])|\bag\b|\bplc\b|\bllc\b))'
+)
+_PRODUCT_KEYWORD = re.compile(
+    r'(?:(?:φαρμακευτικ|καλλυντικ|ιατροτεχνολογικ|βιοκτον|κτηνιατρικ)\w*\s+)?'
+    r'(?:προιο(?:ν|ντος|ντα|ντων)|σκευασματ(?:ος|α|ων)|σκευασμα|products?)(?![a-zα-ω])'
+    r'\s*[:\-–]?\s*(?:(?:με\s+)?(?:την\s+)?(?:εμπορικη\s+)?ονομασια\s*[:\-–]?\s*)?'
+)
+# Patterns run on the original text
+_UPPER_RUN = re.compile(r"[A-ZΑ-ΩΆΈΉΊΌΎΏΪΫ0-9][A-ZΑ-ΩΆΈΉΊΌΎΏΪΫ0-9\-+./®™&' ]*")
+_STRENGTH_UNIT = re.compile(r'\s?(?:mg|mcg|μg|g|ml|iu|%)(?:\s*/\s*\d*(?:[.,]\d+)?\s*(?:ml|g|tab|dose))?(?![a-zα-ω])',
+                            re.IGNORECASE)
+_STRENGTH = re.compile(r'\s*\d+(?:[.,]\d+)?\s*(?:mg|mcg|μg|g|ml|iu|%).*$', re.IGNORECASE)
+_QUOTES = {'«': '»', '"': '"', '“': '”'}
+_LOT_TOKEN = re.compile(r'^[0-9a-zα-ω][0-9a-zα-ω\-/.]{2,24}$')
+_DATE_TOKEN = re.compile(r'^\d{1,4}(?:[/.\-]\d{1,4}){1,2}$')
+_DATE_CONTEXT = re.compile(r'\b' + _EXPIRY_KEYWORD + r'(?![a-zα-ω])')
+_LOT_CONNECTORS = {'και', 'and', '&', '/', '-', '–', ':', 'no', 'no.', 'nr', 'nr.', 'με', 'αριθμο', 'αριθμους',
+                   'αρ.', 'τις', 'την', 'των', 'number', 'numbers', 'n°'}
+
+
+def _products(original, folded):
+    for match in _PRODUCT_KEYWORD.finditer(folded):
+        start = match.end()
+        if start >= len(original):
+            continue
+        closing = _QUOTES.get(original[start])
+        if closing:
+            end = original.find(closing, start + 1)
+            if end != -1 and end - start <= 120:
+                yield original[start + 1:end].strip()
+            continue
+        run = _UPPER_RUN.match(original, start)
+        if not run:
+            continue
+        name = run.group(0).rstrip(" -./'&")
+        unit = _STRENGTH_UNIT.match(original, start + len(name))
+        if unit and name[-1:].isdigit():
+            name += unit.group(0)
+        if len(name) >= 3 and any(char.isalpha() for char in name):
+            yield name
+
+
+def _lots(original, folded):
+    for match in _LOT_KEYWORD.finditer(folded):
+        window_end = min(len(folded), match.end() + 160)
+        # A date-shaped token after the keyword is an expiry date only when
+        # an expiry is mentioned nearby, e.g. "Παρτίδα / Λήξη: 2301234 / 03/2025";
+        # otherwise codes such as "12/3" or "AB-12/3" are lot numbers
+        dated = _DATE_CONTEXT.search(folded, max(0, match.start() - 40), window_end) is not None
+        lots = []
+        skipped = 0
+        for token in re.finditer(r'[^\s,;()]+', folded[match.end():window_end]):
+            word = token.group(0).strip('.:')
+            if word in _LOT_CONNECTORS or not word:
+                continue
+            start = match.end() + token.start()
+            value = original[start:start + len(token.group(0))].strip('.:')
+            is_date = dated and _DATE_TOKEN.match(word) and normalize_expiry(word)
+            if _LOT_TOKEN.match(word) and any(char.isdigit() for char in word) and not is_date:
+                lots.append(value)
+                continue
+            if lots or skipped >= 3:
+                break
+            skipped += 1
+        yield from lots
+
+
+def extract_entities(*texts):
+    """Entities found in the given texts (title, content, attachment text, ...).
+
+    Returns a list of (entity type, value, normalised value), without
+    duplicates.
+    """
+    found = {}
+    for text in texts:
+        if not text:
+            continue
+        folded = _fold(text)
+        candidates = [(PRODUCT, name) for name in _products(text, folded)]
+        candidates += [(LOT, lot) for lot in _lots(text, folded)]
+        candidates += [(EXPIRY, text[m.start(1):m.end(1)]) for m in _EXPIRY.finditer(folded)]
+        candidates += [(MAH, text[m.start(1):m.end(1)].strip()) for m in _MAH.finditer(folded)]
+
+        for entity_type, value in candidates:
+            value = ' '.join(value.split())[:255]
+            normalized = NORMALIZERS[entity_type](value)
+            if normalized:
+                found.setdefault((entity_type, normalized), value)
+            if entity_type == PRODUCT:
+                # Also index the name without its strength, e.g. "ZANTAC" for "ZANTAC 150mg"
+                base = strip_strength(value)
+                if base and base != value and normalize_name(base):
+                    found.setdefault((PRODUCT, normalize_name(base)), base)
+    return [(entity_type, value, normalized) for (entity_type, normalized), value in found.items()]
+
+
+def is_recall_post(title, category_slug):
+    """Whether a post is a recall: in a recall category or titled as one"""
+    if category_slug and category_slug.startswith('anakliseis'):
+        return True
+    folded = _fold(title or '')
+    return 'ανακλησ' in folded or 'ανακαλ' in folded or 'recall' in folded
+
+
+class RecallEntityIndexer:
+    """Keeps ``recall_entities`` in sync with recall posts.
+
+    A post is (re)indexed when the fingerprint of its content hash and
+    attachment texts differs from the one recorded in
+    ``recall_index_state`` at its last indexing.
+    """
+
+    def __init__(self, logger=None, batch_size=200):
+        self.logger = logger or logging.getLogger(__name__)
+        self.batch_size = batch_size
+
+    def pending(self, session, limit):
+        """Ids and fingerprints of recall posts that need (re)indexing"""
+        from database.models import AttachmentText, Category, Post, PostCategory, RecallIndexState
+        # Posts also listed in a recall category
+        listed_as_recall = set(session.execute(
+            select(PostCategory.post_id)
+            .join(Category, PostCategory.category_id == Category.id)
+            .where(Category.slug.like('anakliseis%'))
+        ).scalars())
+        attachment_hashes = {}
+        for post_id, content_sha256 in session.execute(
+            select(AttachmentText.post_id, AttachmentText.content_sha256)
+        ):
+            attachment_hashes.setdefault(post_id, []).append(content_sha256 or '')
+        indexed = dict(session.execute(select(RecallIndexState.post_id, RecallIndexState.fingerprint)).all())
+
+        pending = []
+        for post_id, title, content_hash, slug in session.execute(
+            select(Post.id, Post.title, Post.content_hash, Category.slug)
+            .outerjoin(Category, Post.category_id == Category.id)
+            .order_by(Post.id.desc())
+        ):
+            if post_id not in listed_as_recall and not is_recall_post(title, slug):
+                continue
+            fingerprint = hashlib.sha256(
+                f"{content_hash}|{'|'.join(sorted(attachment_hashes.get(post_id, [])))}".encode('utf-8')
+            ).hexdigest()
+            if indexed.get(post_id) != fingerprint:
+                pending.append((post_id, fingerprint))
+                if len(pending) >= limit:
+                    break
+        return pending
+
+    def index_pending(self, session, limit=2000):
+        """Index up to ``limit`` pending posts; returns how many were indexed.
+
+        The caller commits the session.
+        """
+        pending = self.pending(session, limit)
+        for start in range(0, len(pending), self.batch_size):
+            self._index_batch(session, pending[start:start + self.batch_size])
+        if pending:
+            self.logger.info(f"Indexed recall entities of {len(pending)} posts")
+        return len(pending)
+
+    def _index_batch(self, session, batch):
+        from database.models import AttachmentText, Post, RecallEntity, RecallIndexState
+        fingerprints = dict(batch)
+        post_ids = list(fingerprints)
+
+        attachment_texts = {}
+        for post_id, text in session.execute(
+            select(AttachmentText.post_id, AttachmentText.text).where(AttachmentText.post_id.in_(post_ids))
+        ):
+            attachment_texts.setdefault(post_id, []).append(text)
+
+        rows = []
+        for post_id, title, content in session.execute(
+            select(Post.id, Post.title, Post.content).where(Post.id.in_(post_ids))
+        ):
+            for source, texts in (('post', [title, content]), ('attachment', attachment_texts.get(post_id, []))):
+                for entity_type, value, normalized in extract_entities(*texts):
+                    rows.append({
+                        'post_id': post_id,
+                        'entity_type': entity_type,
+                        'value': value,
+                        'normalized': normalized,
+                        'source': source,
+                    })
+
+        session.execute(delete(RecallEntity).where(RecallEntity.post_id.in_(post_ids)))
+        if rows:
+            session.execute(RecallEntity.__table__.insert(), rows)
+
+        states = {
+            state.post_id: state
+            for state in session.query(RecallIndexState).filter(RecallIndexState.post_id.in_(post_ids))
+        }
+        now = datetime.utcnow()
+        for post_id, fingerprint in fingerprints.items():
+            state = states.get(post_id)
+            if state is None:
+                session.add(RecallIndexState(post_id=post_id, fingerprint=fingerprint, indexed_at=now))
+            else:
+                state.fingerprint = fingerprint
+                state.indexed_at = now
+
+
+def lookup_recalls(session, product=None, lot=None, expiry=None, mah=None, limit=50):
+    """Recall posts matching all the given entities exactly (after normalisation).
+
+    Returns a list of dicts with the post's id, title, url, publish_date and
+    its entities grouped by type, newest posts first.
+    """
+    from database.models import Post, RecallEntity
+    post_ids = None
+    for entity_type, value in ((LOT, lot), (PRODUCT, product), (MAH, mah), (EXPIRY, expiry)):
+        if not value:
+            continue
+        normalized = NORMALIZERS[entity_type](value)
+        if not normalized:
+            return []
+        matches = set(session.execute(
+            select(RecallEntity.post_id)
+            .where(RecallEntity.entity_type == entity_type, RecallEntity.normalized == normalized)
+        ).scalars())
+        post_ids = matches if post_ids is None else post_ids & matches
+        if not post_ids:
+            return []
+    if not post_ids:
+        return []
+
+    posts = session.execute(
+        select(Post.id, Post.title, Post.url, Post.publish_date)
+        .where(Post.id.in_(list(post_ids)))
+        .order_by(Post.publish_date.desc(), Post.id.desc())
+        .limit(limit)
+    ).all()
+    entities = {}
+    for post_id, entity_type, value in session.execute(
+        select(RecallEntity.post_id, RecallEntity.entity_type, RecallEntity.value)
+        .where(RecallEntity.post_id.in_([post.id for post in posts]))
+        .order_by(RecallEntity.id)
+    ):
+        values = entities.setdefault(post_id, {}).setdefault(entity_type, [])
+        if value not in values:
+            values.append(value)
+
+    return [
+        {
+            'post_id': post.id,
+            'title': post.title,
+            'url': post.url,
+            'publish_date': post.publish_date,
+            'entities': entities.get(post.id, {}),
+        }
+        for post in posts
+    ]
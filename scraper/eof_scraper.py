@@ -1,22 +1,86 @@
 import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
 import time
 import logging
 import re
 from urllib.parse import urljoin, urlparse
-from tenacity import retry, stop_after_attempt, wait_exponential
+from requests.adapters import HTTPAdapter
 import json
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from config.config import SCRAPER_CONFIG
+from scraper.archive import HtmlArchive
+from scraper.attachments import AttachmentProber
+from scraper.pdf_text import AttachmentTextExtractor, pdf_support
+from scraper.discovery import FeedDiscovery, FeedUnavailable
+from scraper.entities import RecallEntityIndexer
+from scraper.fetcher import AsyncFetcher, HostLimiter, RequestRateLimiter
+from scraper.fingerprint import post_fingerprint
+from scraper.metrics import ScrapeMetrics, timed_call
+from scraper.writer import PostBatchWriter, build_post_record, link_post_categories
+from scraper.http_cache import ValidatorStore
+from scraper.lease import DatabaseLease
+from scraper.parsing import page_number, parse_date, parse_listing_html, parse_page, parse_post_html
+from scraper.pipeline import Stage, StagedPipeline
+from scraper.retry_queue import DeferredRetryQueue, clear_failed_posts, load_failed_posts, save_failed_posts
 
 class EOFScraper:
-    def __init__(self, db_manager, logger=None):
+    def __init__(self, db_manager, logger=None, max_concurrency=None, request_delay=None, parser_backend=None,
+                 parse_workers=None, discovery=None):
         self.base_url = "https://www.eof.gr"
         self.db_manager = db_manager
         self.logger = logger or logging.getLogger(__name__)
+        if max_concurrency is None:
+            max_concurrency = SCRAPER_CONFIG['max_concurrency_per_host']
+        if request_delay is None:
+            request_delay = SCRAPER_CONFIG['delay_between_requests']
+        self.parser_backend = parser_backend or SCRAPER_CONFIG['parser_backend']
+        if parse_workers is None:
+            parse_workers = SCRAPER_CONFIG['parse_workers']
+        self.parse_workers = parse_workers
+        self._parse_pool = None
+        # Posts written per transaction, see _scrape_posts
+        self.commit_chunk_size = SCRAPER_CONFIG['commit_chunk_size']
+        # URL -> result of the posts handled during the current run_full_scrape,
+        # so a post listed in several categories is fetched once per run
+        self._run_seen = None
+        # Failed fetches retried at the end of the current run, and the
+        # number of earlier runs' failures of saved posts (see scraper/retry_queue.py)
+        self._retry_queue = None
+        self._failed_before = {}
+        self.discovery = discovery or SCRAPER_CONFIG['discovery']
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # Keep enough pooled connections for the concurrent fetcher and the
+        # fetch stage of the post pipeline, which run at the same time
+        pool_size = max_concurrency + (SCRAPER_CONFIG['pipeline_workers'].get('fetch') or max_concurrency)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Every response of the session is counted in the current run's metrics
+        self.metrics = ScrapeMetrics()
+        self.session.hooks['response'].append(self._record_response)
+        # Per-host concurrency and delay of every request of the scraper:
+        # applied in fetch_page, fetch_page_conditional and get and by the
+        # attachment prober and downloader, so the fetcher itself does not
+        # space requests
+        self.host_limiter = HostLimiter(max_concurrency, request_delay)
+        self.fetcher = AsyncFetcher(self.fetch_page, max_per_host=max_concurrency, delay=0, logger=self.logger)
+        # Both shared with parallel category workers, see _category_worker
+        self.rate_limiter = RequestRateLimiter(SCRAPER_CONFIG['max_requests_per_second'])
+        self._transports = []
+        self.validators = ValidatorStore(db_manager)
+        # Held by full scrapes and backfills so only one runs at a time
+        self.lease = DatabaseLease(db_manager, 'scrape', SCRAPER_CONFIG['lease_ttl_seconds'],
+                                   SCRAPER_CONFIG['lease_heartbeat_seconds'], self.logger)
+        archive_dir = SCRAPER_CONFIG.get('html_archive_dir')
+        self.archive = HtmlArchive(archive_dir) if archive_dir else None
         
         # Categories to scrape
         self.categories = {
@@ -91,238 +155,305 @@ class EOFScraper:
             }
         }
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def fetch_page(self, url):
-        """Fetch a page with retry logic"""
+        """Fetch a page. Failures are not retried here: run_full_scrape
+        retries failed posts and categories at the end of the run."""
         try:
-            response = self.session.get(url, timeout=30)
+            with self.host_limiter.slot(url):
+                self.rate_limiter.wait()
+                start = time.perf_counter()
+                response = self.session.get(url, timeout=30)
             response.raise_for_status()
+            self.archive_page(url, response.text)
             return response.text
         except Exception as e:
+            self._record_failure(e, start)
+            self.logger.error(f"Error fetching {url}: {str(e)}")
+            raise
+    
+    def get(self, url, **kwargs):
+        """GET a URL outside the fetcher, e.g. a REST API request, with the
+        same rate cap, per-host delay and metrics as page fetches. Returns
+        the response; HTTP errors are left to the caller."""
+        kwargs.setdefault('timeout', 30)
+        try:
+            with self.host_limiter.slot(url):
+                self.rate_limiter.wait()
+                start = time.perf_counter()
+                return self.session.get(url, **kwargs)
+        except Exception as e:
+            self._record_failure(e, start)
+            raise
+    
+    def fetch_page_conditional(self, url, use_validators=True, validators=None):
+        """Fetch a page unless it is unchanged since it was last stored.
+
+        Sends the stored ETag/Last-Modified validators for the URL and
+        returns None on 304 Not Modified. Validators from the response are
+        remembered and saved once the caller stages them. ``validators`` is
+        a ``ValidatorStore`` to use instead of the scraper's, e.g. the
+        recall watcher's in-memory one.
+        """
+        validators = validators or self.validators
+        headers = validators.request_headers(url) if use_validators else {}
+        try:
+            with self.host_limiter.slot(url):
+                self.rate_limiter.wait()
+                start = time.perf_counter()
+                response = self.session.get(url, timeout=30, headers=headers)
+            response.raise_for_status()
+        except Exception as e:
+            self._record_failure(e, start)
             self.logger.error(f"Error fetching {url}: {str(e)}")
             raise
+        
+        if response.status_code == 304:
+            return None
+        validators.remember(url, response)
+        self.archive_page(url, response.text)
+        return response.text
+    
+    def _record_response(self, response, *args, **kwargs):
+        """Session response hook: record status, latency and size.
+
+        The body of streamed responses is not read here, so their size is
+        taken from Content-Length.
+        """
+        if kwargs.get('stream'):
+            length = response.headers.get('Content-Length', '')
+            size = int(length) if length.isdigit() else 0
+        else:
+            size = len(response.content)
+        self.metrics.record_request(response.status_code, response.elapsed.total_seconds(), size)
+    
+    def _record_failure(self, error, start):
+        """Record a request that got no response (responses are recorded by the hook)"""
+        if getattr(error, 'response', None) is None:
+            self.metrics.record_request('error', time.perf_counter() - start)
+    
+    def archive_page(self, url, html):
+        """Keep a copy of a fetched page in the HTML archive, if enabled.
+
+        Archiving problems are logged and never fail the fetch.
+        """
+        if self.archive is None:
+            return
+        try:
+            self.archive.store(url, html)
+        except Exception as e:
+            self.logger.warning(f"Could not archive {url}: {str(e)}")
+    
+    def parse_listing(self, html, page_url):
+        """Parse a category page once: returns (posts, pagination URLs)"""
+        with self.metrics.timer('parse'):
+            page = parse_page(html, self.base_url, self.parser_backend, self.logger)
+            return page.post_list(), page.pagination_urls()
     
     def parse_post_list(self, html, category_url):
         """Parse a list of posts from a category page"""
-        soup = BeautifulSoup(html, 'lxml')
-        posts = []
-        
-        # Find all post entries
-        articles = soup.find_all('article') or soup.find_all('div', class_='post')
-        
-        for article in articles:
-            try:
-                # Find the title and URL
-                title_elem = article.find('h3', class_='entry-title') or article.find('h2', class_='entry-title')
-                if not title_elem:
-                    continue
-                
-                link_elem = title_elem.find('a')
-                if not link_elem:
-                    continue
-                
-                post_url = link_elem.get('href', '')
-                if not post_url:
-                    continue
-                
-                # Make URL absolute
-                if not post_url.startswith('http'):
-                    post_url = urljoin(self.base_url, post_url)
-                
-                post_title = link_elem.text.strip()
-                
-                # Try to find excerpt
-                excerpt = ''
-                excerpt_elem = article.find('div', class_='entry-summary') or article.find('div', class_='excerpt')
-                if excerpt_elem:
-                    excerpt = excerpt_elem.text.strip()
-                
-                # Try to find date
-                date_elem = article.find('time') or article.find('span', class_='date')
-                publish_date = None
-                if date_elem:
-                    date_str = date_elem.get('datetime') or date_elem.text
-                    publish_date = self.parse_date(date_str)
-                
-                posts.append({
-                    'url': post_url,
-                    'title': post_title,
-                    'excerpt': excerpt,
-                    'publish_date': publish_date
-                })
-                
-            except Exception as e:
-                self.logger.error(f"Error parsing post in list: {str(e)}")
-                continue
-        
-        return posts
+        with self.metrics.timer('parse'):
+            return parse_page(html, self.base_url, self.parser_backend, self.logger).post_list()
     
     def parse_post_content(self, html, post_url):
         """Parse the full content of a post"""
-        soup = BeautifulSoup(html, 'lxml')
-        
-        # Find main content
-        content_elem = soup.find('div', class_='entry-content') or \
-                      soup.find('div', class_='post-content') or \
-                      soup.find('article')
-        
-        content = ''
-        if content_elem:
-            # Remove script and style elements
-            for script in content_elem(['script', 'style']):
-                script.decompose()
-            content = content_elem.get_text(separator='\n', strip=True)
-        
-        # Find attachments (PDFs, etc.)
-        attachments = []
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            if any(href.lower().endswith(ext) for ext in ['.pdf', '.doc', '.docx', '.xls', '.xlsx']):
-                file_url = urljoin(self.base_url, href)
-                file_name = link.text.strip() or href.split('/')[-1]
-                file_type = href.split('.')[-1].lower()
-                attachments.append({
-                    'file_url': file_url,
-                    'file_name': file_name,
-                    'file_type': file_type
-                })
-        
-        # Find meta description
-        meta_desc = ''
-        meta_elem = soup.find('meta', attrs={'name': 'description'})
-        if meta_elem:
-            meta_desc = meta_elem.get('content', '')
-        
-        # Find tags
-        tags = []
-        tag_container = soup.find('div', class_='tags') or soup.find('div', class_='post-tags')
-        if tag_container:
-            for tag in tag_container.find_all('a'):
-                tags.append(tag.text.strip())
-        
-        return {
-            'content': content,
-            'attachments': attachments,
-            'meta_description': meta_desc,
-            'tags': ','.join(tags)
-        }
+        with self.metrics.timer('parse'):
+            return parse_page(html, self.base_url, self.parser_backend, self.logger).post_content()
     
     def parse_date(self, date_str):
         """Parse various date formats"""
-        if not date_str:
-            return None
-        
-        # Try ISO format first
+        return parse_date(date_str)
+    
+    def fetch_pages(self, urls, fetch_func=None, parse_func=None, errors=None):
+        """Fetch several pages concurrently.
+
+        Returns a dict mapping each URL to its HTML (or to whatever
+        ``fetch_func`` returned, e.g. None for a 304). If ``parse_func`` is
+        given, fetched HTML is replaced by its parsed result; with parse
+        workers configured, pages are parsed in worker processes while the
+        remaining pages are still being fetched. URLs that could not be
+        fetched or parsed are left out (the error has already been logged);
+        their exceptions are added to the ``errors`` dict if given.
+        """
+        parse_pool = self._get_parse_pool() if parse_func else None
+        if parse_pool:
+            # Parse time is measured in the workers and comes back with the result
+            results = self.fetcher.fetch_all(urls, fetch_func, partial(timed_call, parse_func), parse_pool)
+            for url, result in results.items():
+                if isinstance(result, tuple):
+                    results[url], seconds = result
+                    self.metrics.add_time('parse', seconds)
+        else:
+            results = self.fetcher.fetch_all(urls, fetch_func)
+            if parse_func:
+                for url, html in results.items():
+                    if html is None or isinstance(html, Exception):
+                        continue
+                    try:
+                        with self.metrics.timer('parse'):
+                            results[url] = parse_func(html)
+                    except Exception as e:
+                        self.logger.error(f"Error parsing {url}: {str(e)}")
+                        results[url] = e
+        if errors is not None:
+            errors.update((url, result) for url, result in results.items() if isinstance(result, Exception))
+        return {url: result for url, result in results.items() if not isinstance(result, Exception)}
+    
+    def _get_parse_pool(self):
+        """Process pool for parsing, created on first use (None if disabled)"""
+        if self.parse_workers and self._parse_pool is None:
+            # spawn: worker processes must not inherit the fetch threads
+            self._parse_pool = ProcessPoolExecutor(
+                max_workers=self.parse_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._parse_pool
+    
+    def _listing_parser(self):
+        return partial(parse_listing_html, base_url=self.base_url, backend=self.parser_backend)
+    
+    def _post_parser(self):
+        return partial(parse_post_html, base_url=self.base_url, backend=self.parser_backend)
+    
+    def probe_attachments(self, limit=None):
+        """HEAD-probe attachments that were never probed (see scraper/attachments.py).
+
+        Returns the number of attachment URLs whose metadata was stored.
+        """
+        if limit is None:
+            limit = SCRAPER_CONFIG['attachment_probe_limit']
+        if not limit:
+            return 0
+        session = self.db_manager.get_session()
         try:
-            return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-        except:
-            pass
-        
-        # Try other common formats
-        date_formats = [
-            '%Y-%m-%d',
-            '%d/%m/%Y',
-            '%d-%m-%Y',
-            '%Y/%m/%d',
-            '%d %B %Y',
-            '%B %d, %Y'
-        ]
-        
-        for fmt in date_formats:
-            try:
-                return datetime.strptime(date_str.strip(), fmt)
-            except:
-                continue
-        
-        return None
+            probed = AttachmentProber(
+                self.fetcher, self.session, self.logger, host_limiter=self.host_limiter
+            ).probe_pending(session, limit)
+            session.commit()
+            return probed
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
+    def extract_attachment_texts(self, limit=None):
+        """Download PDF attachments and store their text (see scraper/pdf_text.py).
+
+        Returns the number of files whose text was stored; 0 if pypdf is
+        not installed.
+        """
+        if limit is None:
+            limit = SCRAPER_CONFIG['attachment_text_limit']
+        if not limit:
+            return 0
+        if not pdf_support():
+            self.logger.warning("pypdf is not installed, skipping attachment text extraction")
+            return 0
+        session = self.db_manager.get_session()
+        try:
+            extractor = AttachmentTextExtractor(
+                self.fetcher, self.session, self.logger, workers=SCRAPER_CONFIG['attachment_text_workers'],
+                host_limiter=self.host_limiter
+            )
+            extracted = extractor.extract_pending(session, limit)
+            session.commit()
+            return extracted
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
+    def prune_archive(self):
+        """Apply the HTML archive's age and size limits, at most once a day.
+
+        Archive problems are logged and never fail the scrape.
+        """
+        if self.archive is None:
+            return
+        try:
+            max_mb = SCRAPER_CONFIG['html_archive_max_mb']
+            deleted = self.archive.prune_daily(SCRAPER_CONFIG['html_archive_max_age_days'],
+                                               max_mb * 1024 * 1024 if max_mb else None)
+            if deleted:
+                self.logger.info(f"Pruned {deleted} pages from the HTML archive")
+        except Exception as e:
+            self.logger.warning(f"Could not prune the HTML archive: {str(e)}")
+    
+    def index_recall_entities(self, limit=None):
+        """Extract products, lots, expiry dates and MAHs of new or changed
+        recall posts into the lookup index (see scraper/entities.py).
+
+        Returns the number of posts indexed.
+        """
+        if limit is None:
+            limit = SCRAPER_CONFIG['recall_index_limit']
+        if not limit:
+            return 0
+        session = self.db_manager.get_session()
+        try:
+            indexed = RecallEntityIndexer(self.logger).index_pending(session, limit)
+            session.commit()
+            return indexed
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
+    def mount_transport(self, adapter):
+        """Send all requests through a transport adapter, e.g. the record
+        and replay adapters of ``scraper.replay``"""
+        self._transports.append(adapter)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def close(self):
+        """Shut down the parse worker processes, if any"""
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
     
     def get_pagination_urls(self, html, base_url):
         """Extract pagination URLs from a category page"""
-        soup = BeautifulSoup(html, 'lxml')
-        urls = []
-        
-        # Find pagination container
-        pagination = soup.find('div', class_='basel-pagination') or \
-                    soup.find('div', class_='pagination') or \
-                    soup.find('nav', class_='pagination')
-        
-        if pagination:
-            # Find all page links
-            for link in pagination.find_all('a', href=True):
-                href = link['href']
-                if 'page' in href:
-                    full_url = urljoin(self.base_url, href)
-                    if full_url not in urls:
-                        urls.append(full_url)
-        
-        return sorted(urls)
+        return parse_page(html, self.base_url, self.parser_backend, self.logger).pagination_urls()
     
-    def scrape_category(self, category_slug, category_name, category_url, parent_category=None, category_type=None):
-        """Scrape all posts from a category"""
-        from database.models import Category, Post, Attachment
+    def scrape_category(self, category_slug, category_name, category_url, parent_category=None, category_type=None,
+                        incremental=True):
+        """Scrape posts from a category.
+
+        In incremental mode pagination stops at the first listing page that
+        only has posts already stored, and only new posts or posts whose
+        listing title/excerpt changed are fetched. With ``incremental=False``
+        the first page and up to ``max_pages_per_category`` more pages are
+        re-crawled in full, ignoring stored HTTP validators. Further listing
+        pages are walked while the posts of earlier ones are fetched, parsed
+        and stored (see ``_scrape_post_pages``).
+        """
         session = self.db_manager.get_session()
         
         try:
-            # Get or create category
             full_url = urljoin(self.base_url, category_url)
-            category = session.query(Category).filter_by(slug=category_slug).first()
-            
-            if not category:
-                category = Category(
-                    name=category_name,
-                    slug=category_slug,
-                    url=full_url,
-                    parent_id=parent_category.id if parent_category else None,
-                    category_type=category_type
-                )
-                session.add(category)
-                session.commit()
-            
-            posts_scraped = 0
-            posts_new = 0
-            posts_updated = 0
+            category = self._get_or_create_category(
+                session, category_slug, category_name, full_url, parent_category, category_type
+            )
             
-            # Scrape first page
+            # Scrape first page. If it is unchanged (304) nothing was added
+            # to the category, so the later pages are unchanged as well.
             self.logger.info(f"Scraping category: {category_name} - {full_url}")
-            html = self.fetch_page(full_url)
-            posts = self.parse_post_list(html, full_url)
+            html = self.fetch_page_conditional(full_url, use_validators=incremental)
+            if html is None:
+                self.logger.info(f"Category {category_name} not modified since last run")
+                return 0, 0, 0
+            posts, pagination_urls = self.parse_listing(html, full_url)
             
-            # Get pagination URLs
-            pagination_urls = self.get_pagination_urls(html, full_url)
             self.logger.info(f"Found {len(pagination_urls)} additional pages for {category_name}")
+            max_pages = SCRAPER_CONFIG['max_pages_per_category']
+            page_urls = pagination_urls[:max_pages] if max_pages else pagination_urls
             
-            # Process posts from first page
-            for post_data in posts:
-                result = self.scrape_post(post_data, category, session)
-                posts_scraped += 1
-                if result == 'new':
-                    posts_new += 1
-                elif result == 'updated':
-                    posts_updated += 1
-            
-            # Scrape additional pages
-            for page_url in pagination_urls[:10]:  # Limit to first 10 pages for now
-                try:
-                    self.logger.info(f"Scraping page: {page_url}")
-                    html = self.fetch_page(page_url)
-                    posts = self.parse_post_list(html, page_url)
-                    
-                    for post_data in posts:
-                        result = self.scrape_post(post_data, category, session)
-                        posts_scraped += 1
-                        if result == 'new':
-                            posts_new += 1
-                        elif result == 'updated':
-                            posts_updated += 1
-                    
-                    # Be nice to the server
-                    time.sleep(1)
-                    
-                except Exception as e:
-                    self.logger.error(f"Error scraping page {page_url}: {str(e)}")
-                    continue
-            
-            session.commit()
+            posts_scraped, posts_new, posts_updated = self._scrape_listing(
+                session, category, posts, page_urls, [full_url], incremental
+            )
             self.logger.info(f"Category {category_name} complete: {posts_scraped} scraped, {posts_new} new, {posts_updated} updated")
             
             return posts_scraped, posts_new, posts_updated
@@ -334,32 +465,465 @@ class EOFScraper:
         finally:
             session.close()
     
-    def scrape_post(self, post_data, category, session):
-        """Scrape a single post"""
+    def _scrape_listing(self, session, category, posts, page_urls, fetched_urls, incremental):
+        """Scrape the posts of a fetched listing page and of the further
+        listing pages ``page_urls``, walked as in ``scrape_category``.
+
+        ``fetched_urls`` are the listing pages fetched so far. Their
+        validators are only saved once every listed post is stored, and
+        not at all if a listing page failed: otherwise the first page would
+        be unchanged (304) on the next run and the posts of the failed page
+        never fetched. Failed listing pages are queued for a retry at the
+        end of the run. Returns (scraped, new, updated).
+        """
+        listed_urls = []
+        failed_pages = []
+        walk = self._changed_pages if incremental else self._listing_pages
+        counts = self._scrape_post_pages(
+            walk(posts, page_urls, fetched_urls, listed_urls, failed_pages), category, session,
+            conditional=incremental
+        )
+        with self.metrics.timer('db'):
+            link_post_categories(session, {url: [category.id] for url in listed_urls})
+            if failed_pages:
+                self.validators.discard(fetched_urls)
+            else:
+                self.validators.stage(session, fetched_urls)
+            for urls, error in failed_pages:
+                self._defer_listing_pages(session, category, urls, incremental, error)
+            session.commit()
+        return counts
+    
+    def _defer_listing_pages(self, session, category, page_urls, incremental, error):
+        """Queue listing pages that could not be fetched for a retry at the
+        end of the run (see ``_retry_listing_pages``). ``page_urls`` starts
+        with the failed page; in incremental mode it also holds the pages
+        the walk did not get to.
+
+        Like failed posts, pages that still fail at the end of the run are
+        saved and walked first on the next run, and outside
+        ``run_full_scrape`` they are saved right away.
+        """
+        error_msg = f"Error fetching listing page {page_urls[0]} of {category.name}: {str(error)}"
+        previous = self._failed_before.get(page_urls[0], 0)
+        queue = self._retry_queue
+        if queue is None:
+            queue = DeferredRetryQueue(max_attempts=1)
+        if queue.add(page_urls[0], 'page', (category.id, page_urls, incremental), error, previous):
+            self.logger.warning(f"{error_msg}; retrying at the end of the run")
+            return
+        self.logger.error(error_msg)
+        if self._retry_queue is None:
+            save_failed_posts(session, queue.exhausted, SCRAPER_CONFIG['failed_fetch_max_attempts'])
+    
+    def _retry_listing_pages(self, category_id, page_urls, incremental):
+        """Walk listing pages of a category from one whose fetch failed;
+        failures are queued again. Returns (scraped, new, updated)."""
+        from database.models import Category
+        session = self.db_manager.get_session()
+        try:
+            category = session.get(Category, category_id) if category_id else None
+            if category is None:
+                self.logger.warning(f"Dropping failed listing page {page_urls[0]} of a deleted category")
+                clear_failed_posts(session, [page_urls[0]])
+                session.commit()
+                return 0, 0, 0
+            try:
+                html = self.fetch_page_conditional(page_urls[0], use_validators=False)
+            except Exception as e:
+                self._defer_listing_pages(session, category, page_urls, incremental, e)
+                session.commit()
+                return 0, 0, 0
+            posts = self.parse_post_list(html, page_urls[0])
+            counts = self._scrape_listing(session, category, posts, page_urls[1:], [page_urls[0]], incremental)
+            with self.metrics.timer('db'):
+                clear_failed_posts(session, [page_urls[0]])
+                session.commit()
+            return counts
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
+    def _get_or_create_category(self, session, slug, name, full_url, parent_category=None, category_type=None):
+        """Get a category by slug, creating (and committing) it if needed"""
+        from database.models import Category
+        category = session.query(Category).filter_by(slug=slug).first()
+        
+        if not category:
+            category = Category(
+                name=name,
+                slug=slug,
+                url=full_url,
+                parent_id=parent_category.id if parent_category else None,
+                category_type=category_type
+            )
+            session.add(category)
+            session.commit()
+        
+        return category
+    
+    def _scrape_posts(self, posts, category, session, conditional=True):
+        """Fetch, parse and persist the posts of listing entries, see
+        ``_scrape_post_pages``. Returns (scraped, new, updated)."""
+        return self._scrape_post_pages([posts], category, session, conditional)
+    
+    def _scrape_post_pages(self, pages, category, session, conditional=True):
+        """Fetch, parse and persist the posts of pages of listing entries.
+
+        ``pages`` yields lists of entries, e.g. while walking the listing
+        pages of a category. The entries go through a staged pipeline (see
+        ``scraper.pipeline``): discovery, fetch, parse and persist run
+        concurrently, with bounded queues in between so slow writes
+        throttle fetching. Each stage's threads are set by
+        ``SCRAPER_CONFIG['pipeline_workers']``; discovery and persist
+        have one, as listing pages are walked in order and ``session`` is
+        not thread-safe.
+
+        The persist stage writes up to ``commit_chunk_size`` waiting posts
+        at a time and commits them together with their validators, then
+        expunges the objects it loaded from the session. The write lock is
+        thus only held while one chunk is written, and memory does not grow
+        with the number of posts. With ``conditional`` posts already stored
+        are fetched with their HTTP validators, and a 304 skips parsing and
+        the update. Returns (scraped, new, updated).
+        """
+        from database.models import Post
+        totals = [0, 0, 0]
+        repeated = []
+        # Objects of the caller (category, checkpoint, ...) stay in the session
+        retained = set(session)
+        category_name = category.name
+        parse_pool = self._get_parse_pool()
+        parser = self._post_parser()
+        
+        def discover():
+            seen = set()
+            known_session = self.db_manager.get_session()
+            try:
+                for page in pages:
+                    entries = []
+                    for post_data in page:
+                        if post_data['url'] in seen:
+                            # The same post can show up on two pages when the listing shifts
+                            continue
+                        seen.add(post_data['url'])
+                        if self._run_seen is not None and post_data['url'] in self._run_seen:
+                            # Already handled under another category this run; the
+                            # caller only records the category membership
+                            repeated.append(post_data['url'])
+                            continue
+                        entries.append(post_data)
+                    known_urls = set()
+                    if conditional and entries:
+                        known_urls = {
+                            url for (url,) in known_session.query(Post.url)
+                            .filter(Post.url.in_([post_data['url'] for post_data in entries]))
+                        }
+                    for post_data in entries:
+                        yield post_data, post_data['url'] in known_urls
+            finally:
+                known_session.close()
+        
+        def fetch(item):
+            post_data, known = item
+            # The shared per-host limits of fetch_page_conditional space
+            # these requests together with the listing fetches
+            try:
+                return post_data, self.fetch_page_conditional(post_data['url'], use_validators=known)
+            except Exception as e:
+                return post_data, e
+        
+        def parse(item):
+            post_data, html = item
+            if html is None or isinstance(html, Exception):
+                return item
+            try:
+                if parse_pool:
+                    # Parse time is measured in the worker and comes back with the result
+                    content_data, seconds = parse_pool.submit(timed_call, parser, html).result()
+                    self.metrics.add_time('parse', seconds)
+                else:
+                    with self.metrics.timer('parse'):
+                        content_data = parser(html)
+            except Exception as e:
+                self.logger.error(f"Error parsing {post_data['url']}: {str(e)}")
+                return post_data, e
+            return post_data, content_data
+        
+        def persist(items):
+            handled = {}
+            scraped, new, updated, fetched_urls = self._persist_posts(items, category, session, handled)
+            self._commit_chunk(session, fetched_urls, retained)
+            if self._run_seen is not None:
+                # Only once committed, so parallel category workers that
+                # skip these posts can link them to their category
+                self._run_seen.update(handled)
+            totals[0] += scraped
+            totals[1] += new
+            totals[2] += updated
+        
+        workers = SCRAPER_CONFIG['pipeline_workers']
+        pipeline = StagedPipeline([
+            Stage('fetch', fetch, workers.get('fetch') or self.fetcher.max_per_host),
+            Stage('parse', parse, workers.get('parse') or self.parse_workers or 1),
+            Stage('persist', persist, 1, batch_size=max(1, self.commit_chunk_size)),
+        ], queue_size=SCRAPER_CONFIG['pipeline_queue_size'], logger=self.logger)
+        try:
+            pipeline.run(discover())
+        finally:
+            self.metrics.record_pipeline(pipeline.stats)
+        if repeated:
+            self.logger.info(f"Skipped {len(repeated)} posts already scraped this run in {category_name}")
+        
+        return tuple(totals)
+    
+    def _persist_posts(self, items, category, session, handled):
+        """Write fetched and parsed posts, without committing.
+
+        ``items`` are (listing entry, parsed content) pairs; the content is
+        None for pages that were not modified and the exception for pages
+        that could not be fetched or parsed, which are queued for a retry.
+        The result of each post that did not fail is added to ``handled``.
+        Returns (scraped, new, updated, URLs whose validators can be saved).
+        """
+        posts_scraped = 0
+        posts_new = 0
+        posts_updated = 0
+        fetched_urls = []
+        
+        posts = [post_data for post_data, _ in items]
+        post_pages = {post_data['url']: result for post_data, result in items if not isinstance(result, Exception)}
+        fetch_errors = {post_data['url']: result for post_data, result in items if isinstance(result, Exception)}
+        with self.metrics.timer('db'):
+            if PostBatchWriter.supports(session):
+                results = self._write_posts(posts, post_pages, category, session)
+            else:
+                results = {}
+                for post_data in posts:
+                    if post_pages.get(post_data['url']) is not None:
+                        results[post_data['url']] = self.scrape_post(
+                            post_data, category, session, content_data=post_pages[post_data['url']]
+                        )
+        
+        recovered = []
+        for post_data in posts:
+            if post_data['url'] not in post_pages:
+                result = 'error'
+            elif post_pages[post_data['url']] is None:
+                result = 'unchanged'
+            else:
+                result = results.get(post_data['url'], 'error')
+            posts_scraped += 1
+            if result == 'new':
+                posts_new += 1
+            elif result == 'updated':
+                posts_updated += 1
+            if result in ('new', 'updated', 'unchanged') and post_pages[post_data['url']] is not None:
+                fetched_urls.append(post_data['url'])
+            if result != 'error':
+                handled[post_data['url']] = result
+            if post_data['url'] in fetch_errors:
+                self._defer_post(session, post_data, category, fetch_errors[post_data['url']])
+            elif result != 'error' and post_data['url'] in self._failed_before:
+                recovered.append(post_data['url'])
+        if recovered:
+            clear_failed_posts(session, recovered)
+        
+        return posts_scraped, posts_new, posts_updated, fetched_urls
+    
+    def _commit_chunk(self, session, urls, retained):
+        """Commit a chunk of posts with the validators of their pages, then
+        expunge every object loaded since ``retained`` was taken"""
+        with self.metrics.timer('db'):
+            self.validators.stage(session, urls)
+            session.commit()
+        for obj in list(session):
+            if obj not in retained:
+                session.expunge(obj)
+    
+    def _defer_post(self, session, post_data, category, error):
+        """Queue a failed post fetch for a retry at the end of the run.
+
+        Outside ``run_full_scrape`` (e.g. backfills) it is saved right
+        away, so the next full run retries it first.
+        """
+        previous = self._failed_before.get(post_data['url'], 0)
+        queue = self._retry_queue
+        if queue is None:
+            queue = DeferredRetryQueue(max_attempts=1)
+        if not queue.add(post_data['url'], 'post', (category.id, post_data), error, previous):
+            if self._retry_queue is None:
+                save_failed_posts(session, queue.exhausted, SCRAPER_CONFIG['failed_fetch_max_attempts'])
+    
+    def _write_posts(self, posts, post_contents, category, session):
+        """Persist parsed posts with the batch writer.
+
+        ``post_contents`` maps post URLs to parsed content (None for pages
+        that were not modified). Returns a dict mapping URLs to 'new',
+        'updated' or 'unchanged'.
+        """
+        records = [
+            build_post_record(post_data, post_contents[post_data['url']])
+            for post_data in posts
+            if post_contents.get(post_data['url']) is not None
+        ]
+        return PostBatchWriter(session).write(records, category)
+    
+    def _changed_pages(self, posts, page_urls, fetched_urls, listed_urls, failed_pages):
+        """Walk listing pages until one has no new posts.
+
+        ``posts`` are the entries of the first listing page. Yields the
+        entries of each page that are new or whose title/excerpt differ
+        from the stored post. Listing pages that were fetched are added to
+        ``fetched_urls`` and the post URLs of every page to ``listed_urls``.
+        If a page cannot be fetched the walk stops, adding the pages from
+        it on and the error to ``failed_pages``. Runs in the discovery stage of ``_scrape_post_pages``, so it reads
+        stored posts with a session of its own.
+        """
+        session = self.db_manager.get_session()
+        try:
+            remaining = list(page_urls)
+            page_posts = posts
+            
+            while True:
+                listed_urls.extend(post_data['url'] for post_data in page_posts)
+                page_changed, has_new = self._changed_entries(page_posts, session)
+                yield page_changed
+                
+                if not has_new or not remaining:
+                    break
+                
+                page_url = remaining.pop(0)
+                try:
+                    html = self.fetch_page_conditional(page_url)
+                except Exception as e:
+                    failed_pages.append(([page_url] + remaining, e))
+                    break
+                if html is None:
+                    # Unchanged page, so nothing new further down either
+                    break
+                page_posts = self.parse_post_list(html, page_url)
+                fetched_urls.append(page_url)
+        finally:
+            session.close()
+    
+    def _listing_pages(self, posts, page_urls, fetched_urls, listed_urls, failed_pages):
+        """Yield the entries of the first listing page, then those of the
+        further pages, fetched and parsed concurrently without validators.
+        Fetched pages are added to ``fetched_urls`` and their post URLs to
+        ``listed_urls``, failed pages to ``failed_pages`` with their error."""
+        listed_urls.extend(post_data['url'] for post_data in posts)
+        yield posts
+        errors = {}
+        pages = self.fetch_pages(
+            page_urls,
+            lambda url: self.fetch_page_conditional(url, use_validators=False),
+            self._listing_parser(),
+            errors
+        )
+        for page_url in page_urls:
+            if page_url in errors:
+                failed_pages.append(([page_url], errors[page_url]))
+            elif page_url in pages:
+                fetched_urls.append(page_url)
+                listed_urls.extend(post_data['url'] for post_data in pages[page_url][0])
+                yield pages[page_url][0]
+    
+    def _changed_entries(self, page_posts, session):
+        """Listing entries that are new or whose title/excerpt changed.
+
+        Returns (changed entries, whether any entry is new).
+        """
+        from database.models import Post
+        urls = [post_data['url'] for post_data in page_posts]
+        stored = {}
+        if urls:
+            with self.metrics.timer('db'):
+                stored = {
+                    url: (title, excerpt or '')
+                    for url, title, excerpt in session.query(Post.url, Post.title, Post.excerpt)
+                    .filter(Post.url.in_(urls))
+                }
+        
+        changed = []
+        has_new = False
+        for post_data in page_posts:
+            listed = (post_data['title'], post_data.get('excerpt', '') or '')
+            if post_data['url'] not in stored:
+                has_new = True
+                changed.append(post_data)
+            elif stored[post_data['url']] != listed:
+                changed.append(post_data)
+            elif self._run_seen and self._run_seen.get(post_data['url']) == 'new':
+                # Stored this run under another category: keep paginating so
+                # the older pages' posts are linked to this category too
+                has_new = True
+        return changed, has_new
+    
+    def scrape_post(self, post_data, category, session, html=None, content_data=None):
+        """Scrape a single post, using the already fetched HTML or parsed
+        content if given.
+
+        Returns 'new', 'updated', 'unchanged' or 'error'. Existing posts are
+        only written when their content fingerprint changed, and their
+        attachments are diffed by URL instead of being replaced.
+        """
         from database.models import Post, Attachment
         try:
             # Check if post already exists
             existing_post = session.query(Post).filter_by(url=post_data['url']).first()
             
             # Fetch full post content
-            html = self.fetch_page(post_data['url'])
-            content_data = self.parse_post_content(html, post_data['url'])
+            if content_data is None:
+                if html is None:
+                    html = self.fetch_page(post_data['url'])
+                content_data = self.parse_post_content(html, post_data['url'])
+            record = build_post_record(post_data, content_data)
+            attachments = record['attachments']
+            content_hash = record['content_hash']
             
             if existing_post:
+                stored_hash = existing_post.content_hash or post_fingerprint(
+                    existing_post.title,
+                    existing_post.excerpt,
+                    existing_post.content,
+                    existing_post.meta_description,
+                    existing_post.tags,
+                    [
+                        {'file_url': att.file_url, 'file_name': att.file_name, 'file_type': att.file_type}
+                        for att in existing_post.attachments
+                    ]
+                )
+                if stored_hash == content_hash and existing_post.category_type == category.category_type:
+                    if existing_post.content_hash is None:
+                        existing_post.content_hash = content_hash
+                    return 'unchanged'
+                
                 # Update existing post
                 existing_post.title = post_data['title']
                 existing_post.content = content_data['content']
                 existing_post.excerpt = post_data.get('excerpt', '')
                 existing_post.meta_description = content_data['meta_description']
                 existing_post.tags = content_data['tags']
+                existing_post.content_hash = content_hash
                 existing_post.last_modified = datetime.utcnow()
                 existing_post.category_type = category.category_type
                 
-                # Update attachments
-                for attachment in existing_post.attachments:
-                    session.delete(attachment)
+                # Diff attachments by URL
+                current = {att['file_url']: att for att in attachments}
+                for attachment in list(existing_post.attachments):
+                    att_data = current.pop(attachment.file_url, None)
+                    if att_data is None:
+                        session.delete(attachment)
+                    else:
+                        if attachment.file_name != att_data['file_name']:
+                            attachment.file_name = att_data['file_name']
+                        if attachment.file_type != att_data['file_type']:
+                            attachment.file_type = att_data['file_type']
                 
-                for att_data in content_data['attachments']:
+                for att_data in current.values():
                     attachment = Attachment(
                         post_id=existing_post.id,
                         file_url=att_data['file_url'],
@@ -380,13 +944,14 @@ class EOFScraper:
                     publish_date=post_data.get('publish_date'),
                     meta_description=content_data['meta_description'],
                     tags=content_data['tags'],
+                    content_hash=content_hash,
                     category_type=category.category_type
                 )
                 session.add(new_post)
                 session.flush()  # Get the ID
                 
                 # Add attachments
-                for att_data in content_data['attachments']:
+                for att_data in attachments:
                     attachment = Attachment(
                         post_id=new_post.id,
                         file_url=att_data['file_url'],
@@ -401,9 +966,545 @@ class EOFScraper:
             self.logger.error(f"Error scraping post {post_data.get('url', 'unknown')}: {str(e)}")
             return 'error'
     
-    def run_full_scrape(self):
-        """Run a full scrape of all categories"""
-        from database.models import Category, ScrapeLog
+    def subcategory_url(self, cat_slug, subcat_slug):
+        """Build correct subcategory URL based on parent category"""
+        if cat_slug == 'farmaka':
+            return f"/category/farmaka/{subcat_slug}/"
+        # For other categories, subcategories might be under the main category
+        # We'll need to check the actual structure on the website
+        return f"/category/{cat_slug}/{subcat_slug}/"
+    
+    def category_targets(self):
+        """All categories and subcategories to scrape, parents first.
+
+        Returns a list of (slug, name, url, parent slug, category type).
+        """
+        targets = []
+        for cat_slug, cat_info in self.categories.items():
+            targets.append((cat_slug, cat_info['name'], cat_info['url'], None, cat_info.get('type')))
+            for subcat_slug, subcat_name in cat_info.get('subcategories', {}).items():
+                targets.append((subcat_slug, subcat_name, self.subcategory_url(cat_slug, subcat_slug),
+                                cat_slug, cat_info.get('type')))
+        return targets
+    
+    def discover_from_feed(self, session):
+        """New and changed posts since the last run, grouped by category.
+
+        Returns (dict of category slug -> listing entries, new cursor), or
+        None when the feed is unavailable or has no cursor yet; the caller
+        then crawls the HTML listings. Only categories under /category/
+        exist in WordPress, so only those are covered by the feed. A post in
+        several categories is assigned to its most specific one.
+        """
+        from database.models import DiscoveryCursor
+        feed = FeedDiscovery(self.get, self.base_url, self.logger)
+        state = session.query(DiscoveryCursor).filter_by(name='wp-rest-posts').first()
+        
+        try:
+            if state is None or not state.cursor:
+                # First run: remember where the feed is now and crawl once
+                cursor = feed.latest_cursor()
+                if cursor:
+                    if state is None:
+                        session.add(DiscoveryCursor(name='wp-rest-posts', cursor=cursor))
+                    else:
+                        state.cursor = cursor
+                    session.commit()
+                return None
+            entries, cursor = feed.discover(state.cursor)
+        except FeedUnavailable as e:
+            self.logger.warning(f"Feed discovery unavailable, crawling listings instead: {str(e)}")
+            return None
+        
+        targets = [target for target in self.category_targets() if target[2].startswith('/category/')]
+        subcategories = {target[0] for target in targets if target[3]}
+        main_categories = {target[0] for target in targets if not target[3]}
+        groups = {target[0]: [] for target in targets}
+        for entry in entries:
+            slug = next((slug for slug in entry['categories'] if slug in subcategories), None) or \
+                next((slug for slug in entry['categories'] if slug in main_categories), None)
+            if slug:
+                groups[slug].append(entry)
+            else:
+                self.logger.info(f"Feed post {entry['url']} is not in a scraped category")
+        return groups, cursor
+    
+    def scrape_discovered_posts(self, category_slug, category_name, category_url, parent_category=None,
+                                category_type=None, entries=()):
+        """Fetch and persist posts found by feed discovery for a category"""
+        session = self.db_manager.get_session()
+        
+        try:
+            full_url = urljoin(self.base_url, category_url)
+            category = self._get_or_create_category(
+                session, category_slug, category_name, full_url, parent_category, category_type
+            )
+            if not entries:
+                return 0, 0, 0
+            
+            posts_scraped, posts_new, posts_updated = self._scrape_posts(list(entries), category, session)
+            with self.metrics.timer('db'):
+                self._link_feed_categories(session, entries, category)
+                session.commit()
+            self.logger.info(f"Category {category_name} (feed): {posts_scraped} scraped, {posts_new} new, {posts_updated} updated")
+            
+            return posts_scraped, posts_new, posts_updated
+            
+        except Exception as e:
+            session.rollback()
+            self.logger.error(f"Error scraping feed posts of {category_name}: {str(e)}")
+            raise
+        finally:
+            session.close()
+    
+    def _link_feed_categories(self, session, entries, category):
+        """Link feed posts to every stored category the feed lists them in"""
+        from database.models import Category
+        slugs = {slug for entry in entries for slug in entry.get('categories', [])}
+        category_ids = dict(
+            session.query(Category.slug, Category.id).filter(Category.slug.in_(slugs)).all()
+        ) if slugs else {}
+        link_post_categories(session, {
+            entry['url']: {category.id} | {category_ids[slug] for slug in entry.get('categories', [])
+                                           if slug in category_ids}
+            for entry in entries
+        })
+    
+    def backfill_category(self, category_slug, category_name, category_url, parent_category=None,
+                          category_type=None, should_stop=None, max_pages=None):
+        """Crawl a category's full history, resuming from its checkpoint.
+
+        Listing pages are walked from the page after the last completed one
+        until the last page. The checkpoint is advanced once a page's new or
+        changed posts are committed, so a crash or ``should_stop()``
+        returning True redoes at most the current page; its posts that were
+        already committed are skipped as unchanged.
+        Returns (scraped, new, updated, completed).
+        """
+        from database.models import ScrapeCheckpoint
+        should_stop = should_stop or (lambda: False)
+        session = self.db_manager.get_session()
+        
+        try:
+            full_url = urljoin(self.base_url, category_url)
+            category = self._get_or_create_category(
+                session, category_slug, category_name, full_url, parent_category, category_type
+            )
+            checkpoint = session.query(ScrapeCheckpoint).filter_by(category_slug=category_slug).first()
+            if not checkpoint:
+                checkpoint = ScrapeCheckpoint(category_slug=category_slug, last_page=0, completed=False)
+                session.add(checkpoint)
+                session.commit()
+            
+            posts_scraped = 0
+            posts_new = 0
+            posts_updated = 0
+            if checkpoint.completed:
+                self.logger.info(f"Backfill of {category_name} already completed")
+                return posts_scraped, posts_new, posts_updated, True
+            
+            page = checkpoint.last_page + 1
+            last_page = None
+            self.logger.info(f"Backfilling category: {category_name} from page {page}")
+            
+            while max_pages is None or page <= max_pages:
+                if should_stop():
+                    self.logger.info(f"Backfill of {category_name} stopped after page {checkpoint.last_page}")
+                    return posts_scraped, posts_new, posts_updated, False
+                if last_page is not None and page > last_page:
+                    break
+                
+                page_url = full_url if page == 1 else urljoin(full_url, f"page/{page}/")
+                try:
+                    html = self.fetch_page_conditional(page_url, use_validators=False)
+                except Exception as e:
+                    if not self._is_not_found(e):
+                        raise
+                    break
+                # Backfilled listing pages are not fetched conditionally later
+                self.validators.discard([page_url])
+                posts, pagination_urls = self.parse_listing(html, page_url)
+                if not posts:
+                    break
+                # Pagination links always include the last page
+                last_page = max([page] + [page_number(url)[0] for url in pagination_urls])
+                
+                changed, _ = self._changed_entries(posts, session)
+                scraped, new, updated = self._scrape_posts(changed, category, session)
+                posts_scraped += scraped
+                posts_new += new
+                posts_updated += updated
+                
+                link_post_categories(session, {post_data['url']: [category.id] for post_data in posts})
+                checkpoint.last_page = page
+                session.commit()
+                self.logger.info(f"Backfill {category_name}: page {page}/{last_page} done, {new} new posts")
+                page += 1
+            else:
+                # Stopped by max_pages, more history is left
+                return posts_scraped, posts_new, posts_updated, False
+            
+            checkpoint.completed = True
+            session.commit()
+            self.logger.info(f"Backfill of {category_name} completed at page {checkpoint.last_page}")
+            return posts_scraped, posts_new, posts_updated, True
+            
+        except Exception as e:
+            session.rollback()
+            self.logger.error(f"Error backfilling category {category_name}: {str(e)}")
+            raise
+        finally:
+            session.close()
+    
+    def _is_not_found(self, error):
+        """Whether a fetch error is a 404"""
+        response = getattr(error, 'response', None)
+        return response is not None and response.status_code == 404
+    
+    def run_backfill(self, should_stop=None, max_pages=None):
+        """Backfill the full history of every category and subcategory.
+
+        Safe to interrupt: the next call resumes each category from its
+        checkpoint and skips categories that are already complete. Returns
+        True when every category has been backfilled. Raises
+        ``LeaseUnavailable`` while another scrape or backfill is running.
+        """
+        from database.models import Category
+        stop = should_stop or (lambda: False)
+        # Losing the lease stops the backfill like a stop request
+        should_stop = lambda: stop() or self.lease.lost
+        total_new = 0
+        all_completed = True
+        
+        try:
+            self.lease.acquire()
+            for slug, name, url, parent_slug, category_type in self.category_targets():
+                if should_stop():
+                    all_completed = False
+                    break
+                
+                parent_category = None
+                if parent_slug:
+                    session = self.db_manager.get_session()
+                    try:
+                        parent_category = session.query(Category).filter_by(slug=parent_slug).first()
+                    finally:
+                        session.close()
+                
+                try:
+                    _, new, _, completed = self.backfill_category(
+                        slug, name, url, parent_category, category_type,
+                        should_stop=should_stop, max_pages=max_pages
+                    )
+                    total_new += new
+                    all_completed = all_completed and completed
+                except Exception as e:
+                    self.logger.error(f"Error in backfill of {slug}: {str(e)}")
+                    all_completed = False
+        finally:
+            self.validators.discard()
+            self.lease.release()
+            self.close()
+        
+        self.logger.info(f"Backfill run finished: {total_new} new posts, "
+                         f"{'all categories complete' if all_completed else 'more to do'}")
+        return all_completed
+    
+    def _scrape_target(self, slug, name, url, parent_category, category_type, incremental, feed_groups,
+                       selected=None):
+        """Scrape one category from feed results if it has them, else crawl
+        it if it is selected. Its work is recorded in the run metrics."""
+        if feed_groups is not None and slug in feed_groups:
+            if not feed_groups[slug]:
+                return self.scrape_discovered_posts(slug, name, url, parent_category, category_type)
+            scrape = partial(self.scrape_discovered_posts, slug, name, url, parent_category, category_type,
+                             feed_groups[slug])
+        elif selected is not None and slug not in selected:
+            return 0, 0, 0
+        else:
+            scrape = partial(self.scrape_category, slug, name, url, parent_category, category_type,
+                             incremental=incremental)
+        with self.metrics.category(slug):
+            scraped, new, updated = scrape()
+            self.metrics.record_posts(slug, scraped, new, updated)
+        return scraped, new, updated
+    
+    def _scrape_targets(self, session, targets, incremental, feed_groups, selected, errors, workers=1):
+        """Scrape categories, with ``workers`` of them in parallel.
+
+        Each worker is a scraper of its own (see ``_category_worker``) with
+        its own DB session, taking the next category once it is done with
+        one. Failed categories are queued for a retry at the end of the run.
+        Returns (scraped, new, updated).
+        """
+        workers = min(workers, len(targets))
+        totals = [0, 0, 0]
+        if workers <= 1:
+            # Categories are scraped parents first, so subcategories can be linked to them
+            for target in targets:
+                self.lease.check()
+                self._add_target_counts(totals, self, session, target, incremental, feed_groups, selected, errors)
+            return tuple(totals)
+        
+        # Parents are created up front, so every worker can link subcategories to them
+        for slug, name, url, parent_slug, category_type in targets:
+            if not parent_slug:
+                self._get_or_create_category(session, slug, name, urljoin(self.base_url, url), None, category_type)
+        
+        pending = queue.Queue()
+        for target in targets:
+            pending.put(target)
+        lock = threading.Lock()
+        
+        def work():
+            worker = self._category_worker()
+            worker_session = self.db_manager.get_session()
+            try:
+                while not self.lease.lost:
+                    try:
+                        target = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    counts = [0, 0, 0]
+                    self._add_target_counts(counts, worker, worker_session, target, incremental, feed_groups,
+                                            selected, errors)
+                    with lock:
+                        for index, count in enumerate(counts):
+                            totals[index] += count
+            finally:
+                worker_session.close()
+                self.metrics.merge(worker.metrics)
+        
+        self.logger.info(f"Scraping {len(targets)} categories with {workers} workers")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='category') as executor:
+            for future in [executor.submit(work) for _ in range(workers)]:
+                future.result()
+        self.lease.check()
+        return tuple(totals)
+    
+    def _add_target_counts(self, totals, scraper, session, target, incremental, feed_groups, selected, errors):
+        """Scrape one category with ``scraper`` (this one or a worker),
+        adding its counts to ``totals`` or queueing it for a retry"""
+        slug, name, url, parent_slug, category_type = target
+        try:
+            counts = scraper._scrape_target(
+                slug, name, url, scraper._parent_category(session, parent_slug), category_type,
+                incremental, feed_groups, selected
+            )
+        except Exception as e:
+            self._defer_category(target, e, errors)
+            return
+        for index, count in enumerate(counts):
+            totals[index] += count
+    
+    def _category_worker(self):
+        """Scraper for a parallel category worker.
+
+        It has its own HTTP session, fetcher and metrics, and shares the
+        run state, validators, HTML archive, parse workers, request rate
+        limit and per-host limits with this scraper, so the workers together
+        send no more to a host than a single scraper.
+        """
+        worker = EOFScraper(
+            self.db_manager, self.logger, max_concurrency=self.host_limiter.max_per_host,
+            request_delay=self.host_limiter.delay, parser_backend=self.parser_backend, discovery=self.discovery
+        )
+        worker.base_url = self.base_url
+        worker.categories = self.categories
+        worker.commit_chunk_size = self.commit_chunk_size
+        worker.validators = self.validators
+        worker.archive = self.archive
+        worker.rate_limiter = self.rate_limiter
+        worker.host_limiter = self.host_limiter
+        worker.parse_workers = self.parse_workers
+        worker._parse_pool = self._get_parse_pool()
+        worker._run_seen = self._run_seen
+        worker._retry_queue = self._retry_queue
+        worker._failed_before = self._failed_before
+        for adapter in self._transports:
+            worker.mount_transport(adapter)
+        return worker
+    
+    def _parent_category(self, session, parent_slug):
+        from database.models import Category
+        if not parent_slug:
+            return None
+        return session.query(Category).filter_by(slug=parent_slug).first()
+    
+    def _defer_category(self, target, error, errors):
+        """Queue a failed category for a retry at the end of the run, or
+        record the error if it is out of attempts"""
+        slug, parent_slug = target[0], target[3]
+        error_msg = f"Error in {'subcategory' if parent_slug else 'category'} {slug}: {str(error)}"
+        if self._retry_queue.add(slug, 'category', target, error):
+            self.logger.warning(f"{error_msg}; retrying at the end of the run")
+        else:
+            self.logger.error(error_msg)
+            errors.append(error_msg)
+    
+    def _add_listing_retry_counts(self, totals, payload, errors):
+        """Retry failed listing pages (see ``_retry_listing_pages``), adding
+        the results to ``totals``"""
+        try:
+            counts = self._retry_listing_pages(*payload)
+        except Exception as e:
+            error_msg = f"Error retrying listing page {payload[1][0]}: {str(e)}"
+            self.logger.error(error_msg)
+            errors.append(error_msg)
+            return
+        for index, count in enumerate(counts):
+            totals[index] += count
+    
+    def _retry_posts(self, category_id, entries):
+        """Fetch and persist posts whose earlier fetch failed; failures are
+        queued again by ``_scrape_posts``"""
+        from database.models import Category
+        session = self.db_manager.get_session()
+        try:
+            category = session.get(Category, category_id) if category_id else None
+            if category is None:
+                self.logger.warning(f"Dropping {len(entries)} failed posts of a deleted category")
+                clear_failed_posts(session, [entry['url'] for entry in entries])
+                session.commit()
+                return 0, 0, 0
+            scraped, new, updated = self._scrape_posts(entries, category, session)
+            with self.metrics.timer('db'):
+                link_post_categories(session, {entry['url']: [category.id] for entry in entries})
+                session.commit()
+            return scraped, new, updated
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
+    def _retry_saved_posts(self, errors):
+        """Retry the posts saved as failed by earlier runs"""
+        session = self.db_manager.get_session()
+        try:
+            saved = load_failed_posts(session)
+        finally:
+            session.close()
+        if not saved:
+            return 0, 0, 0
+        
+        self.logger.info(f"Retrying {len(saved)} posts and listing pages that failed in earlier runs")
+        self._failed_before = {url: attempts for url, _, _, attempts in saved}
+        groups = {}
+        listing_pages = []
+        for url, category_id, entry, _ in saved:
+            if 'listing_pages' in entry:
+                listing_pages.append((category_id, entry['listing_pages'], entry.get('incremental', True)))
+            else:
+                groups.setdefault(category_id, []).append(entry)
+        
+        totals = [0, 0, 0]
+        with self.metrics.category('retries'):
+            for payload in listing_pages:
+                self.metrics.record_retry()
+                self._add_listing_retry_counts(totals, payload, errors)
+            for category_id, entries in groups.items():
+                for _ in entries:
+                    self.metrics.record_retry()
+                self._add_retry_counts(totals, category_id, entries, errors)
+        return tuple(totals)
+    
+    def _add_retry_counts(self, totals, category_id, entries, errors):
+        """Retry posts of a category, adding the results to ``totals``"""
+        try:
+            counts = self._retry_posts(category_id, entries)
+        except Exception as e:
+            error_msg = f"Error retrying {len(entries)} failed posts: {str(e)}"
+            self.logger.error(error_msg)
+            errors.append(error_msg)
+            return
+        for index, count in enumerate(counts):
+            totals[index] += count
+    
+    def _run_deferred_retries(self, session, incremental, feed_groups, selected, errors):
+        """Retry the categories and posts that failed during this run until
+        they succeed or run out of attempts, then save the posts that still
+        fail for the next run. Returns (scraped, new, updated)."""
+        totals = [0, 0, 0]
+        with self.metrics.category('retries'):
+            while len(self._retry_queue):
+                self.lease.check()
+                posts = {}
+                for item in self._retry_queue.take():
+                    self.metrics.record_retry()
+                    if item['kind'] == 'post':
+                        category_id, post_data = item['payload']
+                        posts.setdefault(category_id, []).append(post_data)
+                        continue
+                    if item['kind'] == 'page':
+                        self._add_listing_retry_counts(totals, item['payload'], errors)
+                        continue
+                    slug, name, url, parent_slug, category_type = item['payload']
+                    try:
+                        counts = self._scrape_target(
+                            slug, name, url, self._parent_category(session, parent_slug), category_type,
+                            incremental, feed_groups, selected
+                        )
+                    except Exception as e:
+                        self._defer_category(item['payload'], e, errors)
+                        continue
+                    for index, count in enumerate(counts):
+                        totals[index] += count
+                for category_id, entries in posts.items():
+                    self._add_retry_counts(totals, category_id, entries, errors)
+        
+        for item in self._retry_queue.exhausted:
+            if item['kind'] == 'page':
+                # Posts of the page are missing from this run
+                errors.append(f"Error fetching listing page {item['key']}: {item['error']}")
+        failed_posts = [item for item in self._retry_queue.exhausted if item['kind'] in ('post', 'page')]
+        if failed_posts:
+            saved = save_failed_posts(session, failed_posts, SCRAPER_CONFIG['failed_fetch_max_attempts'])
+            self.logger.warning(f"{len(failed_posts)} posts and listing pages could not be fetched, "
+                                f"{saved} saved for the next run")
+        return tuple(totals)
+    
+    def _save_run_metrics(self, session, scrape_log):
+        """Add the per-category metrics of the run to its scrape log"""
+        from database.models import ScrapeLogCategory
+        for row in self.metrics.rows():
+            session.add(ScrapeLogCategory(scrape_log_id=scrape_log.id, **row))
+    
+    def run_full_scrape(self, incremental=True, categories=None, workers=None):
+        """Run a scrape of all categories.
+
+        Incremental by default; pass ``incremental=False`` for a full
+        re-crawl (see ``scrape_category``). Incremental runs use feed
+        discovery when enabled and available, and crawl the listings of
+        categories the feed cannot cover.
+
+        ``categories`` limits the crawl to the given category and
+        subcategory slugs (see ``scraper.polling``). Feed results are
+        stored for every category, since the feed covers them all in one
+        request.
+
+        Categories are scraped by ``workers`` parallel workers (default
+        ``SCRAPER_CONFIG['category_workers']``), see ``_scrape_targets``.
+
+        Failed fetches are not retried in place: failed categories, listing
+        pages and posts are retried at the end of the run with a backoff,
+        and pages and posts that still fail are retried first on the next
+        run (see
+        ``scraper.retry_queue``).
+
+        Runs hold the scrape lease (see ``scraper.lease``), so only one runs
+        at a time across processes and hosts; ``LeaseUnavailable`` is raised
+        while another run holds it.
+
+        Returns the id of the run's ``ScrapeLog``.
+        """
+        if workers is None:
+            workers = SCRAPER_CONFIG['category_workers']
+        with self.lease:
+            return self._run_full_scrape(incremental, categories, workers)
+    
+    def _run_full_scrape(self, incremental, categories, workers):
+        from database.models import Category, DiscoveryCursor, ScrapeLog
         start_time = datetime.utcnow()
         session = self.db_manager.get_session()
         
@@ -416,52 +1517,46 @@ class EOFScraper:
         total_new = 0
         total_updated = 0
         errors = []
+        self._run_seen = {}
+        self.metrics = ScrapeMetrics()
+        self._retry_queue = DeferredRetryQueue(
+            SCRAPER_CONFIG['retry_attempts'], SCRAPER_CONFIG['retry_backoff_seconds'], logger=self.logger
+        )
         
         try:
-            # Scrape main categories
-            for cat_slug, cat_info in self.categories.items():
-                try:
-                    scraped, new, updated = self.scrape_category(
-                        cat_slug, 
-                        cat_info['name'], 
-                        cat_info['url'],
-                        category_type=cat_info.get('type')
-                    )
-                    total_scraped += scraped
-                    total_new += new
-                    total_updated += updated
-                    
-                    # Scrape subcategories
-                    parent_cat = session.query(Category).filter_by(slug=cat_slug).first()
-                    for subcat_slug, subcat_name in cat_info.get('subcategories', {}).items():
-                        # Build correct subcategory URL based on parent category
-                        if cat_slug == 'farmaka':
-                            subcat_url = f"/category/farmaka/{subcat_slug}/"
-                        else:
-                            # For other categories, subcategories might be under the main category
-                            # We'll need to check the actual structure on the website
-                            subcat_url = f"/category/{cat_slug}/{subcat_slug}/"
-                        
-                        try:
-                            scraped, new, updated = self.scrape_category(
-                                subcat_slug,
-                                subcat_name,
-                                subcat_url,
-                                parent_cat,
-                                category_type=cat_info.get('type')
-                            )
-                            total_scraped += scraped
-                            total_new += new
-                            total_updated += updated
-                        except Exception as e:
-                            error_msg = f"Error in subcategory {subcat_slug}: {str(e)}"
-                            self.logger.error(error_msg)
-                            errors.append(error_msg)
-                    
-                except Exception as e:
-                    error_msg = f"Error in category {cat_slug}: {str(e)}"
-                    self.logger.error(error_msg)
-                    errors.append(error_msg)
+            selected = set(categories) if categories is not None else None
+            feed = None
+            if incremental and self.discovery == 'feed' and (selected is None or any(
+                slug in selected and url.startswith('/category/')
+                for slug, _, url, _, _ in self.category_targets()
+            )):
+                with self.metrics.category('feed-discovery'):
+                    feed = self.discover_from_feed(session)
+            feed_groups = feed[0] if feed else None
+            
+            # Posts that still failed at the end of earlier runs go first
+            scraped, new, updated = self._retry_saved_posts(errors)
+            total_scraped += scraped
+            total_new += new
+            total_updated += updated
+            
+            scraped, new, updated = self._scrape_targets(
+                session, self.category_targets(), incremental, feed_groups, selected, errors, workers
+            )
+            total_scraped += scraped
+            total_new += new
+            total_updated += updated
+            
+            # Failed categories and posts, now that their backoff has (mostly) passed
+            scraped, new, updated = self._run_deferred_retries(session, incremental, feed_groups, selected, errors)
+            total_scraped += scraped
+            total_new += new
+            total_updated += updated
+            
+            # Only move the feed cursor once every discovered post is stored
+            if feed and not errors:
+                state = session.query(DiscoveryCursor).filter_by(name='wp-rest-posts').first()
+                state.cursor = feed[1]
             
             # Update scrape log
             end_time = datetime.utcnow()
@@ -477,12 +1572,34 @@ class EOFScraper:
             
             self.logger.info(f"Scrape complete: {total_scraped} posts, {total_new} new, {total_updated} updated")
             
+            # Attachments are probed and their text extracted by a job of
+            # their own (see scheduler.py), not here, so the scrape does not
+            # wait for them while holding the lease
+            try:
+                with self.metrics.category('recall-index'):
+                    self.index_recall_entities()
+            except Exception as e:
+                self.logger.warning(f"Recall entity indexing failed: {str(e)}")
+            self.prune_archive()
+            
+            self._save_run_metrics(session, scrape_log)
+            session.commit()
+            return scrape_log.id
+            
         except Exception as e:
+            session.rollback()
             scrape_log.status = 'failed'
             scrape_log.errors = str(e)
+            self._save_run_metrics(session, scrape_log)
             session.commit()
             self.logger.error(f"Scrape failed: {str(e)}")
             raise
         finally:
+            # Validators of pages whose data was not stored, e.g. failed posts
+            self.validators.discard()
+            self._run_seen = None
+            self._retry_queue = None
+            self._failed_before = {}
             session.close()
+            self.close()
 
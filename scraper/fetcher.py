@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+class RequestRateLimiter:
+    """Caps the request rate over every thread that shares it.
+
+    Request starts are spaced at least ``1 / rate`` seconds apart, so
+    parallel category workers with their own fetchers together stay under
+    ``rate`` requests per second. A rate of 0 disables the cap.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self):
+        """Block until the caller may start its request"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class HostLimiter:
+    """Per-host politeness limits over every thread that shares it.
+
+    At most ``max_per_host`` requests to a host are in flight at once and
+    request starts to the same host are spaced at least ``delay`` seconds
+    apart, however many fetchers, pipeline stages and category workers
+    send them.
+    """
+
+    def __init__(self, max_per_host=4, delay=0.25):
+        self.max_per_host = max(1, int(max_per_host))
+        self.delay = max(0.0, float(delay))
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host_state(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (
+                    threading.BoundedSemaphore(self.max_per_host),
+                    RequestRateLimiter(1.0 / self.delay if self.delay else 0),
+                )
+            return self._hosts[host]
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one of the host's request slots, taken once its delay has passed"""
+        semaphore, spacing = self._host_state(url)
+        with semaphore:
+            spacing.wait()
+            yield
+
+
+class AsyncFetcher:
+    """Concurrent page fetcher built on asyncio.
+
+    The actual HTTP call is the scraper's blocking fetch function, run on a
+    thread pool. The event loop only schedules requests, so each host gets
+    at most ``max_per_host`` requests in flight and request starts to the
+    same host are spaced at least ``delay`` seconds apart.
+    """
+
+    def __init__(self, fetch_func, max_per_host=4, delay=0.25, logger=None):
+        self.fetch_func = fetch_func
+        self.max_per_host = max(1, int(max_per_host))
+        self.delay = max(0.0, float(delay))
+        self.logger = logger or logging.getLogger(__name__)
+        self._executor = None
+        self._semaphores = {}
+        self._locks = {}
+        self._next_start = {}
+
+    def _host_state(self, url):
+        host = urlparse(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_per_host)
+            self._locks[host] = asyncio.Lock()
+            self._next_start[host] = 0.0
+        return host
+
+    async def _wait_turn(self, host):
+        """Sleep until the politeness delay for this host has elapsed"""
+        async with self._locks[host]:
+            now = time.monotonic()
+            wait = self._next_start[host] - now
+            self._next_start[host] = max(now, self._next_start[host]) + self.delay
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def fetch(self, url, fetch_func=None, parse_func=None, parse_executor=None):
+        """Fetch a single URL, respecting the per-host limits.
+
+        If ``parse_func`` is given, a non-None result is passed through it
+        on ``parse_executor`` (e.g. a process pool) once the request slot
+        has been released, so parsing overlaps with further fetching.
+        """
+        host = self._host_state(url)
+        loop = asyncio.get_running_loop()
+        async with self._semaphores[host]:
+            await self._wait_turn(host)
+            result = await loop.run_in_executor(self._executor, fetch_func or self.fetch_func, url)
+        if parse_func is None or result is None:
+            return result
+        return await loop.run_in_executor(parse_executor, parse_func, result)
+
+    async def fetch_many(self, urls, fetch_func=None, parse_func=None, parse_executor=None):
+        """Fetch all URLs concurrently.
+
+        Returns a dict mapping each URL to its result, or to the exception
+        raised while fetching it.
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(
+            *(self.fetch(url, fetch_func, parse_func, parse_executor) for url in unique_urls),
+            return_exceptions=True
+        )
+        action = 'fetching' if parse_func is None else 'fetching/parsing'
+        for url, result in zip(unique_urls, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"Error {action} {url}: {str(result)}")
+        return dict(zip(unique_urls, results))
+
+    def fetch_all(self, urls, fetch_func=None, parse_func=None, parse_executor=None):
+        """Synchronous entry point: fetch all URLs and wait for the results.
+
+        ``fetch_func`` overrides the default fetch function for this call;
+        ``parse_func`` and ``parse_executor`` are passed on to ``fetch``.
+        """
+        if not urls:
+            return {}
+        return asyncio.run(self._run(urls, fetch_func, parse_func, parse_executor))
+
+    async def _run(self, urls, fetch_func, parse_func, parse_executor):
+        # Semaphores and locks are bound to the running loop, so each
+        # synchronous call starts from fresh per-host state
+        self._semaphores = {}
+        self._locks = {}
+        self._next_start = {}
+        hosts = {urlparse(url).netloc for url in urls}
+        workers = self.max_per_host * max(1, len(hosts))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fetch') as executor:
+            self._executor = executor
+            try:
+                return await self.fetch_many(urls, fetch_func, parse_func, parse_executor)
+            finally:
+                self._executor = None
@@ -0,0 +1,23 @@
+import hashlib
+import json
+
+
+def post_fingerprint(title, excerpt, content, meta_description, tags, attachments):
+    """SHA-256 fingerprint of everything the scraper stores for a post.
+
+    ``attachments`` is a list of dicts with file_url, file_name and
+    file_type; their order does not affect the fingerprint.
+    """
+    payload = {
+        'title': title or '',
+        'excerpt': excerpt or '',
+        'content': content or '',
+        'meta_description': meta_description or '',
+        'tags': tags or '',
+        'attachments': sorted(
+            [att['file_url'], att.get('file_name') or '', att.get('file_type') or '']
+            for att in attachments
+        ),
+    }
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
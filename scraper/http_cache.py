@@ -0,0 +1,131 @@
+import threading
+from datetime import datetime
+
+from scraper.writer import _dialect_insert
+
+
+class ValidatorStore:
+    """Persistent ETag/Last-Modified store for conditional GET requests.
+
+    Validators are loaded from the ``http_validators`` table on first use.
+    Validators seen on fresh responses are kept as pending until ``stage``
+    is called with the scraper's session, so they are only saved in the
+    same transaction as the data parsed from those responses.
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._validators = None
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """(Re)load all stored validators from the database"""
+        from database.models import HttpValidator
+        session = self.db_manager.get_session()
+        try:
+            rows = session.query(HttpValidator.url, HttpValidator.etag, HttpValidator.last_modified).all()
+            validators = {url: (etag, last_modified) for url, etag, last_modified in rows}
+        finally:
+            session.close()
+        with self._lock:
+            self._validators = validators
+
+    def request_headers(self, url):
+        """Conditional request headers for a URL, empty if nothing is stored"""
+        if self._validators is None:
+            self.load()
+        etag, last_modified = self._validators.get(url, (None, None))
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def remember(self, url, response):
+        """Keep the validators of a fresh response until they are staged"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self._pending[url] = (etag, last_modified)
+
+    def discard(self, urls=None):
+        """Forget pending validators that will not be staged, those of
+        ``urls`` or all of them"""
+        with self._lock:
+            if urls is None:
+                self._pending.clear()
+            else:
+                for url in urls:
+                    self._pending.pop(url, None)
+
+    def stage(self, session, urls):
+        """Add the pending validators for ``urls`` to ``session``.
+
+        The caller commits the session together with the data parsed from
+        these URLs. The recall watcher and parallel category workers may
+        stage the same URL at the same time, so rows are written with one
+        ``INSERT ... ON CONFLICT (url) DO UPDATE`` where the database
+        supports it.
+        """
+        from database.models import HttpValidator
+        with self._lock:
+            staged = {url: self._pending.pop(url) for url in set(urls) if url in self._pending}
+        if not staged:
+            return
+
+        insert = _dialect_insert(session)
+        if insert is not None:
+            now = datetime.utcnow()
+            stmt = insert(HttpValidator.__table__).values([
+                {'url': url, 'etag': etag, 'last_modified': last_modified, 'updated_at': now}
+                for url, (etag, last_modified) in staged.items()
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['url'],
+                set_={
+                    'etag': stmt.excluded.etag,
+                    'last_modified': stmt.excluded.last_modified,
+                    'updated_at': stmt.excluded.updated_at,
+                }
+            )
+            session.execute(stmt)
+        else:
+            existing = {
+                row.url: row
+                for row in session.query(HttpValidator).filter(HttpValidator.url.in_(list(staged)))
+            }
+            for url, (etag, last_modified) in staged.items():
+                row = existing.get(url)
+                if row is None:
+                    session.add(HttpValidator(url=url, etag=etag, last_modified=last_modified))
+                else:
+                    row.etag = etag
+                    row.last_modified = last_modified
+
+        with self._lock:
+            if self._validators is not None:
+                self._validators.update(staged)
+
+
+class MemoryValidatorStore(ValidatorStore):
+    """Validator store that is never saved to ``http_validators``.
+
+    ``stage`` only makes the pending validators of ``urls`` the ones sent
+    on the next request; the session argument is ignored.
+    """
+
+    def __init__(self):
+        super().__init__(None)
+        self._validators = {}
+
+    def load(self):
+        pass
+
+    def stage(self, session, urls):
+        with self._lock:
+            staged = {url: self._pending.pop(url) for url in set(urls) if url in self._pending}
+            self._validators.update(staged)
@@ -0,0 +1,163 @@
+"""
+Bulk check of a pharmacy inventory against recalls.
+
+``RecallInventoryIndex`` loads the recalled lots and products of the recall
+entity index (see ``scraper/entities.py``) into dicts, so every inventory
+line is matched with a couple of dict lookups. ``read_inventory`` turns an
+uploaded CSV or NDJSON file into (line number, product, lot) items one
+line at a time, so uploads of any size are checked in a single pass.
+"""
+import csv
+import io
+import itertools
+import json
+import re
+
+from sqlalchemy import func, select
+
+from scraper.entities import LOT, PRODUCT, normalize_lot, normalize_name, strip_strength
+
+PRODUCT_COLUMNS = ('product', 'product_name', 'name', 'description', 'προϊόν', 'προιον', 'ονομασία', 'ονομασια',
+                   'περιγραφή', 'περιγραφη')
+LOT_COLUMNS = ('lot', 'lot_number', 'batch', 'batch_number', 'παρτίδα', 'παρτιδα', 'αρ. παρτίδας')
+
+
+def _column_key(name):
+    """Column name as compared with the names above: case, spaces,
+    underscores and hyphens do not matter, so "Batch Number" is a lot column"""
+    return re.sub(r'[\s_\-]+', '_', str(name).strip().lower())
+
+
+_PRODUCT_KEYS = tuple(_column_key(name) for name in PRODUCT_COLUMNS)
+_LOT_KEYS = tuple(_column_key(name) for name in LOT_COLUMNS)
+
+
+def _product_key(value):
+    """Product lookup key without the strength, so "ZANTAC" and
+    "Zantac 150mg" both find the recalled "ZANTAC 150MG" """
+    return normalize_name(strip_strength(value)) or normalize_name(value)
+
+
+class RecallInventoryIndex:
+    """In-memory index of recalled lots and products.
+
+    ``version`` identifies the state of the recall entity index it was
+    built from; ``is_current`` tells whether it needs rebuilding.
+    """
+
+    def __init__(self, lots, products, posts, version):
+        self.lots = lots
+        self.products = products
+        self.posts = posts
+        self.version = version
+
+    @staticmethod
+    def current_version(session):
+        from database.models import RecallIndexState
+        count, last_indexed = session.execute(
+            select(func.count(RecallIndexState.id), func.max(RecallIndexState.indexed_at))
+        ).one()
+        return count, last_indexed
+
+    @classmethod
+    def load(cls, session):
+        from database.models import Post, RecallEntity
+        version = cls.current_version(session)
+        lots = {}
+        products = {}
+        for post_id, entity_type, value in session.execute(
+            select(RecallEntity.post_id, RecallEntity.entity_type, RecallEntity.value)
+            .where(RecallEntity.entity_type.in_([LOT, PRODUCT]))
+        ):
+            if entity_type == LOT:
+                lots.setdefault(normalize_lot(value), set()).add(post_id)
+            else:
+                products.setdefault(_product_key(value), set()).add(post_id)
+
+        post_ids = set().union(*lots.values(), *products.values())
+        posts = {}
+        for post_id, title, url, publish_date in session.execute(
+            select(Post.id, Post.title, Post.url, Post.publish_date).where(Post.id.in_(list(post_ids)))
+        ):
+            posts[post_id] = {
+                'post_id': post_id,
+                'title': title,
+                'url': url,
+                'publish_date': publish_date.isoformat() if publish_date else None,
+            }
+        return cls(lots, products, posts, version)
+
+    def is_current(self, session):
+        return self.current_version(session) == self.version
+
+    def match(self, product=None, lot=None):
+        """Recalls concerning an inventory item, as (match type, post) pairs.
+
+        The match type is 'lot_and_product' when both agree, 'lot' when
+        only the lot number does, and 'product' when the product was
+        recalled but not (or not known to be) this lot.
+        """
+        lot_posts = self.lots.get(normalize_lot(lot), set()) if lot else set()
+        product_posts = self.products.get(_product_key(product), set()) if product else set()
+
+        matches = []
+        for post_id in sorted(lot_posts | product_posts, reverse=True):
+            if post_id in lot_posts:
+                match_type = 'lot_and_product' if post_id in product_posts else 'lot'
+            else:
+                match_type = 'product'
+            matches.append((match_type, self.posts[post_id]))
+        return matches
+
+
+def _column(header, keys):
+    for index, column in enumerate(header):
+        if _column_key(column) in keys:
+            return index
+    return None
+
+
+def read_inventory(binary_file, ndjson=False):
+    """(line number, product, lot) of every item of an uploaded inventory.
+
+    CSV files may use ',', ';' or tab separators. Their product and lot
+    columns are found by header name; without a recognised header the
+    first two columns are taken as product and lot. NDJSON lines are
+    objects with the same keys.
+    """
+    text = io.TextIOWrapper(binary_file, encoding='utf-8-sig', errors='replace', newline='')
+    if ndjson:
+        for number, line in enumerate(text, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(item, dict):
+                continue
+            keys = {_column_key(key): value for key, value in item.items()}
+            product = next((keys[key] for key in _PRODUCT_KEYS if keys.get(key)), None)
+            lot = next((keys[key] for key in _LOT_KEYS if keys.get(key)), None)
+            yield number, str(product) if product else None, str(lot) if lot else None
+        return
+
+    first_line = text.readline()
+    delimiter = max(',;\t', key=first_line.count)
+    header = next(csv.reader([first_line], delimiter=delimiter), [])
+    product_column = _column(header, _PRODUCT_KEYS)
+    lot_column = _column(header, _LOT_KEYS)
+    rows = csv.reader(text, delimiter=delimiter)
+    first_number = 2
+    if product_column is None and lot_column is None:
+        # No header: the first line is an item
+        product_column, lot_column = 0, 1
+        rows = itertools.chain([header], rows)
+        first_number = 1
+
+    for number, row in enumerate(rows, first_number):
+        product = row[product_column].strip() if product_column is not None and len(row) > product_column else ''
+        lot = row[lot_column].strip() if lot_column is not None and len(row) > lot_column else ''
+        if product or lot:
+            yield number, product or None, lot or None
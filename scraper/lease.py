@@ -0,0 +1,158 @@
+"""
+Database lease that keeps scrape runs from overlapping.
+
+The scheduler, cron scripts and manual runs may start a scrape while
+another one is still going, possibly on another host. Every scrape entry
+point takes the 'scrape' lease in ``scrape_leases`` first: a row naming its
+holder and when the lease expires. The holder renews it from a heartbeat
+thread; a lease whose holder crashed expires after ``ttl`` seconds and can
+then be taken over by the next run.
+
+Taking and renewing the lease are single conditional UPDATEs, so two
+processes can never both hold it. Expiry is compared against each host's
+clock, so ``ttl`` should be well above the expected clock skew.
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+
+class LeaseUnavailable(Exception):
+    """The lease is held by another run, or was lost to one"""
+
+
+class DatabaseLease:
+    """A named lease in ``scrape_leases``, renewed every ``heartbeat``
+    seconds while held.
+
+    Use as a context manager, or call ``acquire`` and ``release``. Holding
+    it is reentrant within one object, so a scrape entry point can take it
+    around several scraper calls that take it themselves.
+    """
+
+    def __init__(self, db_manager, name='scrape', ttl=300, heartbeat=60, logger=None):
+        self.db_manager = db_manager
+        self.name = name
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.logger = logger or logging.getLogger(__name__)
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lost = False
+        self._depth = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    @property
+    def held(self):
+        return self._depth > 0
+
+    def acquire(self):
+        """Take the lease, or raise ``LeaseUnavailable`` while another
+        holder's lease has not expired"""
+        if self._depth:
+            self._depth += 1
+            return
+        from database.models import ScrapeLease
+        table = ScrapeLease.__table__
+        now = datetime.utcnow()
+        self._create_row(table)
+        with self.db_manager.engine.begin() as conn:
+            row = conn.execute(select(table.c.holder, table.c.expires_at).where(table.c.name == self.name)).first()
+            taken = conn.execute(
+                update(table)
+                .where(table.c.name == self.name)
+                .where(or_(table.c.holder.is_(None), table.c.expires_at < now))
+                .values(holder=self.holder, acquired_at=now, heartbeat_at=now,
+                        expires_at=now + timedelta(seconds=self.ttl))
+            ).rowcount
+        if not taken:
+            raise LeaseUnavailable(
+                f"Lease '{self.name}' is held by {row.holder} until {row.expires_at:%Y-%m-%d %H:%M:%S} UTC"
+                if row.holder and row.expires_at else f"Lease '{self.name}' is held by another run"
+            )
+        if row.holder:
+            self.logger.warning(f"Took over lease '{self.name}' of {row.holder}, which expired at {row.expires_at}")
+
+        self._depth = 1
+        self.lost = False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._renew_loop, name=f'lease-{self.name}', daemon=True)
+        self._thread.start()
+
+    def _create_row(self, table):
+        """Insert the lease's row, unheld, the first time it is used"""
+        with self.db_manager.engine.connect() as conn:
+            if conn.execute(select(table.c.id).where(table.c.name == self.name)).first() is not None:
+                return
+        try:
+            with self.db_manager.engine.begin() as conn:
+                conn.execute(table.insert().values(name=self.name))
+        except IntegrityError:
+            # Created by another process in the meantime
+            pass
+
+    def release(self):
+        """Give up the lease so the next run does not have to wait for it to expire"""
+        if not self._depth:
+            return
+        self._depth -= 1
+        if self._depth:
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        from database.models import ScrapeLease
+        table = ScrapeLease.__table__
+        try:
+            with self.db_manager.engine.begin() as conn:
+                conn.execute(
+                    update(table)
+                    .where(and_(table.c.name == self.name, table.c.holder == self.holder))
+                    .values(holder=None, expires_at=None)
+                )
+        except Exception as e:
+            # It expires on its own
+            self.logger.warning(f"Could not release lease '{self.name}': {str(e)}")
+
+    def renew(self):
+        """Extend the lease by ``ttl``; returns False if it was taken over"""
+        from database.models import ScrapeLease
+        table = ScrapeLease.__table__
+        now = datetime.utcnow()
+        with self.db_manager.engine.begin() as conn:
+            return bool(conn.execute(
+                update(table)
+                .where(and_(table.c.name == self.name, table.c.holder == self.holder))
+                .values(heartbeat_at=now, expires_at=now + timedelta(seconds=self.ttl))
+            ).rowcount)
+
+    def check(self):
+        """Raise ``LeaseUnavailable`` if the lease was lost, so the run stops
+        instead of overlapping with the run that took it over"""
+        if self.lost:
+            raise LeaseUnavailable(f"Lease '{self.name}' was lost to another run")
+
+    def _renew_loop(self):
+        while not self._stop.wait(self.heartbeat):
+            try:
+                if not self.renew():
+                    self.lost = True
+                    self.logger.error(f"Lease '{self.name}' was taken over by another run")
+                    return
+            except Exception as e:
+                # Retried on the next heartbeat; the lease only lapses after ttl
+                self.logger.warning(f"Could not renew lease '{self.name}': {str(e)}")
@@ -0,0 +1,231 @@
+"""
+Per-category instrumentation of a scrape run.
+
+``ScrapeMetrics`` collects request counts, bytes, latencies, HTTP statuses,
+retries and the time spent fetching, parsing and writing to the database,
+grouped by the category (or stage, e.g. feed discovery) being scraped.
+``run_full_scrape`` stores them per category in ``scrape_log_categories``
+next to its ``ScrapeLog``.
+
+Fetch, parse and DB times are summed over requests and pages, so with
+concurrent fetches they can exceed the category's wall-clock duration.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (ms) of the fetch latency histogram buckets
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class CategoryMetrics:
+    """Counters of one category or stage of a run"""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.status = 'success'
+        self.error = None
+        self.posts_scraped = 0
+        self.posts_new = 0
+        self.posts_updated = 0
+        self.duration_ms = 0.0
+        self.requests = 0
+        self.bytes_fetched = 0
+        self.fetch_ms = 0.0
+        self.parse_ms = 0.0
+        self.db_ms = 0.0
+        self.retries = 0
+        self.fetch_errors = 0
+        self.status_counts = {}
+        self.latency_histogram = {}
+        # Stage name -> counters of the post pipeline, see scraper/pipeline.py
+        self.pipeline = {}
+
+    def add(self, other):
+        """Add the counters of the same scope collected elsewhere"""
+        if other.status == 'failed':
+            self.status = 'failed'
+            self.error = other.error
+        for name in ('posts_scraped', 'posts_new', 'posts_updated', 'duration_ms', 'requests', 'bytes_fetched',
+                     'fetch_ms', 'parse_ms', 'db_ms', 'retries', 'fetch_errors'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for counts, other_counts in ((self.status_counts, other.status_counts),
+                                     (self.latency_histogram, other.latency_histogram)):
+            for key, count in other_counts.items():
+                counts[key] = counts.get(key, 0) + count
+        for name, stage in other.pipeline.items():
+            self.add_stage(name, stage)
+
+    def add_stage(self, name, stage):
+        """Add the counters of a pipeline stage (see ``ScrapeMetrics.record_pipeline``)"""
+        totals = self.pipeline.setdefault(name, {
+            'workers': 0, 'items': 0, 'busy_ms': 0.0, 'blocked_ms': 0.0,
+            'max_queue': 0, 'queue_total': 0, 'queue_samples': 0,
+        })
+        totals['workers'] = max(totals['workers'], stage['workers'])
+        totals['max_queue'] = max(totals['max_queue'], stage['max_queue'])
+        for key in ('items', 'busy_ms', 'blocked_ms', 'queue_total', 'queue_samples'):
+            totals[key] += stage[key]
+
+    def as_row(self):
+        """Column values for a ``ScrapeLogCategory`` row"""
+        return {
+            'scope': self.scope,
+            'status': self.status,
+            'error': self.error,
+            'posts_scraped': self.posts_scraped,
+            'posts_new': self.posts_new,
+            'posts_updated': self.posts_updated,
+            'duration_ms': int(self.duration_ms),
+            'requests': self.requests,
+            'bytes_fetched': self.bytes_fetched,
+            'fetch_ms': int(self.fetch_ms),
+            'parse_ms': int(self.parse_ms),
+            'db_ms': int(self.db_ms),
+            'retries': self.retries,
+            'fetch_errors': self.fetch_errors,
+            'status_counts': json.dumps(self.status_counts, sort_keys=True),
+            'latency_histogram': json.dumps(self.latency_histogram),
+            'pipeline_stats': json.dumps({
+                name: {
+                    'workers': stage['workers'],
+                    'items': stage['items'],
+                    'busy_ms': int(stage['busy_ms']),
+                    'blocked_ms': int(stage['blocked_ms']),
+                    'max_queue': stage['max_queue'],
+                    'avg_queue': round(stage['queue_total'] / stage['queue_samples'], 1)
+                    if stage['queue_samples'] else 0.0,
+                }
+                for name, stage in self.pipeline.items()
+            }),
+        }
+
+
+def latency_bucket(latency_ms):
+    """Histogram bucket of a latency: the smallest upper bound it fits under"""
+    for bound in LATENCY_BUCKETS_MS:
+        if latency_ms <= bound:
+            return f"<={bound}ms"
+    return f">{LATENCY_BUCKETS_MS[-1]}ms"
+
+
+class ScrapeMetrics:
+    """Thread-safe collector of the metrics of a run.
+
+    Work is attributed to the scope entered last with ``category()``;
+    fetch threads record into it while the scraper works on that category.
+    Work outside any scope is attributed to 'other'. Parallel category
+    workers therefore collect into their own instance, which is merged
+    into the run's with ``merge``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scopes = {}
+        self._current = None
+
+    def _scope(self, scope=None):
+        scope = scope or self._current or 'other'
+        if scope not in self._scopes:
+            self._scopes[scope] = CategoryMetrics(scope)
+        return self._scopes[scope]
+
+    @contextmanager
+    def category(self, scope):
+        """Attribute the work done inside the block to ``scope``.
+
+        An exception escaping the block marks the scope as failed.
+        """
+        previous = self._current
+        self._current = scope
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            with self._lock:
+                metrics = self._scope(scope)
+                metrics.status = 'failed'
+                metrics.error = str(e)[:1000]
+            raise
+        finally:
+            with self._lock:
+                self._scope(scope).duration_ms += 1000 * (time.perf_counter() - start)
+            self._current = previous
+
+    @contextmanager
+    def timer(self, phase):
+        """Add the time spent inside the block to ``phase`` ('parse' or 'db')"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def add_time(self, phase, seconds):
+        with self._lock:
+            metrics = self._scope()
+            setattr(metrics, f'{phase}_ms', getattr(metrics, f'{phase}_ms') + 1000 * seconds)
+
+    def record_request(self, status, seconds, size=0):
+        """Record a finished request; ``status`` is the HTTP status, or
+        'error' when no response was received"""
+        latency_ms = 1000 * seconds
+        with self._lock:
+            metrics = self._scope()
+            metrics.requests += 1
+            metrics.bytes_fetched += size
+            metrics.fetch_ms += latency_ms
+            key = str(status)
+            metrics.status_counts[key] = metrics.status_counts.get(key, 0) + 1
+            bucket = latency_bucket(latency_ms)
+            metrics.latency_histogram[bucket] = metrics.latency_histogram.get(bucket, 0) + 1
+            if status == 'error' or (isinstance(status, int) and status >= 400):
+                metrics.fetch_errors += 1
+
+    def record_retry(self):
+        with self._lock:
+            self._scope().retries += 1
+
+    def record_pipeline(self, stats):
+        """Record the ``StageStats`` of a pipeline run, by stage name"""
+        with self._lock:
+            metrics = self._scope()
+            for name, stage in stats.items():
+                metrics.add_stage(name, {
+                    'workers': stage.workers,
+                    'items': stage.items,
+                    'busy_ms': 1000 * stage.busy,
+                    'blocked_ms': 1000 * stage.blocked,
+                    'max_queue': stage.max_depth,
+                    'queue_total': stage.depth_total,
+                    'queue_samples': stage.depth_samples,
+                })
+
+    def record_posts(self, scope, scraped, new, updated):
+        with self._lock:
+            metrics = self._scope(scope)
+            metrics.posts_scraped += scraped
+            metrics.posts_new += new
+            metrics.posts_updated += updated
+
+    def merge(self, other):
+        """Add the metrics of another collector, e.g. of a parallel category worker"""
+        with other._lock:
+            scopes = list(other._scopes.values())
+        with self._lock:
+            for metrics in scopes:
+                self._scope(metrics.scope).add(metrics)
+
+    def rows(self):
+        """Column values of every scope, in the order they were first seen"""
+        with self._lock:
+            return [metrics.as_row() for metrics in self._scopes.values()]
+
+
+def timed_call(func, arg):
+    """``func(arg)`` and the seconds it took; module-level so it can wrap
+    parse functions sent to worker processes"""
+    start = time.perf_counter()
+    result = func(arg)
+    return result, time.perf_counter() - start
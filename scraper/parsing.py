@@ -0,0 +1,433 @@
+"""
+Single-pass parsing of EOF pages.
+
+``parse_page`` builds one tree per page and exposes everything the scraper
+extracts from it: the post list and pagination of a listing page, or the
+content, attachments, meta description and tags of a post page.
+
+Two backends produce identical output:
+
+* ``bs4``  - BeautifulSoup on top of lxml (the original implementation)
+* ``lxml`` - direct lxml tree walking and XPath, several times faster
+
+``tests/test_parsing.py`` checks that they agree on the saved pages in
+``tests/fixtures/parsing``; ``scripts/check_parser_backends.py`` compares
+the two on real pages.
+"""
+import re
+from datetime import datetime
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+ATTACHMENT_EXTENSIONS = ['.pdf', '.doc', '.docx', '.xls', '.xlsx']
+
+# Strings inside these tags are not part of an element's text in
+# BeautifulSoup, so the lxml backend skips them as well
+_NON_TEXT_TAGS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+# BeautifulSoup collapses strings of ASCII whitespace to '\n' or ' ',
+# except inside these tags
+_PRESERVE_WHITESPACE_TAGS = frozenset(['pre', 'textarea'])
+_ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+
+def parse_date(date_str):
+    """Parse various date formats"""
+    if not date_str:
+        return None
+
+    # Try ISO format first
+    try:
+        return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    except:
+        pass
+
+    # Try other common formats
+    date_formats = [
+        '%Y-%m-%d',
+        '%d/%m/%Y',
+        '%d-%m-%Y',
+        '%Y/%m/%d',
+        '%d %B %Y',
+        '%B %d, %Y'
+    ]
+
+    for fmt in date_formats:
+        try:
+            return datetime.strptime(date_str.strip(), fmt)
+        except:
+            continue
+
+    return None
+
+
+def page_number(url):
+    """Sort key for pagination URLs: numeric page, then the URL itself"""
+    match = re.search(r'/page/(\d+)', url) or re.search(r'[?&]paged?=(\d+)', url)
+    return (int(match.group(1)) if match else 0, url)
+
+
+def _attachment(href, name, base_url):
+    """Attachment dict for a link, or None if it is not a document"""
+    if not any(href.lower().endswith(ext) for ext in ATTACHMENT_EXTENSIONS):
+        return None
+    return {
+        'file_url': urljoin(base_url, href),
+        'file_name': name or href.split('/')[-1],
+        'file_type': href.split('.')[-1].lower()
+    }
+
+
+class ParsedPage:
+    """A page parsed once, with extractors for listing and post pages"""
+
+    backend = None
+
+    def __init__(self, html, base_url, logger=None):
+        self.base_url = base_url
+        self.logger = logger
+
+    def post_list(self):
+        """Posts listed on a category page"""
+        raise NotImplementedError
+
+    def pagination_urls(self):
+        """Pagination URLs of a category page, sorted by page number"""
+        raise NotImplementedError
+
+    def post_content(self):
+        """Content, attachments, meta description and tags of a post page"""
+        raise NotImplementedError
+
+    def _listing_entry(self, href, title, excerpt, date_str):
+        # Make URL absolute
+        if not href.startswith('http'):
+            href = urljoin(self.base_url, href)
+        return {
+            'url': href,
+            'title': title,
+            'excerpt': excerpt,
+            'publish_date': parse_date(date_str) if date_str is not None else None
+        }
+
+    def _log_error(self, message):
+        if self.logger:
+            self.logger.error(message)
+
+
+class SoupPage(ParsedPage):
+    """BeautifulSoup backend"""
+
+    backend = 'bs4'
+
+    def __init__(self, html, base_url, logger=None):
+        super().__init__(html, base_url, logger)
+        self.soup = BeautifulSoup(html, 'lxml')
+
+    def post_list(self):
+        posts = []
+
+        # Find all post entries
+        articles = self.soup.find_all('article') or self.soup.find_all('div', class_='post')
+
+        for article in articles:
+            try:
+                # Find the title and URL
+                title_elem = article.find('h3', class_='entry-title') or article.find('h2', class_='entry-title')
+                if not title_elem:
+                    continue
+
+                link_elem = title_elem.find('a')
+                if not link_elem:
+                    continue
+
+                post_url = link_elem.get('href', '')
+                if not post_url:
+                    continue
+
+                # Try to find excerpt
+                excerpt = ''
+                excerpt_elem = article.find('div', class_='entry-summary') or article.find('div', class_='excerpt')
+                if excerpt_elem:
+                    excerpt = excerpt_elem.text.strip()
+
+                # Try to find date
+                date_elem = article.find('time') or article.find('span', class_='date')
+                date_str = None
+                if date_elem:
+                    date_str = date_elem.get('datetime') or date_elem.text
+
+                posts.append(self._listing_entry(post_url, link_elem.text.strip(), excerpt, date_str))
+
+            except Exception as e:
+                self._log_error(f"Error parsing post in list: {str(e)}")
+                continue
+
+        return posts
+
+    def pagination_urls(self):
+        urls = []
+
+        # Find pagination container
+        pagination = self.soup.find('div', class_='basel-pagination') or \
+                    self.soup.find('div', class_='pagination') or \
+                    self.soup.find('nav', class_='pagination')
+
+        if pagination:
+            # Find all page links
+            for link in pagination.find_all('a', href=True):
+                href = link['href']
+                if 'page' in href:
+                    full_url = urljoin(self.base_url, href)
+                    if full_url not in urls:
+                        urls.append(full_url)
+
+        return sorted(urls, key=page_number)
+
+    def post_content(self):
+        soup = self.soup
+
+        # Find main content
+        content_elem = soup.find('div', class_='entry-content') or \
+                      soup.find('div', class_='post-content') or \
+                      soup.find('article')
+
+        content = ''
+        if content_elem:
+            # Remove script and style elements
+            for script in content_elem(['script', 'style']):
+                script.decompose()
+            content = content_elem.get_text(separator='\n', strip=True)
+
+        # Find attachments (PDFs, etc.)
+        attachments = []
+        for link in soup.find_all('a', href=True):
+            attachment = _attachment(link['href'], link.text.strip(), self.base_url)
+            if attachment:
+                attachments.append(attachment)
+
+        # Find meta description
+        meta_desc = ''
+        meta_elem = soup.find('meta', attrs={'name': 'description'})
+        if meta_elem:
+            meta_desc = meta_elem.get('content', '')
+
+        # Find tags
+        tags = []
+        tag_container = soup.find('div', class_='tags') or soup.find('div', class_='post-tags')
+        if tag_container:
+            for tag in tag_container.find_all('a'):
+                tags.append(tag.text.strip())
+
+        return {
+            'content': content,
+            'attachments': attachments,
+            'meta_description': meta_desc,
+            'tags': ','.join(tags)
+        }
+
+
+def _class_test(name):
+    """XPath predicate matching elements with ``name`` among their classes"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlPage(ParsedPage):
+    """lxml backend: one libxml2 parse, XPath lookups, no soup objects"""
+
+    backend = 'lxml'
+
+    _articles = etree.XPath('//article')
+    _post_divs = etree.XPath(f"//div[{_class_test('post')}]")
+    _title = etree.XPath(
+        f"(descendant::h3[{_class_test('entry-title')}])[1]"
+        f" | (descendant::h2[{_class_test('entry-title')}])[1]"
+    )
+    _excerpt = etree.XPath(
+        f"(descendant::div[{_class_test('entry-summary')}])[1]"
+        f" | (descendant::div[{_class_test('excerpt')}])[1]"
+    )
+    _date = etree.XPath(
+        f"(descendant::time)[1] | (descendant::span[{_class_test('date')}])[1]"
+    )
+    _pagination = etree.XPath(
+        f"(//div[{_class_test('basel-pagination')}])[1]"
+        f" | (//div[{_class_test('pagination')}])[1]"
+        f" | (//nav[{_class_test('pagination')}])[1]"
+    )
+    _content = etree.XPath(
+        f"(//div[{_class_test('entry-content')}])[1]"
+        f" | (//div[{_class_test('post-content')}])[1]"
+        f" | (//article)[1]"
+    )
+    _links = etree.XPath('//a[@href]')
+    _meta_description = etree.XPath("(//meta[@name='description'])[1]")
+    _tag_container = etree.XPath(
+        f"(//div[{_class_test('tags')}])[1] | (//div[{_class_test('post-tags')}])[1]"
+    )
+
+    def __init__(self, html, base_url, logger=None):
+        super().__init__(html, base_url, logger)
+        root = None
+        if html:
+            if isinstance(html, str):
+                html = html.encode('utf-8')
+            root = etree.fromstring(html, etree.HTMLParser(encoding='utf-8'))
+        self.root = root if root is not None else etree.Element('html')
+
+    @staticmethod
+    def _pick(elements, *choices):
+        """First element matching the ``(tag, class)`` choices in order of
+        preference, like ``soup.find(a) or soup.find(b)``. A class of None
+        matches any element with that tag.
+        """
+        for tag, class_name in choices:
+            for element in elements:
+                if element.tag == tag and (class_name is None or class_name in element.get('class', '').split()):
+                    return element
+        return None
+
+    @staticmethod
+    def _strings(element, preserve=False):
+        """Text nodes of an element in document order, as BeautifulSoup sees them"""
+        if element.tag in _NON_TEXT_TAGS:
+            return
+        inner = preserve or element.tag in _PRESERVE_WHITESPACE_TAGS
+        if element.text:
+            yield LxmlPage._collapse(element.text, inner)
+        for child in element:
+            if isinstance(child.tag, str):
+                yield from LxmlPage._strings(child, inner)
+            if child.tail:
+                yield LxmlPage._collapse(child.tail, inner)
+
+    @staticmethod
+    def _collapse(text, preserve):
+        if preserve or text.strip(_ASCII_SPACES):
+            return text
+        return '\n' if '\n' in text else ' '
+
+    def _text(self, element):
+        return ''.join(self._strings(element))
+
+    def post_list(self):
+        posts = []
+
+        articles = self._articles(self.root) or self._post_divs(self.root)
+
+        for article in articles:
+            try:
+                title_elem = self._pick(self._title(article), ('h3', None), ('h2', None))
+                if title_elem is None:
+                    continue
+
+                link_elem = next(title_elem.iterdescendants('a'), None)
+                if link_elem is None:
+                    continue
+
+                post_url = link_elem.get('href', '')
+                if not post_url:
+                    continue
+
+                excerpt = ''
+                excerpt_elem = self._pick(self._excerpt(article), ('div', 'entry-summary'), ('div', 'excerpt'))
+                if excerpt_elem is not None:
+                    excerpt = self._text(excerpt_elem).strip()
+
+                date_str = None
+                date_elem = self._pick(self._date(article), ('time', None), ('span', None))
+                if date_elem is not None:
+                    date_str = date_elem.get('datetime') or self._text(date_elem)
+
+                posts.append(self._listing_entry(post_url, self._text(link_elem).strip(), excerpt, date_str))
+
+            except Exception as e:
+                self._log_error(f"Error parsing post in list: {str(e)}")
+                continue
+
+        return posts
+
+    def pagination_urls(self):
+        urls = []
+
+        pagination = self._pick(
+            self._pagination(self.root),
+            ('div', 'basel-pagination'), ('div', 'pagination'), ('nav', 'pagination')
+        )
+
+        if pagination is not None:
+            for link in pagination.iterdescendants('a'):
+                href = link.get('href')
+                if href is not None and 'page' in href:
+                    full_url = urljoin(self.base_url, href)
+                    if full_url not in urls:
+                        urls.append(full_url)
+
+        return sorted(urls, key=page_number)
+
+    def post_content(self):
+        content = ''
+        content_elem = self._pick(
+            self._content(self.root),
+            ('div', 'entry-content'), ('div', 'post-content'), ('article', None)
+        )
+        if content_elem is not None:
+            strings = (text.strip() for text in self._strings(content_elem))
+            content = '\n'.join(text for text in strings if text)
+
+        attachments = []
+        for link in self._links(self.root):
+            attachment = _attachment(link.get('href'), self._text(link).strip(), self.base_url)
+            if attachment:
+                attachments.append(attachment)
+
+        meta_desc = ''
+        meta = self._meta_description(self.root)
+        if meta:
+            meta_desc = meta[0].get('content', '')
+
+        tags = []
+        tag_container = self._pick(self._tag_container(self.root), ('div', 'tags'), ('div', 'post-tags'))
+        if tag_container is not None:
+            for tag in tag_container.iterdescendants('a'):
+                tags.append(self._text(tag).strip())
+
+        return {
+            'content': content,
+            'attachments': attachments,
+            'meta_description': meta_desc,
+            'tags': ','.join(tags)
+        }
+
+
+PARSER_BACKENDS = {
+    SoupPage.backend: SoupPage,
+    LxmlPage.backend: LxmlPage,
+}
+
+
+def parse_page(html, base_url, backend='lxml', logger=None):
+    """Parse a page once with the given backend ('lxml' or 'bs4')"""
+    try:
+        page_class = PARSER_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown parser backend: {backend}")
+    return page_class(html, base_url, logger)
+
+
+def parse_listing_html(html, base_url, backend='lxml'):
+    """Parse a category page: returns (posts, pagination URLs).
+
+    Module-level so it can be sent to worker processes.
+    """
+    page = parse_page(html, base_url, backend)
+    return page.post_list(), page.pagination_urls()
+
+
+def parse_post_html(html, base_url, backend='lxml'):
+    """Parse a post page: returns the post content dict.
+
+    Module-level so it can be sent to worker processes.
+    """
+    return parse_page(html, base_url, backend).post_content()
@@ -0,0 +1,268 @@
+"""
+Streaming download and text extraction of PDF attachments.
+
+Files are streamed to disk in chunks and their text is extracted in worker
+processes while further files are still downloading. The text is stored
+in ``attachment_texts`` next to the attachment's post. A file is only
+downloaded again when the ETag or size reported by the attachment probe
+(see ``scraper/attachments.py``) differs from the extracted copy; files
+that turn out unchanged (304) or gone (404/410) are brought in line with
+the probe, so they are not downloaded again on every run.
+
+Text extraction needs the optional ``pypdf`` package.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from functools import partial
+
+from sqlalchemy import and_, func, or_, select
+
+CHUNK_SIZE = 64 * 1024
+MAX_TEXT_CHARS = 1_000_000
+
+
+def pdf_support():
+    """Whether the optional pypdf package is installed"""
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def extract_pdf_text(download, max_pages=None):
+    """Extract the text of a downloaded PDF and delete the file.
+
+    ``download`` is the dict returned by ``AttachmentTextExtractor.download``.
+    Module-level so it can be sent to worker processes. Broken PDFs are
+    reported in ``error`` rather than raised, so they are not retried until
+    the file changes.
+    """
+    from pypdf import PdfReader
+    result = dict(download, text=None, page_count=None, error=None)
+    try:
+        reader = PdfReader(download['path'])
+        pages = reader.pages if max_pages is None else reader.pages[:max_pages]
+        texts = []
+        for page in pages:
+            texts.append((page.extract_text() or '').strip())
+        result['text'] = '\n\n'.join(text for text in texts if text)[:MAX_TEXT_CHARS]
+        result['page_count'] = len(reader.pages)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {str(e)}"[:1000]
+    finally:
+        try:
+            os.remove(download['path'])
+        except OSError:
+            pass
+    del result['path']
+    return result
+
+
+class AttachmentTextExtractor:
+    """Downloads PDF attachments and stores their text.
+
+    Downloads go through the scraper's ``AsyncFetcher`` (with the scraper's
+    ``host_limiter``, the same per-host limits as page fetches) and stream
+    to a temporary directory; each
+    finished download is handed to a process pool for extraction. Every
+    unique file URL is downloaded once per run.
+
+    The pool has ``workers`` spawned processes, so it is only started from
+    guarded entry points: the scheduler's attachment job and
+    ``scripts/extract_attachment_texts.py``, never from a scrape.
+    """
+
+    def __init__(self, fetcher, http_session, logger=None, workers=2, timeout=60, max_bytes=50 * 1024 * 1024,
+                 max_pages=None, host_limiter=None):
+        self.fetcher = fetcher
+        self.host_limiter = host_limiter
+        self.http_session = http_session
+        self.logger = logger or logging.getLogger(__name__)
+        self.workers = max(1, int(workers or 1))
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self._download_dir = None
+        self._stored_etags = {}
+        self._not_downloaded = {}
+
+    def download(self, url):
+        """Stream a file to disk; returns a dict describing it, or None if it
+        is gone or unchanged since its text was extracted (the status is
+        remembered for ``_store_not_downloaded``)"""
+        headers = {}
+        if self._stored_etags.get(url):
+            headers['If-None-Match'] = self._stored_etags[url]
+        with self.host_limiter.slot(url) if self.host_limiter else nullcontext(), \
+                self.http_session.get(url, timeout=self.timeout, stream=True, headers=headers) as response:
+            if response.status_code in (304, 404, 410):
+                self._not_downloaded[url] = response.status_code
+                return None
+            response.raise_for_status()
+
+            length = response.headers.get('Content-Length')
+            if length and length.isdigit() and int(length) > self.max_bytes:
+                raise ValueError(f"{url} is {length} bytes, over the {self.max_bytes} byte limit")
+
+            digest = hashlib.sha256()
+            size = 0
+            fd, path = tempfile.mkstemp(suffix='.pdf', dir=self._download_dir)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            raise ValueError(f"{url} is over the {self.max_bytes} byte limit")
+                        digest.update(chunk)
+                        f.write(chunk)
+            except Exception:
+                os.remove(path)
+                raise
+
+            return {
+                'path': path,
+                'etag': (response.headers.get('ETag') or '')[:255] or None,
+                'file_size': size,
+                'content_sha256': digest.hexdigest(),
+            }
+
+    def pending(self, session, limit):
+        """Probed PDF attachments without text, or whose file has changed since.
+
+        Returns a dict of file URL -> list of (attachment id, post id), and
+        remembers the ETag of any stored text for a conditional download.
+        """
+        from database.models import Attachment, AttachmentText
+        self._stored_etags = {}
+        rows = session.execute(
+            select(Attachment.id, Attachment.post_id, Attachment.file_url, AttachmentText.etag.label('text_etag'))
+            .outerjoin(AttachmentText, AttachmentText.attachment_id == Attachment.id)
+            .where(
+                func.lower(Attachment.file_type) == 'pdf',
+                Attachment.probed_at.isnot(None),
+                Attachment.probe_status < 400,
+                or_(
+                    AttachmentText.id.is_(None),
+                    and_(Attachment.etag.isnot(None), AttachmentText.etag.is_distinct_from(Attachment.etag)),
+                    and_(Attachment.file_size.isnot(None),
+                         AttachmentText.file_size.is_distinct_from(Attachment.file_size)),
+                )
+            )
+            .order_by(Attachment.id.desc())
+        )
+        pending = {}
+        for row in rows:
+            if row.file_url not in pending and len(pending) >= limit:
+                continue
+            pending.setdefault(row.file_url, []).append((row.id, row.post_id))
+            if row.text_etag:
+                self._stored_etags[row.file_url] = row.text_etag
+        return pending
+
+    def extract_pending(self, session, limit=200):
+        """Download and extract up to ``limit`` file URLs.
+
+        Returns the number of files whose text was stored. The caller
+        commits the session.
+        """
+        pending = self.pending(session, limit)
+        if not pending:
+            return 0
+
+        self._download_dir = tempfile.mkdtemp(prefix='eof-attachments-')
+        self._not_downloaded = {}
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers,
+                                     mp_context=multiprocessing.get_context('spawn')) as pool:
+                results = self.fetcher.fetch_all(
+                    list(pending), self.download, partial(extract_pdf_text, max_pages=self.max_pages), pool
+                )
+        finally:
+            shutil.rmtree(self._download_dir, ignore_errors=True)
+            self._download_dir = None
+
+        extracted = {url: result for url, result in results.items()
+                     if result is not None and not isinstance(result, Exception)}
+        self._store(session, pending, extracted)
+        self._store_not_downloaded(session, pending)
+        failed = sum(1 for result in extracted.values() if result['error'])
+        self.logger.info(f"Extracted text of {len(extracted) - failed} attachments, {failed} unreadable, "
+                         f"{len(pending) - len(extracted)} unchanged or not downloaded")
+        return len(extracted)
+
+    def _store(self, session, pending, extracted):
+        from database.models import AttachmentText
+        attachment_ids = [attachment_id for url in extracted for attachment_id, _ in pending[url]]
+        existing = {
+            row.attachment_id: row
+            for row in session.query(AttachmentText).filter(AttachmentText.attachment_id.in_(attachment_ids))
+        } if attachment_ids else {}
+
+        now = datetime.utcnow()
+        for url, result in extracted.items():
+            for attachment_id, post_id in pending[url]:
+                row = existing.get(attachment_id)
+                if row is None:
+                    row = AttachmentText(attachment_id=attachment_id, post_id=post_id, file_url=url)
+                    session.add(row)
+                row.etag = result['etag']
+                row.file_size = result['file_size']
+                row.content_sha256 = result['content_sha256']
+                row.page_count = result['page_count']
+                row.text = result['text']
+                row.error = result['error']
+                row.extracted_at = now
+
+    def _store_not_downloaded(self, session, pending):
+        """Bring the stored text of files that were not downloaded in line
+        with their probe, so they drop out of ``pending``.
+
+        On a 304 the stored text is still that of the file: attachments
+        keep it with the probed ETag and size, and attachments of the same
+        file without text get a copy. Files that are gone (404/410) keep
+        any text already extracted; attachments without text are stored
+        with the HTTP status as the error.
+        """
+        from database.models import Attachment, AttachmentText
+        if not self._not_downloaded:
+            return
+        urls = list(self._not_downloaded)
+        attachment_ids = [attachment_id for url in urls for attachment_id, _ in pending[url]]
+        probed = {
+            row.id: row
+            for row in session.query(Attachment.id, Attachment.etag, Attachment.file_size)
+            .filter(Attachment.id.in_(attachment_ids))
+        }
+        stored = {}
+        for row in session.query(AttachmentText).filter(AttachmentText.file_url.in_(urls)):
+            stored.setdefault(row.file_url, {})[row.attachment_id] = row
+
+        now = datetime.utcnow()
+        for url, status in self._not_downloaded.items():
+            rows = stored.get(url, {})
+            source = next((row for row in rows.values() if row.etag and row.etag == self._stored_etags.get(url)),
+                          None)
+            for attachment_id, post_id in pending[url]:
+                row = rows.get(attachment_id)
+                if row is None:
+                    row = AttachmentText(attachment_id=attachment_id, post_id=post_id, file_url=url)
+                    session.add(row)
+                    if status == 304 and source is not None:
+                        row.content_sha256 = source.content_sha256
+                        row.page_count = source.page_count
+                        row.text = source.text
+                        row.error = source.error
+                    else:
+                        row.error = f"HTTP {status}"
+                    row.extracted_at = now
+                row.etag = probed[attachment_id].etag
+                row.file_size = probed[attachment_id].file_size
+        self._not_downloaded = {}
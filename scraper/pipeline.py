@@ -0,0 +1,208 @@
+"""
+Staged pipeline of a scrape: discovery -> fetch -> parse -> persist.
+
+``StagedPipeline`` runs a source (the discovery of posts, e.g. a walk over
+listing pages) and a chain of stages, each with its own number of worker
+threads, connected by bounded queues. A stage whose output queue is full
+blocks, so slow database writes throttle parsing and fetching instead of
+piling fetched pages up in memory, while a fast fetch stage keeps the
+parsers supplied.
+
+For every stage ``stats`` counts the items handled, the time spent on them
+(busy), the time spent waiting for room in the next queue (blocked) and the
+depth of its input queue, sampled whenever it takes an item.
+"""
+import logging
+import queue
+import threading
+import time
+
+# Tells the workers of a stage that no more items will come
+_DONE = object()
+
+
+class _Aborted(Exception):
+    """Another stage failed; the pipeline is shutting down"""
+
+
+class Stage:
+    """A step of the pipeline run by ``workers`` threads.
+
+    ``func`` maps an item to the item handed to the next stage. With
+    ``batch_size`` it is given a list of up to that many items that are
+    already waiting instead, e.g. to write them in one transaction.
+    """
+
+    def __init__(self, name, func, workers=1, batch_size=None):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers or 1))
+        self.batch_size = batch_size
+
+
+class StageStats:
+    """Counters of one stage of a pipeline run"""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.max_depth = 0
+
+    def as_dict(self):
+        return {
+            'workers': self.workers,
+            'items': self.items,
+            'busy_ms': int(1000 * self.busy),
+            'blocked_ms': int(1000 * self.blocked),
+            'max_queue': self.max_depth,
+            'avg_queue': round(self.depth_total / self.depth_samples, 1) if self.depth_samples else 0.0,
+        }
+
+
+class StagedPipeline:
+    """Feeds the items of a source through ``stages``.
+
+    The source is iterated in a thread of its own (reported as the
+    ``source_name`` stage). The last stage's results are discarded, so it
+    is where items are persisted.
+    """
+
+    def __init__(self, stages, queue_size=50, source_name='discovery', logger=None):
+        self.stages = stages
+        self.queue_size = max(1, int(queue_size))
+        self.source_name = source_name
+        self.logger = logger or logging.getLogger(__name__)
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._abort = threading.Event()
+        self._error = None
+
+    def run(self, source):
+        """Run the pipeline until every item of ``source`` went through all
+        stages. The first exception raised by the source or a stage stops
+        the pipeline and is re-raised here."""
+        queues = [queue.Queue(self.queue_size) for _ in self.stages]
+        self.stats = {self.source_name: StageStats(self.source_name, 1)}
+        self.stats.update((stage.name, StageStats(stage.name, stage.workers)) for stage in self.stages)
+        self._abort.clear()
+        self._error = None
+
+        threads = [threading.Thread(target=self._run_source, args=(source, queues[0]),
+                                    name=f'pipeline-{self.source_name}')]
+        for index, stage in enumerate(self.stages):
+            output = queues[index + 1] if index + 1 < len(self.stages) else None
+            next_workers = self.stages[index + 1].workers if output is not None else 0
+            remaining = [stage.workers]
+            for number in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._run_stage, args=(stage, queues[index], output, next_workers, remaining),
+                    name=f'pipeline-{stage.name}-{number}'
+                ))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _fail(self, error):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._abort.set()
+
+    def _put(self, output, item, stats):
+        start = time.perf_counter()
+        while True:
+            if self._abort.is_set():
+                raise _Aborted()
+            try:
+                output.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        with self._lock:
+            stats.blocked += time.perf_counter() - start
+
+    def _get(self, source, stats):
+        with self._lock:
+            depth = source.qsize()
+            stats.depth_samples += 1
+            stats.depth_total += depth
+            stats.max_depth = max(stats.max_depth, depth)
+        while True:
+            if self._abort.is_set():
+                raise _Aborted()
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _run_source(self, source, output):
+        stats = self.stats[self.source_name]
+        workers = self.stages[0].workers
+        try:
+            iterator = iter(source)
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    with self._lock:
+                        stats.busy += time.perf_counter() - start
+                with self._lock:
+                    stats.items += 1
+                self._put(output, item, stats)
+            for _ in range(workers):
+                self._put(output, _DONE, stats)
+        except _Aborted:
+            pass
+        except Exception as e:
+            self._fail(e)
+
+    def _run_stage(self, stage, source, output, next_workers, remaining):
+        stats = self.stats[stage.name]
+        try:
+            done = False
+            while not done:
+                item = self._get(source, stats)
+                if item is _DONE:
+                    break
+                if stage.batch_size:
+                    items = [item]
+                    while len(items) < stage.batch_size:
+                        try:
+                            item = source.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is _DONE:
+                            done = True
+                            break
+                        items.append(item)
+                    item = items
+                start = time.perf_counter()
+                result = stage.func(item)
+                with self._lock:
+                    stats.busy += time.perf_counter() - start
+                    stats.items += len(item) if stage.batch_size else 1
+                if output is not None:
+                    self._put(output, result, stats)
+
+            # The last worker of a stage to finish ends the next stage
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last and output is not None:
+                for _ in range(next_workers):
+                    self._put(output, _DONE, stats)
+        except _Aborted:
+            pass
+        except Exception as e:
+            self._fail(e)
@@ -0,0 +1,111 @@
+import logging
+import time
+from urllib.parse import urljoin
+
+from scraper.eof_scraper import EOFScraper
+from scraper.http_cache import MemoryValidatorStore
+from scraper.writer import link_post_categories
+
+
+class RecallWatcher:
+    """Fast lane for the recall (``anakliseis-*``) subcategories.
+
+    Every ``poll`` sends one conditional GET per recall subcategory for its
+    first listing page only. Those requests almost always come back as
+    304 Not Modified. When a page has changed, its new or changed posts go
+    straight through the scraper's detail fetch and persistence.
+
+    The watcher uses its own scraper, so it has its own HTTP session, but
+    its requests go through the scraper's fetch path with its rate limit,
+    per-host delay and metrics. The validators of the listing pages are
+    kept in memory rather than in ``http_validators``. A change the watcher has seen therefore still
+    reaches the regular scrape, which can then walk any further pages.
+    Post writes are upserts, so running alongside a full scrape is safe.
+    """
+
+    def __init__(self, db_manager, logger=None, scraper=None):
+        self.db_manager = db_manager
+        self.logger = logger or logging.getLogger(__name__)
+        self.scraper = scraper or EOFScraper(db_manager, self.logger)
+        self._listing_validators = MemoryValidatorStore()
+
+    def recall_targets(self):
+        """(slug, name, url, parent slug, category type) of the recall subcategories"""
+        return [target for target in self.scraper.category_targets() if target[0].startswith('anakliseis')]
+
+    def _fetch_first_page(self, url):
+        """Conditional GET with the watcher's in-memory validators, None on 304"""
+        return self.scraper.fetch_page_conditional(url, validators=self._listing_validators)
+
+    def poll(self):
+        """Check the first page of every recall subcategory once.
+
+        Returns (posts scraped, new posts, updated posts).
+        """
+        targets = {urljoin(self.scraper.base_url, target[2]): target for target in self.recall_targets()}
+        pages = self.scraper.fetch_pages(list(targets), self._fetch_first_page, self.scraper._listing_parser())
+
+        total_scraped = total_new = total_updated = 0
+        for page_url, parsed in pages.items():
+            if parsed is None:
+                continue
+            try:
+                scraped, new, updated = self._store_changes(targets[page_url], parsed[0])
+            except Exception as e:
+                self.logger.error(f"Error in recall watcher for {page_url}: {str(e)}")
+                continue
+            # Only trust the page's validators once its posts are stored
+            self._listing_validators.stage(None, [page_url])
+            total_scraped += scraped
+            total_new += new
+            total_updated += updated
+
+        if total_scraped:
+            self.logger.info(f"Recall watcher: {total_scraped} scraped, {total_new} new, {total_updated} updated")
+        return total_scraped, total_new, total_updated
+
+    def _store_changes(self, target, posts):
+        """Fetch and persist the new or changed posts of a first listing page"""
+        from database.models import Category
+        slug, name, url, parent_slug, category_type = target
+        session = self.db_manager.get_session()
+
+        try:
+            changed, _ = self.scraper._changed_entries(posts, session)
+
+            parent = session.query(Category).filter_by(slug=parent_slug).first() if parent_slug else None
+            category = self.scraper._get_or_create_category(
+                session, slug, name, urljoin(self.scraper.base_url, url), parent, category_type
+            )
+            scraped = new = updated = 0
+            if changed:
+                scraped, new, updated = self.scraper._scrape_posts(changed, category, session)
+            # Every post on the page, also unchanged ones first found in another category
+            link_post_categories(session, {post_data['url']: [category.id] for post_data in posts})
+            session.commit()
+            if new:
+                self.logger.info(f"Recall watcher: {new} new posts in {name}")
+            return scraped, new, updated
+
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def run(self, interval=60, should_stop=None):
+        """Poll every ``interval`` seconds until ``should_stop()`` is true"""
+        should_stop = should_stop or (lambda: False)
+        self.logger.info(f"Recall watcher polling {len(self.recall_targets())} subcategories every {interval}s")
+        try:
+            while not should_stop():
+                started = time.monotonic()
+                try:
+                    self.poll()
+                except Exception as e:
+                    self.logger.error(f"Recall watcher poll failed: {str(e)}")
+                # Sleep in short steps so a stop request is noticed quickly
+                while not should_stop() and time.monotonic() - started < interval:
+                    time.sleep(1)
+        finally:
+            self.scraper.close()
@@ -0,0 +1,117 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from scraper.archive import parse_archived_listing, parse_archived_post
+from scraper.writer import PostBatchWriter, build_post_record
+
+
+def reparse_archive(db_manager, archive, base_url='https://www.eof.gr', backend='lxml', workers=None,
+                    logger=None):
+    """Rebuild stored posts and attachments from the HTML archive.
+
+    The latest archived copy of every stored post is parsed again, together
+    with the latest copy of every archived listing page for titles and
+    excerpts (stored values are used for posts no archived listing shows).
+    Parsing runs in ``workers`` processes (default: one per core). Changed
+    posts are written with ``PostBatchWriter``, so unchanged ones cost
+    nothing. No network requests are made.
+
+    Returns a dict with the number of 'parsed', 'updated', 'unchanged' and
+    'failed' posts.
+    """
+    from database.models import Category, Post
+    logger = logger or logging.getLogger(__name__)
+    latest = archive.latest()
+    session = db_manager.get_session()
+
+    try:
+        stored = {
+            row.url: row
+            for row in session.query(
+                Post.url, Post.title, Post.excerpt, Post.publish_date, Post.category_id
+            ).filter(Post.url.in_(list(latest)))
+        } if latest else {}
+        listing_pages = sorted(
+            (entry for url, entry in latest.items() if url not in stored),
+            key=lambda entry: entry['fetched_at']
+        )
+        post_urls = list(stored)
+        logger.info(f"Re-parsing {len(post_urls)} posts and {len(listing_pages)} listing pages from {archive.root}")
+
+        workers = workers or os.cpu_count() or 1
+        listed = {}
+        contents = {}
+        failed = 0
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            chunksize = max(1, len(latest) // (workers * 4))
+            listing_results = pool.map(
+                partial(_safe_parse, parse_archived_listing, base_url=base_url, backend=backend),
+                [archive.path(entry['sha256']) for entry in listing_pages],
+                chunksize=chunksize
+            )
+            post_results = pool.map(
+                partial(_safe_parse, parse_archived_post, base_url=base_url, backend=backend),
+                [archive.path(latest[url]['sha256']) for url in post_urls],
+                chunksize=chunksize
+            )
+            # Listing pages are in fetch order, so newer entries win
+            for entry, posts in zip(listing_pages, listing_results):
+                if isinstance(posts, Exception):
+                    logger.error(f"Error parsing archived listing {entry['url']}: {str(posts)}")
+                    continue
+                for post_data in posts:
+                    listed[post_data['url']] = post_data
+            for url, content_data in zip(post_urls, post_results):
+                if isinstance(content_data, Exception):
+                    logger.error(f"Error parsing archived post {url}: {str(content_data)}")
+                    failed += 1
+                    continue
+                contents[url] = content_data
+
+        records_by_category = {}
+        for url, content_data in contents.items():
+            row = stored[url]
+            post_data = listed.get(url) or {
+                'url': url,
+                'title': row.title,
+                'excerpt': row.excerpt or '',
+                'publish_date': row.publish_date,
+            }
+            records_by_category.setdefault(row.category_id, []).append(build_post_record(post_data, content_data))
+
+        counts = {'parsed': len(contents), 'updated': 0, 'unchanged': 0, 'failed': failed}
+        categories = {
+            category.id: category
+            for category in session.query(Category).filter(Category.id.in_(list(records_by_category)))
+        }
+        if records_by_category and not PostBatchWriter.supports(session):
+            raise ValueError("Re-parsing the archive requires SQLite or PostgreSQL")
+        writer = PostBatchWriter(session)
+        for category_id, records in records_by_category.items():
+            if category_id not in categories:
+                counts['failed'] += len(records)
+                continue
+            for status in writer.write(records, categories[category_id]).values():
+                counts['unchanged' if status == 'unchanged' else 'updated'] += 1
+        session.commit()
+
+        logger.info(f"Re-parse complete: {counts['parsed']} parsed, {counts['updated']} updated, "
+                    f"{counts['unchanged']} unchanged, {counts['failed']} failed")
+        return counts
+
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def _safe_parse(parse_func, path, base_url, backend):
+    """Run a parser in a worker, returning the exception instead of raising"""
+    try:
+        return parse_func(path, base_url, backend)
+    except Exception as e:
+        return e
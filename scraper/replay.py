@@ -0,0 +1,140 @@
+"""
+Record/replay transport for the scraper's HTTP session.
+
+``RecordingAdapter`` sends requests as usual and saves every response to a
+fixture file. ``ReplayAdapter`` serves those fixtures back without any
+network access, optionally with a simulated latency, and answers
+conditional requests with 304 when the recorded ETag matches. Mount either
+one with ``EOFScraper.mount_transport``; ``scripts/benchmark_scraper.py``
+uses them to benchmark scrapes offline.
+
+Fixtures are JSON files named after the SHA-256 of ``"<METHOD> <url>"``.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+
+def fixture_name(method, url):
+    return hashlib.sha256(f"{method.upper()} {url}".encode('utf-8')).hexdigest() + '.json'
+
+
+def load_fixtures(fixture_dir):
+    """All recorded fixtures in a directory, as dicts"""
+    fixtures = []
+    for name in sorted(os.listdir(fixture_dir)):
+        if name.endswith('.json'):
+            with open(os.path.join(fixture_dir, name), encoding='utf-8') as f:
+                fixtures.append(json.load(f))
+    return fixtures
+
+
+def fixture_body(fixture):
+    """Raw response body of a fixture"""
+    return base64.b64decode(fixture['body'])
+
+
+class RecordingAdapter(HTTPAdapter):
+    """HTTP adapter that saves each response to ``fixture_dir``.
+
+    304 responses are not saved, so a fixture always holds a full page.
+    """
+
+    def __init__(self, fixture_dir, **kwargs):
+        super().__init__(**kwargs)
+        self.fixture_dir = fixture_dir
+        os.makedirs(fixture_dir, exist_ok=True)
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if response.status_code != 304:
+            fixture = {
+                'method': request.method,
+                'url': request.url,
+                'status': response.status_code,
+                'reason': response.reason,
+                'headers': dict(response.headers),
+                # Reading .content here consumes the stream; requests keeps
+                # the body on the response, so callers still see it
+                'body': base64.b64encode(response.content).decode('ascii'),
+            }
+            path = os.path.join(self.fixture_dir, fixture_name(request.method, request.url))
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(fixture, f)
+            os.replace(tmp_path, path)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter serving recorded fixtures instead of the network.
+
+    Each request waits ``latency`` seconds, plus up to ``jitter`` seconds at
+    random, to mimic a real server. Unknown URLs get a 404.
+    """
+
+    # Hop-by-hop and encoding headers of the recording no longer apply to
+    # the decoded body that is served back
+    _dropped_headers = ('content-encoding', 'transfer-encoding', 'content-length', 'connection')
+
+    def __init__(self, fixture_dir, latency=0.0, jitter=0.0, logger=None):
+        super().__init__()
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.logger = logger or logging.getLogger(__name__)
+        self.requests_served = 0
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+        path = os.path.join(self.fixture_dir, fixture_name(request.method, request.url))
+        if not os.path.exists(path):
+            self.logger.warning(f"No fixture for {request.method} {request.url}")
+            return self._build_response(request, 404, 'Not Found', {}, b'')
+
+        with open(path, encoding='utf-8') as f:
+            fixture = json.load(f)
+        headers = {
+            name: value for name, value in fixture['headers'].items()
+            if name.lower() not in self._dropped_headers
+        }
+        etag = CaseInsensitiveDict(headers).get('ETag')
+        if etag and request.headers.get('If-None-Match') == etag:
+            return self._build_response(request, 304, 'Not Modified', headers, b'')
+
+        body = fixture_body(fixture)
+        with self._lock:
+            self.requests_served += 1
+            self.bytes_served += len(body)
+        return self._build_response(request, fixture['status'], fixture.get('reason'), headers, body)
+
+    @staticmethod
+    def _build_response(request, status, reason, headers, body):
+        response = Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.url = request.url
+        response.request = request
+        response.encoding = None
+        if 'charset=' in response.headers.get('Content-Type', ''):
+            response.encoding = response.headers['Content-Type'].split('charset=')[-1].split(';')[0].strip()
+        return response
+
+    def close(self):
+        pass
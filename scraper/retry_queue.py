@@ -0,0 +1,165 @@
+"""
+Deferred retries of failed fetches.
+
+Instead of sleeping between attempts while the rest of the category waits,
+a failed post or category is put at the back of the run with an
+exponential backoff: it is retried once everything else has been scraped,
+by which time its backoff has usually passed already. Posts and listing
+pages that still fail after the last attempt are saved in
+``failed_fetches`` and retried first on the next run.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+
+# Client errors that retrying will not fix
+PERMANENT_STATUSES = {400, 401, 403, 404, 410}
+
+
+def is_transient(error):
+    """Whether a fetch error is worth retrying (network errors, 5xx, 429)"""
+    response = getattr(error, 'response', None)
+    return response is None or response.status_code not in PERMANENT_STATUSES
+
+
+class DeferredRetryQueue:
+    """Failed work of a run, keyed by URL (posts) or slug (categories).
+
+    Each item holds a ``kind`` ('post', 'page' or 'category'), the ``payload``
+    needed to redo it, its number of failed ``attempts``, the last
+    ``error`` and the time it may be retried again.
+    """
+
+    def __init__(self, max_attempts=3, backoff=4.0, max_backoff=60.0, logger=None):
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.logger = logger or logging.getLogger(__name__)
+        # Parallel category workers queue their failures concurrently
+        self._lock = threading.Lock()
+        self._items = {}
+        self._attempts = {}
+        # Items out of attempts (or with permanent errors), to be saved for the next run
+        self.exhausted = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, key, kind, payload, error, previous_attempts=0):
+        """Queue failed work for a later attempt.
+
+        ``previous_attempts`` counts failures in earlier runs, for saved
+        post fetches. Returns True if the work will be retried during this
+        run.
+        """
+        with self._lock:
+            attempts = self._attempts.get(key, 0) + 1
+            self._attempts[key] = attempts
+        item = {
+            'key': key,
+            'kind': kind,
+            'payload': payload,
+            'attempts': attempts,
+            'total_attempts': previous_attempts + attempts,
+            'error': str(error)[:1000],
+            'transient': is_transient(error),
+            'not_before': time.monotonic() + min(self.backoff * 2 ** (attempts - 1), self.max_backoff),
+        }
+        with self._lock:
+            if attempts >= self.max_attempts or not item['transient']:
+                self.exhausted.append(item)
+                return False
+            self._items[key] = item
+        return True
+
+    def take(self):
+        """Wait until the earliest queued item may be retried and return
+        every item that is due by then, removing them from the queue"""
+        with self._lock:
+            if not self._items:
+                return []
+            wait = min(item['not_before'] for item in self._items.values()) - time.monotonic()
+        if wait > 0:
+            self.logger.info(f"Waiting {wait:.1f}s before retrying {len(self._items)} failed fetches")
+            time.sleep(wait)
+        now = time.monotonic()
+        with self._lock:
+            due = [item for item in self._items.values() if item['not_before'] <= now]
+            for item in due:
+                del self._items[item['key']]
+        return due
+
+
+def entry_to_json(post_data):
+    """Listing entry as JSON, for saving a failed post fetch"""
+    entry = dict(post_data)
+    if isinstance(entry.get('publish_date'), datetime):
+        entry['publish_date'] = entry['publish_date'].isoformat()
+    return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def entry_from_json(value):
+    entry = json.loads(value)
+    if entry.get('publish_date'):
+        try:
+            entry['publish_date'] = datetime.fromisoformat(entry['publish_date'])
+        except ValueError:
+            entry['publish_date'] = None
+    return entry
+
+
+def save_failed_posts(session, items, max_attempts=10):
+    """Save post and listing page fetches that failed for good this run;
+    they are retried first on the next run. Those that have failed
+    ``max_attempts`` times in total, or with a permanent error, are dropped.
+    Listing pages are saved with the entry ``{'listing_pages': [...],
+    'incremental': ...}``. The caller commits the session."""
+    from database.models import FailedFetch
+    if not items:
+        return 0
+    urls = [item['key'] for item in items]
+    stored = {row.url: row for row in session.query(FailedFetch).filter(FailedFetch.url.in_(urls))}
+    now = datetime.utcnow()
+    saved = 0
+    for item in items:
+        row = stored.get(item['key'])
+        if item['total_attempts'] >= max_attempts or not item['transient']:
+            if row is not None:
+                session.delete(row)
+            continue
+        if row is None:
+            row = FailedFetch(url=item['key'], first_failed_at=now)
+            session.add(row)
+        if item['kind'] == 'page':
+            category_id, page_urls, incremental = item['payload']
+            row.entry = json.dumps({'listing_pages': page_urls, 'incremental': incremental})
+        else:
+            category_id, post_data = item['payload']
+            row.entry = entry_to_json(post_data)
+        row.category_id = category_id
+        row.attempts = item['total_attempts']
+        row.last_error = item['error']
+        row.last_failed_at = now
+        saved += 1
+    return saved
+
+
+def load_failed_posts(session):
+    """Posts and listing pages that failed in earlier runs, as (url,
+    category id, entry, attempts)"""
+    from database.models import FailedFetch
+    return [
+        (row.url, row.category_id, entry_from_json(row.entry), row.attempts or 0)
+        for row in session.execute(select(FailedFetch).order_by(FailedFetch.last_failed_at)).scalars()
+    ]
+
+
+def clear_failed_posts(session, urls):
+    """Forget saved failures of posts or listing pages that have now been fetched"""
+    from database.models import FailedFetch
+    if urls:
+        session.query(FailedFetch).filter(FailedFetch.url.in_(list(urls))).delete(synchronize_session=False)
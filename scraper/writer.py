@@ -0,0 +1,272 @@
+from datetime import datetime
+
+from sqlalchemy import bindparam, delete, select, update
+
+from scraper.fingerprint import post_fingerprint
+
+
+def build_post_record(post_data, content_data):
+    """Combine a listing entry and its parsed page into one post record.
+
+    Attachments are de-duplicated by URL (the same file can be linked more
+    than once on a page) and the content fingerprint is computed.
+    """
+    attachments = []
+    seen_files = set()
+    for att_data in content_data['attachments']:
+        if att_data['file_url'] not in seen_files:
+            seen_files.add(att_data['file_url'])
+            attachments.append(att_data)
+
+    record = {
+        'url': post_data['url'],
+        'title': post_data['title'],
+        'excerpt': post_data.get('excerpt', ''),
+        'publish_date': post_data.get('publish_date'),
+        'content': content_data['content'],
+        'meta_description': content_data['meta_description'],
+        'tags': content_data['tags'],
+        'attachments': attachments,
+    }
+    record['content_hash'] = post_fingerprint(
+        record['title'],
+        record['excerpt'],
+        record['content'],
+        record['meta_description'],
+        record['tags'],
+        attachments
+    )
+    return record
+
+
+def _dialect_insert(session):
+    """The dialect-specific ``insert`` construct with ON CONFLICT support"""
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+class PostBatchWriter:
+    """Persists batches of scraped posts with a constant number of queries.
+
+    Existing posts of a batch are resolved with one query, new and changed
+    posts are written with one ``INSERT ... ON CONFLICT (url) DO UPDATE``
+    and their attachments are diffed and upserted in bulk. Only SQLite and
+    PostgreSQL are supported; see ``supports``.
+    """
+
+    def __init__(self, session, batch_size=50):
+        self.session = session
+        self.batch_size = batch_size
+        self._insert = _dialect_insert(session)
+
+    @staticmethod
+    def supports(session):
+        return _dialect_insert(session) is not None
+
+    def write(self, records, category):
+        """Persist post records (see ``build_post_record``) for a category.
+
+        Returns a dict mapping each URL to 'new', 'updated' or 'unchanged'.
+        The caller commits the session.
+        """
+        results = {}
+        # Later records win when a URL shows up twice
+        unique = list({record['url']: record for record in records}.values())
+        for start in range(0, len(unique), self.batch_size):
+            results.update(self._write_batch(unique[start:start + self.batch_size], category))
+        return results
+
+    def _write_batch(self, records, category):
+        from database.models import Post
+
+        rows = self.session.execute(
+            select(Post.id, Post.url, Post.content_hash, Post.category_type)
+            .where(Post.url.in_([record['url'] for record in records]))
+        ).all()
+        existing = {row.url: row for row in rows}
+        stored_hashes = self._stored_hashes(
+            [row.id for row in rows if row.content_hash is None]
+        )
+
+        results = {}
+        to_write = []
+        backfill = []
+        for record in records:
+            row = existing.get(record['url'])
+            if row is None:
+                results[record['url']] = 'new'
+                to_write.append(record)
+                continue
+            stored_hash = row.content_hash or stored_hashes.get(row.id)
+            if stored_hash == record['content_hash'] and row.category_type == category.category_type:
+                results[record['url']] = 'unchanged'
+                if row.content_hash is None:
+                    backfill.append({'b_id': row.id, 'b_hash': record['content_hash']})
+            else:
+                results[record['url']] = 'updated'
+                to_write.append(record)
+
+        if backfill:
+            # Fill in the hash of posts stored before fingerprints existed
+            posts = Post.__table__
+            self.session.execute(
+                update(posts).where(posts.c.id == bindparam('b_id')).values(content_hash=bindparam('b_hash')),
+                backfill
+            )
+        if to_write:
+            post_ids = self._upsert_posts(to_write, category)
+            self._sync_attachments(to_write, post_ids, existing)
+        return results
+
+    def _stored_hashes(self, post_ids):
+        """Fingerprints for stored posts that have no content_hash yet"""
+        from database.models import Post, Attachment
+        if not post_ids:
+            return {}
+
+        attachments = {}
+        for att in self.session.execute(
+            select(Attachment.post_id, Attachment.file_url, Attachment.file_name, Attachment.file_type)
+            .where(Attachment.post_id.in_(post_ids))
+        ):
+            attachments.setdefault(att.post_id, []).append(
+                {'file_url': att.file_url, 'file_name': att.file_name, 'file_type': att.file_type}
+            )
+
+        hashes = {}
+        for post in self.session.execute(
+            select(Post.id, Post.title, Post.excerpt, Post.content, Post.meta_description, Post.tags)
+            .where(Post.id.in_(post_ids))
+        ):
+            hashes[post.id] = post_fingerprint(
+                post.title, post.excerpt, post.content, post.meta_description, post.tags,
+                attachments.get(post.id, [])
+            )
+        return hashes
+
+    def _upsert_posts(self, records, category):
+        """Insert or update posts, returning a dict of URL -> post id"""
+        from database.models import Post
+        now = datetime.utcnow()
+        stmt = self._insert(Post.__table__).values([
+            {
+                'title': record['title'],
+                'url': record['url'],
+                'content': record['content'],
+                'excerpt': record['excerpt'],
+                'category_id': category.id,
+                'publish_date': record['publish_date'],
+                'meta_description': record['meta_description'],
+                'tags': record['tags'],
+                'content_hash': record['content_hash'],
+                'category_type': category.category_type,
+                'is_active': True,
+                'scraped_at': now,
+                'last_modified': now,
+            }
+            for record in records
+        ])
+        # Only content columns are updated on conflict; category_id,
+        # publish_date and scraped_at keep their original values
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['url'],
+            set_={
+                'title': stmt.excluded.title,
+                'content': stmt.excluded.content,
+                'excerpt': stmt.excluded.excerpt,
+                'meta_description': stmt.excluded.meta_description,
+                'tags': stmt.excluded.tags,
+                'content_hash': stmt.excluded.content_hash,
+                'category_type': stmt.excluded.category_type,
+                'last_modified': stmt.excluded.last_modified,
+            }
+        ).returning(Post.__table__.c.id, Post.__table__.c.url)
+        return {row.url: row.id for row in self.session.execute(stmt)}
+
+    def _sync_attachments(self, records, post_ids, existing):
+        """Diff attachments by URL: delete removed ones, upsert the rest"""
+        from database.models import Attachment
+        stored = {}
+        existing_ids = [existing[record['url']].id for record in records if record['url'] in existing]
+        if existing_ids:
+            for att in self.session.execute(
+                select(Attachment.id, Attachment.post_id, Attachment.file_url,
+                       Attachment.file_name, Attachment.file_type)
+                .where(Attachment.post_id.in_(existing_ids))
+            ):
+                stored[(att.post_id, att.file_url)] = att
+
+        wanted = {}
+        for record in records:
+            post_id = post_ids[record['url']]
+            for att_data in record['attachments']:
+                wanted[(post_id, att_data['file_url'])] = att_data
+
+        removed = [att.id for key, att in stored.items() if key not in wanted]
+        if removed:
+            self.session.execute(delete(Attachment).where(Attachment.id.in_(removed)))
+
+        now = datetime.utcnow()
+        values = [
+            {
+                'post_id': post_id,
+                'file_url': file_url,
+                'file_name': att_data['file_name'],
+                'file_type': att_data['file_type'],
+                'created_at': now,
+            }
+            for (post_id, file_url), att_data in wanted.items()
+            if (post_id, file_url) not in stored
+            or (stored[(post_id, file_url)].file_name, stored[(post_id, file_url)].file_type)
+            != (att_data['file_name'], att_data['file_type'])
+        ]
+        if values:
+            stmt = self._insert(Attachment.__table__).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['post_id', 'file_url'],
+                set_={
+                    'file_name': stmt.excluded.file_name,
+                    'file_type': stmt.excluded.file_type,
+                }
+            )
+            self.session.execute(stmt)
+
+
+def link_post_categories(session, memberships):
+    """Record which categories list which posts.
+
+    ``memberships`` maps post URLs to category ids. Only links that are
+    missing are inserted, so a post keeps every category it was ever
+    listed in. Returns the number of links added; the caller commits.
+    """
+    from database.models import Post, PostCategory
+    if not memberships:
+        return 0
+    post_ids = dict(session.execute(
+        select(Post.url, Post.id).where(Post.url.in_(list(memberships)))
+    ).all())
+    wanted = {
+        (post_ids[url], category_id)
+        for url, category_ids in memberships.items() if url in post_ids
+        for category_id in category_ids
+    }
+    if not wanted:
+        return 0
+    stored = set(session.execute(
+        select(PostCategory.post_id, PostCategory.category_id)
+        .where(PostCategory.post_id.in_({post_id for post_id, _ in wanted}))
+    ).all())
+    now = datetime.utcnow()
+    missing = [
+        {'post_id': post_id, 'category_id': category_id, 'created_at': now}
+        for post_id, category_id in wanted - stored
+    ]
+    if missing:
+        session.execute(PostCategory.__table__.insert(), missing)
+    return len(missing)
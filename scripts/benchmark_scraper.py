@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Offline scraper benchmark.
+
+Record real responses once:
+
+    python scripts/benchmark_scraper.py fixtures/ --record --categories anakoinoseis-farmaka
+
+Then replay them as often as needed, without network access:
+
+    python scripts/benchmark_scraper.py fixtures/ --latency 0.05 --json results.json
+    python scripts/benchmark_scraper.py fixtures/ --baseline results.json
+
+Reports pages/s for a full ``run_full_scrape`` over the replayed site,
+parse ms/page over every recorded page, and DB ms/post for writing the
+parsed posts to a fresh database. With ``--baseline`` the run fails when a
+metric is more than ``--tolerance`` worse than the baseline.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import SCRAPER_CONFIG
+from database.models import DatabaseManager
+from scraper.eof_scraper import EOFScraper
+from scraper.parsing import parse_listing_html, parse_post_html
+from scraper.replay import RecordingAdapter, ReplayAdapter, fixture_body, load_fixtures
+from scraper.writer import PostBatchWriter, build_post_record
+import argparse
+import json
+import logging
+import shutil
+import tempfile
+import time
+
+# Metrics compared against a baseline, and whether higher is better
+COMPARED_METRICS = {
+    'pages_per_second': True,
+    'parse_ms_per_page': False,
+    'db_ms_per_post_insert': False,
+    'db_ms_per_post_unchanged': False,
+}
+
+def make_scraper(db_manager, args, request_delay=None):
+    scraper = EOFScraper(
+        db_manager,
+        request_delay=request_delay,
+        parser_backend=args.parser_backend,
+        parse_workers=args.parse_workers
+    )
+    if args.base_url:
+        scraper.base_url = args.base_url
+    # Benchmarks must not fill the HTML archive
+    scraper.archive = None
+    return scraper
+
+def run_scrape(scraper, args):
+    scraper.run_full_scrape(incremental=False, categories=args.categories or None)
+
+def record(args, workdir):
+    """Scrape the live site once, saving every response as a fixture"""
+    db_manager = DatabaseManager(f"sqlite:///{os.path.join(workdir, 'record.db')}")
+    scraper = make_scraper(db_manager, args, args.request_delay)
+    pool_size = SCRAPER_CONFIG['max_concurrency_per_host']
+    scraper.mount_transport(RecordingAdapter(args.fixture_dir, pool_connections=pool_size, pool_maxsize=pool_size))
+    run_scrape(scraper, args)
+    print(f"Recorded {len(os.listdir(args.fixture_dir))} fixtures in {args.fixture_dir}")
+
+def benchmark_scrape(args, workdir):
+    """Full scrape against the replayed site"""
+    db_manager = DatabaseManager(f"sqlite:///{os.path.join(workdir, 'replay.db')}")
+    # Politeness delays are pointless against fixtures and would dominate
+    # the timings, so they are off unless asked for
+    scraper = make_scraper(db_manager, args, args.request_delay or 0.0)
+    adapter = ReplayAdapter(args.fixture_dir, latency=args.latency, jitter=args.jitter)
+    scraper.mount_transport(adapter)
+
+    start = time.perf_counter()
+    run_scrape(scraper, args)
+    elapsed = time.perf_counter() - start
+
+    from database.models import Post
+    session = db_manager.get_session()
+    try:
+        posts = {
+            row.url: {'url': row.url, 'title': row.title, 'excerpt': row.excerpt or '', 'publish_date': row.publish_date}
+            for row in session.query(Post.url, Post.title, Post.excerpt, Post.publish_date)
+        }
+    finally:
+        session.close()
+
+    return {
+        'pages': adapter.requests_served,
+        'scrape_seconds': round(elapsed, 3),
+        'pages_per_second': round(adapter.requests_served / elapsed, 2) if elapsed else 0.0,
+    }, posts
+
+def benchmark_parse(args, fixtures, posts):
+    """Parse every recorded HTML page in this process"""
+    listing_times = []
+    post_times = []
+    contents = {}
+    base_url = args.base_url or 'https://www.eof.gr'
+    for fixture in fixtures:
+        content_type = {name.lower(): value for name, value in fixture['headers'].items()}.get('content-type', '')
+        if fixture['status'] != 200 or 'html' not in content_type:
+            continue
+        html = fixture_body(fixture).decode('utf-8', errors='replace')
+        start = time.perf_counter()
+        if fixture['url'] in posts:
+            contents[fixture['url']] = parse_post_html(html, base_url, args.parser_backend)
+            post_times.append(time.perf_counter() - start)
+        else:
+            parse_listing_html(html, base_url, args.parser_backend)
+            listing_times.append(time.perf_counter() - start)
+
+    def ms_per(times):
+        return round(1000 * sum(times) / len(times), 3) if times else 0.0
+
+    return {
+        'parsed_pages': len(listing_times) + len(post_times),
+        'parse_ms_per_page': ms_per(listing_times + post_times),
+        'parse_ms_per_listing': ms_per(listing_times),
+        'parse_ms_per_post': ms_per(post_times),
+    }, contents
+
+def benchmark_db(posts, contents, workdir):
+    """Write the parsed posts to a fresh database, then write them again"""
+    from database.models import Category
+    db_manager = DatabaseManager(f"sqlite:///{os.path.join(workdir, 'db.db')}")
+    records = [build_post_record(posts[url], content_data) for url, content_data in contents.items()]
+    session = db_manager.get_session()
+    try:
+        category = Category(name='Benchmark', slug='benchmark', url='/benchmark/', category_type='benchmark')
+        session.add(category)
+        session.commit()
+
+        timings = {}
+        for phase in ('insert', 'unchanged'):
+            start = time.perf_counter()
+            PostBatchWriter(session).write(records, category)
+            session.commit()
+            elapsed = time.perf_counter() - start
+            timings[f'db_ms_per_post_{phase}'] = round(1000 * elapsed / len(records), 3) if records else 0.0
+    finally:
+        session.close()
+    timings['db_posts'] = len(records)
+    return timings
+
+def compare(results, baseline, tolerance):
+    """Names of the metrics that regressed against the baseline"""
+    regressions = []
+    for name, higher_is_better in COMPARED_METRICS.items():
+        old = baseline.get(name)
+        new = results.get(name)
+        if not old or new is None:
+            continue
+        change = (old - new) / old if higher_is_better else (new - old) / old
+        if change > tolerance:
+            regressions.append(f"{name}: {old} -> {new} ({change:+.0%} worse)")
+    return regressions
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Benchmark the EOF scraper against recorded responses')
+    parser.add_argument('fixture_dir', help='Directory holding the recorded fixtures')
+    parser.add_argument('--record', action='store_true',
+                        help='Scrape the live site and record fixtures instead of benchmarking')
+    parser.add_argument('--categories', nargs='*',
+                        help='Category/subcategory slugs to scrape (default: all)')
+    parser.add_argument('--base-url', default=None,
+                        help='Site to scrape (default: the scraper base URL)')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Simulated seconds per replayed request (default: 0)')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='Random extra seconds per replayed request (default: 0)')
+    parser.add_argument('--request-delay', type=float, default=None,
+                        help='Seconds between request starts (default: SCRAPER_CONFIG when recording, 0 when replaying)')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='Worker processes for HTML parsing (default: SCRAPER_CONFIG parse_workers)')
+    parser.add_argument('--parser-backend', default=SCRAPER_CONFIG['parser_backend'], choices=['lxml', 'bs4'],
+                        help='Parser backend (default: SCRAPER_CONFIG parser_backend)')
+    parser.add_argument('--json', dest='json_path', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative regression against the baseline (default: 0.25)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    workdir = tempfile.mkdtemp(prefix='eof-bench-')
+    try:
+        if args.record:
+            record(args, workdir)
+            return
+
+        if not os.path.isdir(args.fixture_dir):
+            print(f"No fixtures in {args.fixture_dir}, record them first with --record")
+            sys.exit(1)
+
+        results, posts = benchmark_scrape(args, workdir)
+        parse_results, contents = benchmark_parse(args, load_fixtures(args.fixture_dir), posts)
+        results.update(parse_results)
+        results.update(benchmark_db(posts, contents, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, value in results.items():
+        print(f"{name:28} {value}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Conformance check for the scraper's parser backends.
+
+Parses each page with every backend in scraper/parsing.py and reports any
+difference in the extracted post list, pagination URLs or post content.
+Pages can be local HTML files, directories of .html files or URLs.
+
+Usage:
+    python scripts/check_parser_backends.py page.html saved_pages/ https://www.eof.gr/category/farmaka/
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+import requests
+
+from scraper.parsing import PARSER_BACKENDS, parse_page
+
+BASE_URL = 'https://www.eof.gr'
+
+def iter_pages(sources):
+    """Yield (name, html) for every file, directory entry or URL given"""
+    for source in sources:
+        if source.startswith('http://') or source.startswith('https://'):
+            response = requests.get(source, timeout=30)
+            response.raise_for_status()
+            yield source, response.text
+        elif os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.endswith('.html') or name.endswith('.htm'):
+                    path = os.path.join(source, name)
+                    with open(path, encoding='utf-8', errors='replace') as f:
+                        yield path, f.read()
+        else:
+            with open(source, encoding='utf-8', errors='replace') as f:
+                yield source, f.read()
+
+def extract(html, backend):
+    """Run every extractor of a backend, timing the whole page"""
+    start = time.perf_counter()
+    page = parse_page(html, BASE_URL, backend)
+    result = {
+        'post_list': page.post_list(),
+        'pagination_urls': page.pagination_urls(),
+        'post_content': page.post_content(),
+    }
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare parser backends on real pages')
+    parser.add_argument('sources', nargs='+', help='HTML files, directories or URLs')
+    args = parser.parse_args()
+    
+    backends = sorted(PARSER_BACKENDS)
+    reference = backends[0]
+    timings = {backend: 0.0 for backend in backends}
+    pages = 0
+    mismatches = 0
+    
+    for name, html in iter_pages(args.sources):
+        pages += 1
+        results = {}
+        for backend in backends:
+            results[backend], elapsed = extract(html, backend)
+            timings[backend] += elapsed
+        
+        for backend in backends[1:]:
+            for key in results[reference]:
+                if results[backend][key] != results[reference][key]:
+                    mismatches += 1
+                    print(f"✗ {name}: {key} differs between {reference} and {backend}")
+                    print(f"    {reference}: {results[reference][key]!r}"[:500])
+                    print(f"    {backend}: {results[backend][key]!r}"[:500])
+    
+    print(f"\nChecked {pages} pages, {mismatches} mismatches")
+    for backend in backends:
+        per_page = timings[backend] / pages * 1000 if pages else 0
+        print(f"  {backend}: {per_page:.2f} ms/page")
+    
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Download PDF attachments and store their text, working through the whole
+backlog, e.g. from cron. The scheduler's attachment job only extracts a
+limited number of files each run.
+Attachments are HEAD-probed first, since only probed files are extracted.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper.eof_scraper import EOFScraper
+from database.models import DatabaseManager
+import argparse
+import logging
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Extract the text of PDF attachments')
+    parser.add_argument('--batch-size', type=int, default=200,
+                        help='Files per batch (default: 200)')
+    args = parser.parse_args()
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger = logging.getLogger(__name__)
+    
+    scraper = EOFScraper(DatabaseManager(), logger)
+    while scraper.probe_attachments(limit=args.batch_size):
+        pass
+    
+    total = 0
+    while True:
+        extracted = scraper.extract_attachment_texts(limit=args.batch_size)
+        total += extracted
+        if extracted == 0:
+            break
+    logger.info(f"Extracted text of {total} attachment files")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Index the products, lot numbers, expiry dates and MAHs of every recall
+post for ``/recalls/lookup``. Scrapes only index a limited number of
+posts each run; this works through the whole backlog. Run it after
+changing the extraction rules in scraper/entities.py with ``--rebuild``.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper.eof_scraper import EOFScraper
+from database.models import DatabaseManager, RecallIndexState
+import argparse
+import logging
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Index recall entities for exact lookups')
+    parser.add_argument('--batch-size', type=int, default=2000,
+                        help='Posts per batch (default: 2000)')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Re-index posts that are already indexed')
+    args = parser.parse_args()
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger = logging.getLogger(__name__)
+    
+    db_manager = DatabaseManager()
+    if args.rebuild:
+        session = db_manager.get_session()
+        try:
+            session.query(RecallIndexState).delete()
+            session.commit()
+        finally:
+            session.close()
+    
+    scraper = EOFScraper(db_manager, logger)
+    total = 0
+    while True:
+        indexed = scraper.index_recall_entities(limit=args.batch_size)
+        total += indexed
+        if indexed == 0:
+            break
+    logger.info(f"Indexed {total} recall posts")
+
+if __name__ == "__main__":
+    main()
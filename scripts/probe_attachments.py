@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+HEAD-probe attachments that were never probed, to fill in their size,
+content type and last-modified date. The scheduler's attachment job
+probes a limited number of attachments each run; use this to work through
+an existing backlog.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper.eof_scraper import EOFScraper
+from database.models import DatabaseManager
+import argparse
+import logging
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Probe attachment metadata')
+    parser.add_argument('--batch-size', type=int, default=500,
+                        help='Attachment URLs per batch (default: 500)')
+    args = parser.parse_args()
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger = logging.getLogger(__name__)
+    
+    scraper = EOFScraper(DatabaseManager(), logger)
+    total = 0
+    while True:
+        probed = scraper.probe_attachments(limit=args.batch_size)
+        total += probed
+        if probed == 0:
+            break
+    logger.info(f"Probed metadata of {total} attachment URLs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Rebuild posts and attachments from the HTML archive without re-crawling.
+
+Run this after changing a selector in scraper/parsing.py.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import SCRAPER_CONFIG
+from database.models import DatabaseManager
+from scraper.archive import HtmlArchive
+from scraper.reparse import reparse_archive
+import argparse
+import logging
+import time
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Re-parse archived EOF pages into the database')
+    parser.add_argument('--archive-dir', default=SCRAPER_CONFIG['html_archive_dir'],
+                        help='Archive directory (default: SCRAPER_CONFIG html_archive_dir)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Parser processes (default: one per core)')
+    parser.add_argument('--parser-backend', default=SCRAPER_CONFIG['parser_backend'], choices=['lxml', 'bs4'],
+                        help='Parser backend (default: SCRAPER_CONFIG parser_backend)')
+    args = parser.parse_args()
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger = logging.getLogger(__name__)
+    
+    if not args.archive_dir or not os.path.isdir(args.archive_dir):
+        logger.error(f"No HTML archive at {args.archive_dir}")
+        sys.exit(1)
+    
+    start = time.time()
+    counts = reparse_archive(
+        DatabaseManager(),
+        HtmlArchive(args.archive_dir),
+        base_url=SCRAPER_CONFIG['base_url'],
+        backend=args.parser_backend,
+        workers=args.workers,
+        logger=logger
+    )
+    logger.info(f"Re-parsed {counts['parsed']} posts in {time.time() - start:.1f}s")
+    if counts['failed']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
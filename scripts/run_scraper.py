@@ -9,7 +9,9 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scraper.eof_scraper import EOFScraper
+from scraper.lease import LeaseUnavailable
 from database.models import DatabaseManager
+import argparse
 import logging
 from datetime import datetime
 
@@ -33,6 +35,15 @@ def setup_logging():
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description='Run the EOF scraper')
+    parser.add_argument('--full', action='store_true',
+                        help='Re-crawl every listing page and post instead of only new/changed posts')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='Worker processes for HTML parsing (default: SCRAPER_CONFIG parse_workers)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Categories scraped in parallel (default: SCRAPER_CONFIG category_workers)')
+    args = parser.parse_args()
+    
     logger = setup_logging()
     
     logger.info("="*50)
@@ -44,13 +55,16 @@ def main():
         db_manager = DatabaseManager()
         
         # Initialize scraper
-        scraper = EOFScraper(db_manager, logger)
+        scraper = EOFScraper(db_manager, logger, parse_workers=args.parse_workers)
         
-        # Run full scrape
-        scraper.run_full_scrape()
+        # Run the scrape (incremental unless --full is given)
+        scraper.run_full_scrape(incremental=not args.full, workers=args.workers)
         
         logger.info("Scraper run completed successfully!")
         
+    except LeaseUnavailable as e:
+        # Another run (scheduler or an earlier cron job) is still going
+        logger.warning(f"Not starting, another scrape is running: {e}")
     except Exception as e:
         logger.error(f"Error during scraping: {e}", exc_info=True)
         raise
@@ -11,6 +11,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scraper.eof_scraper import EOFScraper
+from scraper.lease import LeaseUnavailable
 from database.models import DatabaseManager
 import logging
 import subprocess
@@ -43,6 +44,9 @@ cd /opt/drugalert.gr
 
 # Run the scraper
 /usr/bin/python3 scripts/run_scraper.py >> logs/cron_scraper.log 2>&1
+
+# Probe attachments and extract PDF text, apart from the scrape
+/usr/bin/python3 scripts/extract_attachment_texts.py >> logs/cron_attachments.log 2>&1
 """
     
     script_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'cron_scraper.sh')
@@ -95,8 +99,11 @@ def main():
     
     print("Starting full scrape of all categories...")
     try:
-        scraper.run_full_scrape()
-        print("Full scrape completed successfully!")
+        try:
+            scraper.run_full_scrape(incremental=False)
+            print("Full scrape completed successfully!")
+        except LeaseUnavailable as e:
+            print(f"Skipping the full scrape, another scrape is running: {e}")
         
         # Setup cron job
         print("\nSetting up automated scraping...")
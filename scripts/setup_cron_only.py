@@ -19,6 +19,9 @@ cd /opt/drugalert.gr
 
 # Run the scraper
 /usr/bin/python3 scripts/run_scraper.py >> logs/cron_scraper.log 2>&1
+
+# Probe attachments and extract PDF text, apart from the scrape
+/usr/bin/python3 scripts/extract_attachment_texts.py >> logs/cron_attachments.log 2>&1
 """
     
     script_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'cron_scraper.sh')
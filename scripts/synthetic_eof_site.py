@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Synthetic stand-in for eof.gr, for load-testing the scraper locally.
+
+Serves WordPress-like category listings with pagination, post pages with
+PDF attachments, the attachments themselves and the ``/wp-json/wp/v2``
+posts and categories endpoints, for every category in
+``EOFScraper.categories``. Pages are generated on request from the post
+number, so a site with 100k+ posts costs no memory or start-up time.
+
+    python scripts/synthetic_eof_site.py --posts-per-category 5000 --latency 0.05
+
+Then point the scraper at it, e.g. with
+``scripts/benchmark_scraper.py --record --base-url http://127.0.0.1:8900``.
+
+Listings support ETag/Last-Modified and 304 responses, pages past the last
+one return 404 like WordPress does, and ``--new-post-every`` makes posts
+appear over time. Main category listings only show their own posts, not
+those of their subcategories.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper.eof_scraper import EOFScraper
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+POST_PATH = re.compile(r'^/([a-z0-9-]+)-p(\d+)/$')
+ATTACHMENT_PATH = re.compile(r'^/wp-content/uploads/synthetic/([a-z0-9-]+)-p(\d+)-(\d+)\.pdf$')
+PAGE_SUFFIX = re.compile(r'page/(\d+)/$')
+
+def minimal_pdf(text):
+    """A small valid one-page PDF showing ``text`` (ASCII only)"""
+    escaped = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    stream = f"BT /F1 12 Tf 72 720 Td ({escaped}) Tj ET".encode('latin-1')
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b"%010d 00000 n \n" % offset
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+class SyntheticSite:
+    """Deterministic content of the synthetic site.
+
+    Posts of a category are numbered 1..count, oldest first. Post ``k`` of a
+    category is published ``spacing`` after post ``k - 1``; posts added
+    while the server runs are published when they appear.
+    """
+
+    def __init__(self, posts_per_category=200, per_page=10, attachments_per_post=1, spacing=timedelta(days=1),
+                 new_post_every=0, padding_kb=30, seed=1):
+        self.per_page = per_page
+        self.attachments_per_post = attachments_per_post
+        self.spacing = spacing
+        self.new_post_every = new_post_every
+        self.started = datetime.now(timezone.utc).replace(microsecond=0)
+        self.padding = '<nav class="menu">' + ''.join(
+            f'<a href="/menu-{i}/">Μενού {i}</a>' for i in range(padding_kb * 40)
+        ) + '</nav>' if padding_kb else ''
+
+        rng = random.Random(seed)
+        self.categories = {}
+        self.paths = {}
+        for number, (slug, name, url, parent_slug, category_type) in enumerate(EOFScraper(None).category_targets(), 1):
+            # Vary the size of categories, recalls and announcements being the busiest
+            weight = rng.uniform(0.2, 1.0) * (2 if slug.startswith(('anakliseis', 'anakoinoseis')) else 1)
+            self.categories[slug] = {
+                'id': number,
+                'name': name,
+                'url': url,
+                'base_count': max(1, int(posts_per_category * weight)),
+            }
+            self.paths[url] = slug
+
+    @property
+    def total_posts(self):
+        return sum(self.count(slug) for slug in self.categories)
+
+    def count(self, slug):
+        """Number of posts a category has right now"""
+        count = self.categories[slug]['base_count']
+        if self.new_post_every:
+            count += int((datetime.now(timezone.utc) - self.started).total_seconds() // self.new_post_every)
+        return count
+
+    def post_date(self, slug, k):
+        base_count = self.categories[slug]['base_count']
+        if k <= base_count:
+            return self.started - self.spacing * (base_count - k)
+        return self.started + timedelta(seconds=self.new_post_every * (k - base_count))
+
+    def post_url(self, slug, k):
+        return f"/{slug}-p{k}/"
+
+    def attachment_url(self, slug, k, j):
+        return f"/wp-content/uploads/synthetic/{slug}-p{k}-{j}.pdf"
+
+    def product(self, slug, k):
+        """Recall details of a post, also used in its attachments"""
+        digest = hashlib.md5(f"{slug}/{k}".encode('utf-8')).hexdigest()
+        date = self.post_date(slug, k)
+        return {
+            'name': f"SYNTHOMED {digest[:4].upper()} {int(digest[4:6], 16) % 50 * 10 + 10}mg",
+            'lot': f"L{digest[6:12].upper()}",
+            'expiry': f"{(date.month % 12) + 1:02d}/{date.year + 2}",
+            'mah': f"Synthetic Pharma {digest[12].upper()} A.E.",
+        }
+
+    def title(self, slug, k):
+        product = self.product(slug, k)
+        return f"{self.categories[slug]['name']}: {product['name']} ({k})"
+
+    def listing(self, slug, page):
+        """HTML of a listing page, or None past the last page"""
+        count = self.count(slug)
+        last_page = max(1, -(-count // self.per_page))
+        if page > last_page:
+            return None, None
+        newest = count - (page - 1) * self.per_page
+        numbers = range(newest, max(0, newest - self.per_page), -1)
+
+        articles = []
+        for k in numbers:
+            date = self.post_date(slug, k)
+            articles.append(
+                f'<article class="post type-post"><div class="entry-header">'
+                f'<h3 class="entry-title"><a href="{self.post_url(slug, k)}">{self.title(slug, k)}</a></h3>'
+                f'<time datetime="{date.isoformat()}">{date.strftime("%d/%m/%Y")}</time></div>'
+                f'<div class="entry-summary"><p>Ο ΕΟΦ ενημερώνει για το προϊόν {self.product(slug, k)["name"]}.</p></div>'
+                f'</article>'
+            )
+
+        # WordPress shows the first and last pages plus two on each side of the current one
+        base = self.categories[slug]['url']
+        shown = sorted({1, last_page} | set(range(max(1, page - 2), min(last_page, page + 2) + 1)))
+        links = []
+        for number in shown:
+            if number == page:
+                links.append(f'<span class="page-numbers current">{number}</span>')
+            else:
+                href = base if number == 1 else f"{base}page/{number}/"
+                links.append(f'<a class="page-numbers" href="{href}">{number}</a>')
+        if page < last_page:
+            links.append(f'<a class="next page-numbers" href="{base}page/{page + 1}/">Επόμενη</a>')
+
+        html = (
+            f'<!DOCTYPE html><html lang="el"><head><meta charset="utf-8">'
+            f'<title>{self.categories[slug]["name"]} - ΕΟΦ</title></head><body>{self.padding}'
+            f'<main>{"".join(articles)}</main>'
+            f'<div class="basel-pagination">{"".join(links)}</div></body></html>'
+        )
+        return html, self.post_date(slug, newest)
+
+    def post(self, slug, k):
+        """HTML of a post page, or None if it does not exist"""
+        if slug not in self.categories or not 1 <= k <= self.count(slug):
+            return None, None
+        product = self.product(slug, k)
+        date = self.post_date(slug, k)
+        attachments = ''.join(
+            f'<p><a href="{self.attachment_url(slug, k, j)}">Ανακοίνωση {j}.pdf</a></p>'
+            for j in range(1, self.attachments_per_post + 1)
+        )
+        html = (
+            f'<!DOCTYPE html><html lang="el"><head><meta charset="utf-8">'
+            f'<meta name="description" content="{self.title(slug, k)}">'
+            f'<title>{self.title(slug, k)} - ΕΟΦ</title></head><body>{self.padding}'
+            f'<article><h1 class="entry-title">{self.title(slug, k)}</h1>'
+            f'<time datetime="{date.isoformat()}">{date.strftime("%d/%m/%Y")}</time>'
+            f'<div class="entry-content">'
+            f'<p>Ο Εθνικός Οργανισμός Φαρμάκων ενημερώνει ότι ο Κάτοχος Άδειας Κυκλοφορίας {product["mah"]} '
+            f'ανακαλεί το προϊόν {product["name"]}.</p>'
+            f'<p>Αριθμός παρτίδας (Lot): {product["lot"]}</p>'
+            f'<p>Ημερομηνία λήξης: {product["expiry"]}</p>'
+            f'{attachments}</div>'
+            f'<div class="tags"><a href="/tag/{slug}/">{slug}</a><a href="/tag/synthetic/">synthetic</a></div>'
+            f'</article></body></html>'
+        )
+        return html, date
+
+    def attachment(self, slug, k, j):
+        if slug not in self.categories or not 1 <= k <= self.count(slug) or not 1 <= j <= self.attachments_per_post:
+            return None, None
+        product = self.product(slug, k)
+        text = f"Product: {product['name']} Lot: {product['lot']} Expiry: {product['expiry']} MAH: {product['mah']}"
+        return minimal_pdf(text), self.post_date(slug, k)
+
+    def rest_posts(self, params):
+        """Posts for /wp-json/wp/v2/posts, returning (items, total pages)"""
+        after = params.get('modified_after')
+        if after:
+            after = datetime.fromisoformat(after.replace('Z', '+00:00'))
+            if after.tzinfo is None:
+                after = after.replace(tzinfo=timezone.utc)
+
+        posts = []
+        for slug in self.categories:
+            count = self.count(slug)
+            first = 1
+            if after:
+                # Posts are in date order, so skip straight to the first newer one
+                low, high = 1, count + 1
+                while low < high:
+                    middle = (low + high) // 2
+                    if self.post_date(slug, middle) > after:
+                        high = middle
+                    else:
+                        low = middle + 1
+                first = low
+            posts.extend((self.post_date(slug, k), slug, k) for k in range(first, count + 1))
+        posts.sort(reverse=params.get('order', 'desc') == 'desc')
+
+        per_page = min(100, int(params.get('per_page', 10)))
+        page = int(params.get('page', 1))
+        total_pages = max(1, -(-len(posts) // per_page))
+        items = [
+            {
+                'id': self.categories[slug]['id'] * 10_000_000 + k,
+                'link': self.post_url(slug, k),
+                'date': date.replace(tzinfo=None).isoformat(),
+                'modified': date.replace(tzinfo=None).isoformat(),
+                'title': {'rendered': self.title(slug, k)},
+                'excerpt': {'rendered': f'<p>Ο ΕΟΦ ενημερώνει για το προϊόν {self.product(slug, k)["name"]}.</p>'},
+                'categories': [self.categories[slug]['id']],
+            }
+            for date, slug, k in posts[(page - 1) * per_page:page * per_page]
+        ]
+        return items, total_pages
+
+    def rest_categories(self, params):
+        items = [{'id': info['id'], 'slug': slug, 'name': info['name']} for slug, info in self.categories.items()]
+        return items, 1
+
+class SyntheticSiteHandler(BaseHTTPRequestHandler):
+    server_version = 'SyntheticEOF/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head=False):
+        server = self.server
+        delay = server.latency + (random.uniform(0, server.jitter) if server.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        with server.lock:
+            server.requests += 1
+        if server.error_rate and random.random() < server.error_rate:
+            return self.respond(503, b'Service Unavailable', 'text/plain', head=head)
+
+        site = server.site
+        url = urlparse(self.path)
+        path = url.path
+
+        if path.startswith('/wp-json/wp/v2/'):
+            params = {name: values[0] for name, values in parse_qs(url.query).items()}
+            endpoint = path[len('/wp-json/wp/v2/'):].strip('/')
+            if endpoint not in ('posts', 'categories'):
+                return self.respond(404, b'[]', 'application/json', head=head)
+            items, total_pages = getattr(site, f'rest_{endpoint}')(params)
+            base = f"http://{self.headers.get('Host', 'localhost')}"
+            for item in items:
+                if 'link' in item:
+                    item['link'] = base + item['link']
+            return self.respond(200, json.dumps(items).encode('utf-8'), 'application/json',
+                                extra_headers={'X-WP-TotalPages': str(total_pages)}, head=head)
+
+        page = 1
+        listing_path = path
+        match = PAGE_SUFFIX.search(path)
+        if match:
+            page = int(match.group(1))
+            listing_path = path[:match.start()]
+        if listing_path in site.paths:
+            html, modified = site.listing(site.paths[listing_path], page)
+            return self.respond_page(html, modified, 'text/html; charset=UTF-8', head)
+
+        match = POST_PATH.match(path)
+        if match:
+            html, modified = site.post(match.group(1), int(match.group(2)))
+            return self.respond_page(html, modified, 'text/html; charset=UTF-8', head)
+
+        match = ATTACHMENT_PATH.match(path)
+        if match:
+            body, modified = site.attachment(match.group(1), int(match.group(2)), int(match.group(3)))
+            return self.respond_page(body, modified, 'application/pdf', head)
+
+        self.respond(404, b'<html><body>Not found</body></html>', 'text/html; charset=UTF-8', head=head)
+
+    def respond_page(self, body, modified, content_type, head):
+        if body is None:
+            return self.respond(404, b'<html><body>Not found</body></html>', 'text/html; charset=UTF-8', head=head)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        headers = {'ETag': etag, 'Last-Modified': format_datetime(modified, usegmt=True)}
+        if self.headers.get('If-None-Match') == etag:
+            return self.respond(304, b'', None, extra_headers=headers, head=True)
+        self.respond(200, body, content_type, extra_headers=headers, head=head)
+
+    def respond(self, status, body, content_type, extra_headers=None, head=False):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)) if status != 304 else '0')
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+def start_server(site, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0, verbose=False):
+    """Serve ``site`` in a background thread; returns the server.
+
+    The site's base URL is ``f"http://{host}:{server.server_port}"``.
+    Call ``server.shutdown()`` to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), SyntheticSiteHandler)
+    server.daemon_threads = True
+    server.site = site
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.verbose = verbose
+    server.requests = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, name='synthetic-eof-site', daemon=True).start()
+    return server
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Serve a synthetic EOF site for scraper load tests')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--posts-per-category', type=int, default=200,
+                        help='Average posts per category (default: 200)')
+    parser.add_argument('--per-page', type=int, default=10, help='Posts per listing page (default: 10)')
+    parser.add_argument('--attachments', type=int, default=1, help='PDF attachments per post (default: 1)')
+    parser.add_argument('--padding-kb', type=int, default=30,
+                        help='Approximate size of the navigation boilerplate on every page (default: 30)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random extra seconds per response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--new-post-every', type=float, default=0,
+                        help='Add a post to every category each N seconds (default: never)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    site = SyntheticSite(
+        posts_per_category=args.posts_per_category,
+        per_page=args.per_page,
+        attachments_per_post=args.attachments,
+        new_post_every=args.new_post_every,
+        padding_kb=args.padding_kb,
+        seed=args.seed
+    )
+    server = start_server(site, args.host, args.port, args.latency, args.jitter, args.error_rate, args.verbose)
+    print(f"Synthetic EOF site with {site.total_posts} posts in {len(site.categories)} categories "
+          f"at http://{args.host}:{server.server_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Watch the EOF recall subcategories and store new recalls within a minute.
+
+Can run next to the scheduler or a cron-driven scraper; see
+scraper/recall_watcher.py.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper.recall_watcher import RecallWatcher
+from database.models import DatabaseManager
+import argparse
+import logging
+import signal
+
+stop_requested = False
+
+def handle_signal(signum, frame):
+    global stop_requested
+    stop_requested = True
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Watch the EOF recall subcategories')
+    parser.add_argument('--interval', type=int, default=60,
+                        help='Seconds between checks (default: 60)')
+    parser.add_argument('--once', action='store_true',
+                        help='Check once and exit')
+    args = parser.parse_args()
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger = logging.getLogger(__name__)
+    
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+    
+    watcher = RecallWatcher(DatabaseManager(), logger)
+    if args.once:
+        try:
+            scraped, new, updated = watcher.poll()
+            logger.info(f"Recall check complete: {scraped} scraped, {new} new, {updated} updated")
+        finally:
+            watcher.scraper.close()
+    else:
+        watcher.run(interval=args.interval, should_stop=lambda: stop_requested)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models import DatabaseManager
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """DatabaseManager on a fresh SQLite file"""
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'test.db'}")
+    yield manager
+    manager.engine.dispose()
+
+
+@pytest.fixture
+def session(db_manager):
+    session = db_manager.get_session()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def synthetic_server():
+    """Server of a small synthetic EOF site (scripts/synthetic_eof_site.py)"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+    from synthetic_eof_site import SyntheticSite, start_server
+    server = start_server(SyntheticSite(posts_per_category=12, padding_kb=0, attachments_per_post=0))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def synthetic_site(synthetic_server):
+    """Base URL of the synthetic site"""
+    return f"http://127.0.0.1:{synthetic_server.server_port}"
+
+
+@pytest.fixture
+def make_scraper(db_manager, monkeypatch):
+    """Factory of EOFScrapers for the synthetic site: sequential categories,
+    no request delays, short retry backoffs and no HTML archive"""
+    from config.config import SCRAPER_CONFIG
+    from scraper.eof_scraper import EOFScraper
+    monkeypatch.setitem(SCRAPER_CONFIG, 'max_requests_per_second', 0)
+    monkeypatch.setitem(SCRAPER_CONFIG, 'retry_backoff_seconds', 0.01)
+    monkeypatch.setitem(SCRAPER_CONFIG, 'category_workers', 1)
+    monkeypatch.setitem(SCRAPER_CONFIG, 'html_archive_dir', '')
+
+    def make(base_url):
+        scraper = EOFScraper(db_manager, request_delay=0, discovery='crawl')
+        scraper.base_url = base_url
+        return scraper
+    return make
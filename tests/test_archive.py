@@ -0,0 +1,78 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from scraper.archive import HtmlArchive
+
+NOW = datetime(2026, 1, 31)
+
+
+def archived_objects(archive):
+    return sorted(name for _, _, names in os.walk(os.path.join(archive.root, 'objects')) for name in names)
+
+
+def test_store_deduplicates_page_bodies(tmp_path):
+    archive = HtmlArchive(str(tmp_path))
+    first = archive.store('https://example.org/a', '<html>a</html>')
+    second = archive.store('https://example.org/b', '<html>a</html>')
+    assert first == second
+    assert len(archived_objects(archive)) == 1
+    assert [entry['url'] for entry in archive.entries()] == ['https://example.org/a', 'https://example.org/b']
+    assert archive.load(first) == '<html>a</html>'
+
+
+def test_prune_by_age_keeps_latest_copy_of_each_url(tmp_path):
+    archive = HtmlArchive(str(tmp_path))
+    archive.store('https://example.org/a', 'a old', fetched_at=NOW - timedelta(days=100))
+    archive.store('https://example.org/a', 'a new', fetched_at=NOW - timedelta(days=1))
+    archive.store('https://example.org/b', 'b only', fetched_at=NOW - timedelta(days=200))
+    # Written before pruning starts
+    old = os.path.getmtime(archive.index_path) - 10
+    for name in archived_objects(archive):
+        path = archive.path(name[:-len('.html.gz')])
+        os.utime(path, (old, old))
+
+    assert archive.prune(max_age_days=30, now=NOW) == 1
+    latest = archive.latest()
+    assert archive.load(latest['https://example.org/a']['sha256']) == 'a new'
+    assert archive.load(latest['https://example.org/b']['sha256']) == 'b only'
+    assert len(list(archive.entries())) == 2
+    assert len(archived_objects(archive)) == 2
+
+
+def test_prune_by_size_drops_oldest_entries(tmp_path):
+    archive = HtmlArchive(str(tmp_path))
+    for number in range(5):
+        archive.store(f'https://example.org/{number}', os.urandom(2000).hex(),
+                      fetched_at=NOW - timedelta(days=5 - number))
+    old = os.path.getmtime(archive.index_path) - 10
+    for name in archived_objects(archive):
+        os.utime(archive.path(name[:-len('.html.gz')]), (old, old))
+    size = max(os.path.getsize(archive.path(entry['sha256'])) for entry in archive.entries())
+
+    archive.prune(max_bytes=2 * size)
+    assert [entry['url'] for entry in archive.entries()] == ['https://example.org/3', 'https://example.org/4']
+    assert len(archived_objects(archive)) == 2
+
+
+def test_prune_keeps_pages_written_while_pruning(tmp_path):
+    archive = HtmlArchive(str(tmp_path))
+    digest = archive.store('https://example.org/a', 'a', fetched_at=NOW - timedelta(days=100))
+    archive.store('https://example.org/a', 'a newer', fetched_at=NOW)
+    # Stored again by another writer after the prune started, not yet indexed
+    later = time.time() + 60
+    os.utime(archive.path(digest), (later, later))
+    assert archive.prune(max_age_days=30, now=NOW) == 0
+    assert os.path.exists(archive.path(digest))
+
+
+def test_prune_daily_runs_once_a_day(tmp_path):
+    archive = HtmlArchive(str(tmp_path))
+    archive.store('https://example.org/a', 'a', fetched_at=NOW - timedelta(days=100))
+    archive.store('https://example.org/a', 'b', fetched_at=NOW)
+    archive.prune_daily(max_age_days=30)
+    assert os.path.exists(os.path.join(str(tmp_path), '.last_prune'))
+    archive.store('https://example.org/c', 'c', fetched_at=NOW - timedelta(days=100))
+    archive.store('https://example.org/c', 'd', fetched_at=NOW)
+    archive.prune_daily(max_age_days=30)
+    assert len(list(archive.entries())) == 3
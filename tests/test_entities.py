@@ -0,0 +1,43 @@
+from database.models import Category, Post
+from scraper.entities import RecallEntityIndexer, extract_entities, lookup_recalls
+
+
+def entities(text, entity_type):
+    return {normalized for kind, _, normalized in extract_entities(text) if kind == entity_type}
+
+
+def test_mah_after_genitive_keyword():
+    text = "Ανάκληση της εταιρείας ΓΕΡΟΛΥΜΑΤΟΣ Α.Ε. για το προϊόν ZANTAC 150mg"
+    assert entities(text, 'mah') == {'γερολυματος αε'}
+
+
+def test_mah_after_nominative_keyword():
+    text = "Η εταιρεία ΓΕΡΟΛΥΜΑΤΟΣ Α.Ε. ανακαλεί το προϊόν ZANTAC 150mg"
+    assert entities(text, 'mah') == {'γερολυματος αε'}
+
+
+def test_lot_with_slash_is_not_an_expiry_without_date_context():
+    assert entities("Ανάκληση της παρτίδας AB-12/3 και 12/3", 'lot') == {'AB123', '123'}
+
+
+def test_date_after_lot_is_an_expiry_with_date_context():
+    text = "Παρτίδα / Λήξη: 2301234 / 03/2025"
+    assert entities(text, 'lot') == {'2301234'}
+
+
+def test_lookup_by_mah_of_genitive_post(session):
+    category = Category(name='Ανακλήσεις', slug='anakliseis-farmaka', url='https://example.org/c/')
+    session.add(category)
+    session.flush()
+    post = Post(
+        title='Ανάκληση παρτίδας', url='https://example.org/p/1', category=category,
+        content="Ανάκληση της εταιρείας ΓΕΡΟΛΥΜΑΤΟΣ Α.Ε. για την παρτίδα AB-12/3 του προϊόντος ZANTAC 150mg",
+    )
+    session.add(post)
+    session.commit()
+
+    assert RecallEntityIndexer().index_pending(session) == 1
+    session.commit()
+
+    matches = lookup_recalls(session, mah='ΓΕΡΟΛΥΜΑΤΟΣ Α.Ε.', lot='AB-12/3')
+    assert [match['post_id'] for match in matches] == [post.id]
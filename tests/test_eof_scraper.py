@@ -0,0 +1,15 @@
+import pytest
+
+from config.config import SCRAPER_CONFIG
+from database.models import Post
+
+CATEGORY = 'anakliseis-kallintika'
+
+
+@pytest.mark.parametrize('max_pages, expected', [(1, 20), (0, 35)])
+def test_full_scrape_walks_max_pages_per_category(synthetic_server, synthetic_site, make_scraper, session,
+                                                  monkeypatch, max_pages, expected):
+    synthetic_server.site.categories[CATEGORY]['base_count'] = 35
+    monkeypatch.setitem(SCRAPER_CONFIG, 'max_pages_per_category', max_pages)
+    make_scraper(synthetic_site).run_full_scrape(incremental=False, categories=[CATEGORY])
+    assert session.query(Post).count() == expected
@@ -0,0 +1,120 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from config.config import SCRAPER_CONFIG
+from scraper.eof_scraper import EOFScraper
+from scraper.fetcher import HostLimiter
+
+
+def test_host_limiter_caps_requests_in_flight_per_host():
+    limiter = HostLimiter(max_per_host=2, delay=0)
+    in_flight = {'a': 0, 'b': 0}
+    peak = {'a': 0, 'b': 0}
+    lock = threading.Lock()
+
+    def request(host):
+        with limiter.slot(f"http://{host}.example.org/page"):
+            with lock:
+                in_flight[host] += 1
+                peak[host] = max(peak[host], in_flight[host])
+            time.sleep(0.01)
+            with lock:
+                in_flight[host] -= 1
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(request, ['a', 'b'] * 10))
+    assert peak == {'a': 2, 'b': 2}
+
+
+def test_host_limiter_spaces_request_starts_per_host():
+    limiter = HostLimiter(max_per_host=4, delay=0.02)
+    starts = []
+    lock = threading.Lock()
+
+    def request(url):
+        with limiter.slot(url):
+            with lock:
+                starts.append((url, time.monotonic()))
+
+    urls = ['http://a.example.org/'] * 6 + ['http://b.example.org/'] * 6
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        list(executor.map(request, urls))
+    for host in ('http://a.example.org/', 'http://b.example.org/'):
+        times = sorted(start for url, start in starts if url == host)
+        assert times[-1] - times[0] >= 5 * 0.02 * 0.9
+    # Hosts do not wait for each other
+    assert max(start for _, start in starts) - min(start for _, start in starts) < 0.19
+
+
+def test_category_workers_share_the_per_host_limits(synthetic_site, db_manager, monkeypatch):
+    monkeypatch.setitem(SCRAPER_CONFIG, 'max_requests_per_second', 0)
+    monkeypatch.setitem(SCRAPER_CONFIG, 'html_archive_dir', '')
+    starts = []
+    request = requests.Session.request
+
+    def timed_request(session, method, url, *args, **kwargs):
+        starts.append(time.monotonic())
+        return request(session, method, url, *args, **kwargs)
+    monkeypatch.setattr(requests.Session, 'request', timed_request)
+
+    delay = 0.02
+    scraper = EOFScraper(db_manager, request_delay=delay, discovery='crawl')
+    scraper.base_url = synthetic_site
+    assert scraper._category_worker().host_limiter is scraper.host_limiter
+    scraper.run_full_scrape(categories=['farmaka', 'kallintika', 'iatrotexnologika', 'vioktona'], workers=4)
+
+    assert len(starts) > 20
+    # With limits per worker the run would take about a quarter of this
+    assert max(starts) - min(starts) >= (len(starts) - 1) * delay * 0.9
+
+
+def test_listing_and_post_fetches_share_the_host_concurrency(synthetic_site, db_manager, monkeypatch):
+    monkeypatch.setitem(SCRAPER_CONFIG, 'max_requests_per_second', 0)
+    monkeypatch.setitem(SCRAPER_CONFIG, 'html_archive_dir', '')
+    counts = {'in_flight': 0, 'peak': 0, 'requests': 0}
+    lock = threading.Lock()
+    request = requests.Session.request
+
+    def counted_request(session, method, url, *args, **kwargs):
+        with lock:
+            counts['in_flight'] += 1
+            counts['requests'] += 1
+            counts['peak'] = max(counts['peak'], counts['in_flight'])
+        try:
+            time.sleep(0.002)
+            return request(session, method, url, *args, **kwargs)
+        finally:
+            with lock:
+                counts['in_flight'] -= 1
+    monkeypatch.setattr(requests.Session, 'request', counted_request)
+
+    scraper = EOFScraper(db_manager, max_concurrency=2, request_delay=0, discovery='crawl')
+    scraper.base_url = synthetic_site
+    scraper.run_full_scrape(incremental=False, categories=['farmaka', 'kallintika', 'iatrotexnologika', 'vioktona'],
+                            workers=4)
+    assert counts['requests'] > 20
+    assert counts['peak'] == 2
+
+
+def test_attachment_probes_obey_the_per_host_delay(synthetic_site, db_manager, session, monkeypatch):
+    from database.models import Attachment, Post
+    starts = []
+    head = requests.Session.head
+
+    def timed_head(http_session, url, *args, **kwargs):
+        starts.append(time.monotonic())
+        return head(http_session, url, *args, **kwargs)
+    monkeypatch.setattr(requests.Session, 'head', timed_head)
+    for number in range(10):
+        post = Post(title=f'Post {number}', url=f'{synthetic_site}/post-{number}/')
+        session.add(Attachment(post=post, file_url=f'{synthetic_site}/files/{number}.pdf', file_type='pdf'))
+    session.commit()
+
+    delay = 0.02
+    scraper = EOFScraper(db_manager, max_concurrency=4, request_delay=delay)
+    assert scraper.probe_attachments() == 10
+    assert len(starts) == 10
+    assert max(starts) - min(starts) >= 9 * delay * 0.9
@@ -0,0 +1,89 @@
+import threading
+
+import requests
+
+from database.models import HttpValidator
+from scraper.http_cache import MemoryValidatorStore, ValidatorStore
+
+URL = 'https://example.org/category/farmaka/'
+
+
+def response(etag, last_modified='Sat, 01 Jun 2024 10:00:00 GMT'):
+    fresh = requests.Response()
+    fresh.status_code = 200
+    fresh.headers.update({'ETag': etag, 'Last-Modified': last_modified})
+    return fresh
+
+
+def stored(session):
+    session.expire_all()
+    return {row.url: row.etag for row in session.query(HttpValidator)}
+
+
+def test_staged_validators_are_saved_with_the_session(db_manager, session):
+    store = ValidatorStore(db_manager)
+    store.remember(URL, response('"v1"'))
+    store.remember(URL + 'page/2/', response('"p2"'))
+    store.stage(session, [URL])
+    session.commit()
+
+    assert stored(session) == {URL: '"v1"'}
+    assert ValidatorStore(db_manager).request_headers(URL) == {
+        'If-None-Match': '"v1"', 'If-Modified-Since': 'Sat, 01 Jun 2024 10:00:00 GMT'
+    }
+    assert store.request_headers(URL)['If-None-Match'] == '"v1"'
+
+
+def test_staging_updates_stored_validators(db_manager, session):
+    store = ValidatorStore(db_manager)
+    store.remember(URL, response('"v1"'))
+    store.stage(session, [URL])
+    session.commit()
+    store.remember(URL, response('"v2"'))
+    store.stage(session, [URL])
+    session.commit()
+    assert stored(session) == {URL: '"v2"'}
+
+
+def test_staging_a_url_saved_concurrently_by_another_store(db_manager, session):
+    store = ValidatorStore(db_manager)
+    other = ValidatorStore(db_manager)
+    store.remember(URL, response('"v1"'))
+    other.remember(URL, response('"v2"'))
+
+    def stage_other():
+        other_session = db_manager.get_session()
+        try:
+            other.stage(other_session, [URL])
+            other_session.commit()
+        finally:
+            other_session.close()
+
+    # The other store (e.g. the recall watcher) stages the URL while this
+    # session's transaction is still open
+    store.stage(session, [URL])
+    thread = threading.Thread(target=stage_other)
+    thread.start()
+    thread.join(0.5)
+    session.commit()
+    thread.join(10)
+    assert not thread.is_alive()
+    assert stored(session) == {URL: '"v2"'}
+
+
+def test_discarded_validators_are_not_staged(db_manager, session):
+    store = ValidatorStore(db_manager)
+    store.remember(URL, response('"v1"'))
+    store.discard([URL])
+    store.stage(session, [URL])
+    session.commit()
+    assert stored(session) == {}
+
+
+def test_memory_store_is_not_saved(db_manager, session):
+    store = MemoryValidatorStore()
+    store.remember(URL, response('"v1"'))
+    store.stage(session, [URL])
+    session.commit()
+    assert stored(session) == {}
+    assert store.request_headers(URL)['If-None-Match'] == '"v1"'
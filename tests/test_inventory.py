@@ -0,0 +1,92 @@
+import io
+from datetime import datetime
+
+from database.models import Post, RecallEntity, RecallIndexState
+from scraper.entities import normalize_lot, normalize_name
+from scraper.inventory import RecallInventoryIndex, read_inventory
+
+
+def items(text, ndjson=False):
+    return list(read_inventory(io.BytesIO(text.encode('utf-8')), ndjson))
+
+
+def test_csv_with_header():
+    assert items("Κωδικός,Προϊόν,Αρ. Παρτίδας\n1,ZANTAC 150mg,AB-12/3\n2,DEPON,\n") == [
+        (2, 'ZANTAC 150mg', 'AB-12/3'),
+        (3, 'DEPON', None),
+    ]
+
+
+def test_csv_header_with_bom_semicolons_and_lot_only():
+    assert items("﻿code;Batch Number\n1;X99\n") == [(2, None, 'X99')]
+
+
+def test_csv_without_header_takes_product_and_lot_columns():
+    assert items("ZANTAC 150mg\tAB123\nDEPON\n\n") == [(1, 'ZANTAC 150mg', 'AB123'), (2, 'DEPON', None)]
+
+
+def test_csv_with_only_unknown_columns_is_read_as_headerless():
+    assert items("sku,qty\nZANTAC,AB123\n") == [(1, 'sku', 'qty'), (2, 'ZANTAC', 'AB123')]
+
+
+def test_ndjson():
+    text = '\n'.join([
+        '{"Product Name": "ZANTAC 150mg", "lot": "AB-12/3"}',
+        '',
+        'not json',
+        '["a", "list"]',
+        '{"παρτίδα": 4567, "sku": "x"}',
+        '{"sku": "x"}',
+    ])
+    assert items(text, ndjson=True) == [
+        (1, 'ZANTAC 150mg', 'AB-12/3'),
+        (5, None, '4567'),
+        (6, None, None),
+    ]
+
+
+def add_recall(session, number, product=None, lot=None):
+    post = Post(title=f'Ανάκληση {number}', url=f'https://example.org/recall-{number}/',
+                publish_date=datetime(2024, 1, number))
+    session.add(post)
+    session.flush()
+    if product:
+        session.add(RecallEntity(post_id=post.id, entity_type='product', value=product,
+                                 normalized=normalize_name(product)))
+    if lot:
+        session.add(RecallEntity(post_id=post.id, entity_type='lot', value=lot, normalized=normalize_lot(lot)))
+    session.add(RecallIndexState(post_id=post.id))
+    session.commit()
+    return post
+
+
+def match_types(index, product=None, lot=None):
+    return [(match_type, post['url']) for match_type, post in index.match(product, lot)]
+
+
+def test_inventory_items_match_stored_recalls(session):
+    zantac = add_recall(session, 1, product='ZANTAC 150mg', lot='AB-12/3')
+    other_lot = add_recall(session, 2, product='Zantac 150 mg', lot='CD456')
+    index = RecallInventoryIndex.load(session)
+
+    assert match_types(index, 'zantac', 'ab 123') == [('product', other_lot.url), ('lot_and_product', zantac.url)]
+    assert match_types(index, lot='AB123') == [('lot', zantac.url)]
+    assert match_types(index, 'ZANTAC 300mg') == [('product', other_lot.url), ('product', zantac.url)]
+    [(_, post)] = index.match(lot='CD-456')
+    assert post == {'post_id': other_lot.id, 'title': 'Ανάκληση 2', 'url': other_lot.url,
+                    'publish_date': '2024-01-02T00:00:00'}
+
+
+def test_inventory_items_without_recalls_do_not_match(session):
+    add_recall(session, 1, product='ZANTAC 150mg', lot='AB-12/3')
+    index = RecallInventoryIndex.load(session)
+    assert index.match('DEPON', 'XY999') == []
+    assert index.match() == []
+
+
+def test_index_is_rebuilt_after_new_recalls_are_indexed(session):
+    index = RecallInventoryIndex.load(session)
+    assert index.is_current(session)
+    add_recall(session, 1, lot='AB123')
+    assert not index.is_current(session)
+    assert match_types(RecallInventoryIndex.load(session), lot='AB123') == [('lot', 'https://example.org/recall-1/')]
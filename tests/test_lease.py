@@ -0,0 +1,97 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from database.models import ScrapeLease
+from scraper.lease import DatabaseLease, LeaseUnavailable
+
+
+def expire(db_manager, name='scrape'):
+    """Make the lease look like its holder crashed a while ago"""
+    table = ScrapeLease.__table__
+    with db_manager.engine.begin() as conn:
+        conn.execute(update(table).where(table.c.name == name)
+                     .values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+
+
+def stored_holder(session, name='scrape'):
+    session.expire_all()
+    return session.query(ScrapeLease.holder).filter_by(name=name).scalar()
+
+
+def test_only_one_holder_at_a_time(db_manager, session):
+    first = DatabaseLease(db_manager)
+    second = DatabaseLease(db_manager)
+    with first:
+        assert stored_holder(session) == first.holder
+        with pytest.raises(LeaseUnavailable, match=first.holder):
+            second.acquire()
+    assert stored_holder(session) is None
+    with second:
+        assert stored_holder(session) == second.holder
+
+
+def test_leases_are_independent_by_name(db_manager):
+    with DatabaseLease(db_manager, name='scrape'), DatabaseLease(db_manager, name='backfill'):
+        pass
+
+
+def test_lease_is_reentrant(db_manager, session):
+    lease = DatabaseLease(db_manager)
+    with lease:
+        with lease:
+            assert lease.held
+        assert lease.held
+        assert stored_holder(session) == lease.holder
+    assert not lease.held
+    assert stored_holder(session) is None
+    # Releasing an unheld lease is harmless
+    lease.release()
+
+
+def test_expired_lease_is_taken_over(db_manager, session):
+    crashed = DatabaseLease(db_manager, heartbeat=3600)
+    crashed.acquire()
+    expire(db_manager)
+
+    successor = DatabaseLease(db_manager, heartbeat=3600)
+    with successor:
+        assert stored_holder(session) == successor.holder
+        assert not crashed.renew()
+        # The old holder's release must not free the successor's lease
+        crashed.release()
+        assert stored_holder(session) == successor.holder
+        assert successor.renew()
+
+
+def test_heartbeat_renews_the_lease(db_manager, session):
+    with DatabaseLease(db_manager, ttl=300, heartbeat=0.05):
+        session.expire_all()
+        first = session.query(ScrapeLease.expires_at).scalar()
+        time.sleep(0.3)
+        session.expire_all()
+        assert session.query(ScrapeLease.expires_at).scalar() > first
+
+
+def test_lost_lease_is_noticed_by_the_heartbeat(db_manager):
+    lease = DatabaseLease(db_manager, heartbeat=0.05)
+    with lease:
+        lease.check()
+        expire(db_manager)
+        with DatabaseLease(db_manager, heartbeat=3600):
+            deadline = time.monotonic() + 5
+            while not lease.lost and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert lease.lost
+            with pytest.raises(LeaseUnavailable):
+                lease.check()
+
+
+def test_scrape_does_not_start_while_another_run_holds_the_lease(db_manager, make_scraper, session):
+    from database.models import ScrapeLog
+    with DatabaseLease(db_manager):
+        with pytest.raises(LeaseUnavailable):
+            make_scraper('http://127.0.0.1:9').run_full_scrape()
+    assert session.query(ScrapeLog).count() == 0
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from scraper.parsing import LxmlPage, SoupPage
+
+BASE_URL = 'https://www.eof.gr'
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'parsing')
+PAGES = sorted(name for name in os.listdir(FIXTURES) if name.endswith('.html'))
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def both(name):
+    html = load(name)
+    return SoupPage(html, BASE_URL), LxmlPage(html, BASE_URL)
+
+
+@pytest.mark.parametrize('name', PAGES)
+def test_backends_list_the_same_posts(name):
+    soup, lxml = both(name)
+    assert lxml.post_list() == soup.post_list()
+
+
+@pytest.mark.parametrize('name', PAGES)
+def test_backends_find_the_same_pagination(name):
+    soup, lxml = both(name)
+    assert lxml.pagination_urls() == soup.pagination_urls()
+
+
+@pytest.mark.parametrize('name', PAGES)
+def test_backends_extract_the_same_post_content(name):
+    soup, lxml = both(name)
+    assert lxml.post_content() == soup.post_content()
+
+
+@pytest.mark.parametrize('name', PAGES)
+def test_backends_accept_bytes(name):
+    html = load(name).encode('utf-8')
+    assert LxmlPage(html, BASE_URL).post_content() == SoupPage(html, BASE_URL).post_content()
+
+
+def test_listing_fixture_covers_entries_and_pagination():
+    page = LxmlPage(load('listing_articles.html'), BASE_URL)
+    posts = page.post_list()
+    assert [post['url'] for post in posts] == [
+        'https://www.eof.gr/anaklisi-partidas-zantac-150mg/',
+        'https://www.eof.gr/anakoinosi-gia-to-farmako-x/',
+        'https://www.eof.gr/diakopi-kykloforias/',
+        'https://www.eof.gr/epeigousa-anaklisi/?utm=list',
+    ]
+    assert posts[0]['excerpt'].startswith('Ο ΕΟΦ ανακοινώνει')
+    assert posts[1]['title'] == 'Ανακοίνωση για το φάρμακο X'
+    assert posts[3]['publish_date'] is None
+    assert page.pagination_urls() == [
+        'https://www.eof.gr/category/farmaka/anakliseis-farmaka/page/2/',
+        'https://www.eof.gr/category/farmaka/anakliseis-farmaka/page/3/',
+        'https://www.eof.gr/category/farmaka/anakliseis-farmaka/page/10/',
+    ]
+
+
+def test_post_fixture_covers_attachments_and_tags():
+    content = LxmlPage(load('post_attachments.html'), BASE_URL).post_content()
+    assert [attachment['file_type'] for attachment in content['attachments']] == [
+        'pdf', 'pdf', 'pdf', 'docx', 'xlsx', 'doc'
+    ]
+    assert content['attachments'][3]['file_name'] == 'entypo-epistrofis.docx'
+    assert content['tags'] == 'ανακλήσεις,ZANTAC'
+    assert 'document.write' not in content['content']
+    assert 'ΓΕΡΟΛΥΜΑΤΟΣ Α.Ε.' in content['content']
@@ -0,0 +1,90 @@
+from datetime import datetime
+
+from database.models import Attachment, AttachmentText, Post
+from scraper.fetcher import AsyncFetcher
+from scraper.pdf_text import AttachmentTextExtractor
+
+FILE_URL = 'https://example.org/files/recall.pdf'
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeSession:
+    """Answers every download with one status, recording the request headers"""
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append((url, headers))
+        return FakeResponse(self.status_code)
+
+
+def make_attachments(session, count=2, etag='"v2"', file_size=2048):
+    """PDF attachments of ``count`` posts sharing one file, probed with ``etag``"""
+    attachments = []
+    for number in range(count):
+        post = Post(title=f'Ανάκληση {number}', url=f'https://example.org/post-{number}/')
+        attachment = Attachment(post=post, file_url=FILE_URL, file_type='pdf', etag=etag, file_size=file_size,
+                                probe_status=200, probed_at=datetime.utcnow())
+        session.add(attachment)
+        attachments.append(attachment)
+    session.commit()
+    return attachments
+
+
+def store_text(session, attachment, etag='"v1"', file_size=1024, text='Παρτίδα AB123'):
+    session.add(AttachmentText(attachment_id=attachment.id, post_id=attachment.post_id, file_url=FILE_URL,
+                               etag=etag, file_size=file_size, content_sha256='0' * 64, page_count=1, text=text))
+    session.commit()
+
+
+def extract(session, status_code):
+    http_session = FakeSession(status_code)
+    extractor = AttachmentTextExtractor(AsyncFetcher(None, max_per_host=2, delay=0), http_session, workers=1)
+    assert extractor.extract_pending(session) == 0
+    session.commit()
+    return extractor, http_session
+
+
+def test_unchanged_file_takes_the_probed_etag_and_size(session):
+    first, second = make_attachments(session)
+    store_text(session, first)
+
+    extractor, http_session = extract(session, 304)
+    assert http_session.requests == [(FILE_URL, {'If-None-Match': '"v1"'})]
+    texts = {row.attachment_id: row for row in session.query(AttachmentText)}
+    assert {(row.etag, row.file_size, row.text) for row in texts.values()} == {('"v2"', 2048, 'Παρτίδα AB123')}
+    assert texts[second.id].post_id == second.post_id
+    # Nothing left to download on the next run
+    assert extractor.pending(session, 10) == {}
+
+
+def test_gone_file_is_not_downloaded_again(session):
+    first, second = make_attachments(session)
+    store_text(session, first)
+
+    extractor, _ = extract(session, 404)
+    texts = {row.attachment_id: row for row in session.query(AttachmentText)}
+    assert (texts[first.id].text, texts[first.id].error) == ('Παρτίδα AB123', None)
+    assert (texts[second.id].text, texts[second.id].error) == (None, 'HTTP 404')
+    assert extractor.pending(session, 10) == {}
+
+
+def test_gone_file_without_text_gets_an_error(session):
+    make_attachments(session, count=1)
+    extractor, http_session = extract(session, 410)
+    assert http_session.requests == [(FILE_URL, {})]
+    assert session.query(AttachmentText.error).scalar() == 'HTTP 410'
+    assert extractor.pending(session, 10) == {}
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+
+from scraper.pipeline import Stage, StagedPipeline
+
+
+def run_with_timeout(pipeline, source, timeout=10):
+    """Run the pipeline in a thread so a hang fails the test instead of blocking it"""
+    outcome = {}
+
+    def target():
+        try:
+            pipeline.run(source)
+        except Exception as e:
+            outcome['error'] = e
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'pipeline did not finish'
+    if 'error' in outcome:
+        raise outcome['error']
+
+
+def test_every_item_goes_through_every_stage():
+    stored = []
+    lock = threading.Lock()
+
+    def store(item):
+        with lock:
+            stored.append(item)
+    pipeline = StagedPipeline([
+        Stage('double', lambda n: n * 2, workers=4),
+        Stage('increment', lambda n: n + 1, workers=3),
+        Stage('store', store, workers=2),
+    ], queue_size=5)
+    run_with_timeout(pipeline, range(200))
+
+    assert sorted(stored) == [n * 2 + 1 for n in range(200)]
+    stats = {name: stage.as_dict() for name, stage in pipeline.stats.items()}
+    assert [stats[name]['items'] for name in ('discovery', 'double', 'increment', 'store')] == [200] * 4
+    assert stats['double']['workers'] == 4
+
+
+def test_batched_stage_gets_lists_of_waiting_items():
+    batches = []
+
+    def slow(n):
+        time.sleep(0.001)
+        return n
+    pipeline = StagedPipeline([
+        Stage('slow', slow, workers=4),
+        Stage('persist', lambda items: batches.append(list(items)), batch_size=10),
+    ], queue_size=50)
+    run_with_timeout(pipeline, range(95))
+
+    assert sorted(n for batch in batches for n in batch) == list(range(95))
+    assert all(1 <= len(batch) <= 10 for batch in batches)
+    assert pipeline.stats['persist'].items == 95
+
+
+def test_empty_source():
+    stored = []
+    pipeline = StagedPipeline([Stage('store', stored.append, batch_size=5)])
+    run_with_timeout(pipeline, [])
+    assert stored == []
+
+
+def test_stage_error_stops_the_pipeline_and_is_raised():
+    def parse(n):
+        if n == 30:
+            raise ValueError('bad page')
+        return n
+
+    def endless():
+        n = 0
+        while True:
+            yield n
+            n += 1
+    pipeline = StagedPipeline([
+        Stage('fetch', lambda n: n, workers=3),
+        Stage('parse', parse, workers=2),
+        Stage('persist', lambda items: None, batch_size=5),
+    ], queue_size=4)
+    with pytest.raises(ValueError, match='bad page'):
+        run_with_timeout(pipeline, endless())
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith('pipeline-')]
+
+
+def test_source_error_is_raised():
+    def discover():
+        yield from range(10)
+        raise ConnectionError('listing page failed')
+    stored = []
+    pipeline = StagedPipeline([Stage('store', stored.append)], queue_size=2)
+    with pytest.raises(ConnectionError, match='listing page failed'):
+        run_with_timeout(pipeline, discover())
+
+
+def test_pipeline_can_run_again_after_an_error():
+    def fail(n):
+        raise RuntimeError('down')
+    pipeline = StagedPipeline([Stage('store', fail)])
+    with pytest.raises(RuntimeError):
+        run_with_timeout(pipeline, range(3))
+    pipeline.stages = [Stage('store', lambda n: n)]
+    run_with_timeout(pipeline, range(3))
+    assert pipeline.stats['store'].items == 3
+
+
+def test_slow_last_stage_holds_back_the_source():
+    counts = {'produced': 0, 'stored': 0, 'ahead': 0}
+    lock = threading.Lock()
+
+    def discover():
+        for n in range(100):
+            with lock:
+                counts['produced'] += 1
+                counts['ahead'] = max(counts['ahead'], counts['produced'] - counts['stored'])
+            yield n
+
+    def store(n):
+        time.sleep(0.002)
+        with lock:
+            counts['stored'] += 1
+    queue_size = 3
+    pipeline = StagedPipeline([
+        Stage('fetch', lambda n: n, workers=2),
+        Stage('store', store),
+    ], queue_size=queue_size)
+    run_with_timeout(pipeline, discover())
+
+    assert counts['stored'] == 100
+    # Two full queues plus the items held by the source and each worker
+    assert counts['ahead'] <= 2 * queue_size + 4
+    assert all(stats.max_depth <= queue_size for stats in pipeline.stats.values())
+    assert pipeline.stats['store'].as_dict()['max_queue'] == queue_size
+    assert pipeline.stats['fetch'].blocked > 0
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from database.models import Category, Post, PostCategory
+from scraper.polling import AdaptivePollPlanner
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def planner(db_manager):
+    return AdaptivePollPlanner(db_manager, min_interval=timedelta(minutes=5), max_interval=timedelta(hours=6),
+                               fraction=0.01, history=20)
+
+
+def add_posts(session, slug, ages, scraped_only=False):
+    """Posts of a category published ``ages`` before NOW"""
+    category = session.query(Category).filter_by(slug=slug).first()
+    if category is None:
+        category = Category(name=slug, slug=slug, url=f'https://example.org/{slug}/')
+        session.add(category)
+        session.flush()
+    start = session.query(Post).count()
+    for number, age in enumerate(ages, start):
+        post = Post(title=f'Post {number}', url=f'https://example.org/post-{number}/')
+        if scraped_only:
+            post.scraped_at = NOW - age
+        else:
+            post.publish_date = NOW - age
+        session.add(post)
+        session.flush()
+        session.add(PostCategory(post_id=post.id, category_id=category.id))
+    session.commit()
+
+
+def days(count):
+    return [timedelta(days=day) for day in range(1, count + 1)]
+
+
+def test_category_without_history_is_polled_at_the_maximum_interval(planner, session):
+    assert planner.interval(session, 'farmaka', NOW) == timedelta(hours=6)
+
+
+def test_interval_is_a_fraction_of_the_time_between_posts(planner, session):
+    add_posts(session, 'farmaka', days(20))
+    # 20 posts over 20 days: one a day, polled every 1% of a day
+    assert planner.interval(session, 'farmaka', NOW) == timedelta(days=1) * 0.01
+
+    planner.fraction = 0.02
+    assert planner.interval(session, 'farmaka', NOW) == timedelta(days=1) * 0.02
+
+
+def test_interval_grows_while_a_category_stays_quiet(planner, session):
+    add_posts(session, 'farmaka', days(20))
+    later = planner.interval(session, 'farmaka', NOW + timedelta(days=20))
+    assert later == timedelta(days=2) * 0.01
+
+
+def test_interval_is_clamped(planner, session):
+    add_posts(session, 'busy', [timedelta(seconds=second) for second in range(1, 21)])
+    add_posts(session, 'dormant', [timedelta(days=365 + day) for day in range(5)])
+    assert planner.interval(session, 'busy', NOW) == timedelta(minutes=5)
+    assert planner.interval(session, 'dormant', NOW) == timedelta(hours=6)
+
+
+def test_only_the_latest_posts_of_the_category_count(planner, session):
+    add_posts(session, 'farmaka', days(20) + [timedelta(days=400)] * 10)
+    add_posts(session, 'other', [timedelta(minutes=1)] * 20)
+    assert planner.interval(session, 'farmaka', NOW) == timedelta(days=1) * 0.01
+
+
+def test_scraped_time_stands_in_for_a_missing_publish_date(planner, session):
+    add_posts(session, 'farmaka', days(20), scraped_only=True)
+    assert planner.interval(session, 'farmaka', NOW) == timedelta(days=1) * 0.01
+
+
+def test_every_category_is_due_before_its_first_poll(planner):
+    assert planner.due(['farmaka', 'kallintika'], NOW) == ['farmaka', 'kallintika']
+    assert planner.next_poll() is None
+
+
+def test_polled_categories_are_due_again_after_their_interval(planner, session):
+    add_posts(session, 'farmaka', days(20))
+    planner.mark_polled(['farmaka', 'kallintika'], NOW)
+
+    interval = timedelta(days=1) * 0.01
+    assert planner.next_poll() == NOW + interval
+    assert planner.due(['farmaka', 'kallintika', 'vioktona'], NOW) == ['vioktona']
+    assert planner.due(['farmaka', 'kallintika'], NOW + interval) == ['farmaka']
+    assert planner.due(['farmaka', 'kallintika'], NOW + timedelta(hours=6)) == ['farmaka', 'kallintika']
@@ -0,0 +1,216 @@
+from datetime import datetime
+
+import pytest
+import requests
+
+from database.models import FailedFetch, Post, ScrapeLog
+from scraper import retry_queue
+from scraper.retry_queue import (DeferredRetryQueue, clear_failed_posts, entry_from_json, entry_to_json,
+                                 load_failed_posts, save_failed_posts)
+
+CATEGORY = 'anakliseis-kallintika'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(retry_queue.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(retry_queue.time, 'sleep', clock.sleep)
+    return clock
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+def test_backoff_doubles_per_attempt_up_to_the_maximum(clock):
+    queue = DeferredRetryQueue(max_attempts=10, backoff=4, max_backoff=10)
+    waits = []
+    for _ in range(4):
+        assert queue.add('https://example.org/a', 'post', None, requests.ConnectionError())
+        [item] = queue.take()
+        waits.append(clock.slept.pop())
+    assert waits == [4, 8, 10, 10]
+
+
+def test_take_returns_every_item_due_after_the_earliest_wait(clock):
+    queue = DeferredRetryQueue(backoff=4)
+    queue.add('a', 'post', None, requests.ConnectionError())
+    clock.now += 2
+    queue.add('b', 'post', None, requests.ConnectionError())
+    queue.add('c', 'post', None, requests.ConnectionError())
+    queue.add('c', 'post', None, requests.ConnectionError())
+
+    assert [item['key'] for item in queue.take()] == ['a']
+    assert clock.slept == [2]
+    assert [item['key'] for item in queue.take()] == ['b']
+    assert [item['key'] for item in queue.take()] == ['c']
+    assert queue.take() == []
+
+
+def test_items_out_of_attempts_are_exhausted(clock):
+    queue = DeferredRetryQueue(max_attempts=2)
+    assert queue.add('a', 'post', None, requests.ConnectionError(), previous_attempts=3)
+    queue.take()
+    assert not queue.add('a', 'post', None, requests.ConnectionError(), previous_attempts=3)
+    assert len(queue) == 0
+    [item] = queue.exhausted
+    assert (item['attempts'], item['total_attempts'], item['transient']) == (2, 5, True)
+
+
+def test_permanent_errors_are_not_retried(clock):
+    queue = DeferredRetryQueue()
+    assert not queue.add('a', 'post', None, http_error(404))
+    assert queue.add('b', 'post', None, http_error(503))
+    assert [item['key'] for item in queue.exhausted] == ['a']
+    assert not queue.exhausted[0]['transient']
+
+
+def test_entries_survive_json():
+    entry = {'url': 'https://example.org/a', 'title': 'Ανάκληση', 'publish_date': datetime(2024, 3, 1, 10, 30)}
+    assert entry_from_json(entry_to_json(entry)) == entry
+
+
+def test_failed_posts_are_saved_loaded_and_cleared(session, clock):
+    queue = DeferredRetryQueue(max_attempts=1)
+    entry = {'url': 'https://example.org/a', 'title': 'A', 'publish_date': datetime(2024, 1, 1)}
+    queue.add(entry['url'], 'post', (None, entry), requests.ConnectionError('down'))
+    queue.add('https://example.org/gone', 'post', (None, {'url': 'https://example.org/gone'}), http_error(404))
+    assert save_failed_posts(session, queue.exhausted) == 1
+    session.commit()
+
+    [(url, category_id, loaded, attempts)] = load_failed_posts(session)
+    assert (url, category_id, loaded, attempts) == (entry['url'], None, entry, 1)
+
+    # Failing again in the next run adds up the attempts, until the limit
+    queue = DeferredRetryQueue(max_attempts=1)
+    queue.add(url, 'post', (None, entry), requests.ConnectionError('down'), previous_attempts=attempts)
+    assert save_failed_posts(session, queue.exhausted, max_attempts=3) == 1
+    session.commit()
+    assert session.query(FailedFetch.attempts).scalar() == 2
+    queue = DeferredRetryQueue(max_attempts=1)
+    queue.add(url, 'post', (None, entry), requests.ConnectionError('down'), previous_attempts=2)
+    assert save_failed_posts(session, queue.exhausted, max_attempts=3) == 0
+    session.commit()
+    assert session.query(FailedFetch).count() == 0
+
+
+
+def test_cleared_posts_are_not_retried(session, clock):
+    queue = DeferredRetryQueue(max_attempts=1)
+    for url in ('https://example.org/a', 'https://example.org/b'):
+        queue.add(url, 'post', (None, {'url': url}), requests.ConnectionError('down'))
+    assert save_failed_posts(session, queue.exhausted) == 2
+    clear_failed_posts(session, ['https://example.org/a'])
+    session.commit()
+    assert [url for url, _, _, _ in load_failed_posts(session)] == ['https://example.org/b']
+
+
+def failing_fetches(scraper, fail):
+    """Make the scraper's post fetches fail while ``fail(url)`` is true"""
+    fetch = scraper.fetch_page_conditional
+
+    def fetch_page_conditional(url, *args, **kwargs):
+        if fail(url):
+            raise requests.ConnectionError(f"Connection to {url} refused")
+        return fetch(url, *args, **kwargs)
+    scraper.fetch_page_conditional = fetch_page_conditional
+
+
+def test_transient_failures_are_retried_within_the_run(synthetic_site, make_scraper, session):
+    scraper = make_scraper(synthetic_site)
+    attempts = {}
+
+    def fail(url):
+        attempts[url] = attempts.get(url, 0) + 1
+        return '/category/' not in url and attempts[url] == 1
+    failing_fetches(scraper, fail)
+    log_id = scraper.run_full_scrape(incremental=False, categories=[CATEGORY])
+
+    log = session.get(ScrapeLog, log_id)
+    assert log.status == 'success'
+    assert log.posts_new == session.query(Post).count() > 0
+    assert session.query(FailedFetch).count() == 0
+    assert sum(category.retries for category in log.categories) == log.posts_new
+
+
+def test_posts_failing_all_run_are_saved_and_retried_first_next_run(synthetic_site, make_scraper, session):
+    broken = set()
+    scraper = make_scraper(synthetic_site)
+    scraper.run_full_scrape(incremental=False, categories=[CATEGORY])
+    urls = sorted(url for (url,) in session.query(Post.url))
+    broken.update(urls[:2])
+    session.query(Post).filter(Post.url.in_(broken)).delete(synchronize_session=False)
+    session.commit()
+
+    scraper = make_scraper(synthetic_site)
+    failing_fetches(scraper, lambda url: url in broken)
+    scraper.run_full_scrape(incremental=False, categories=[CATEGORY])
+    assert sorted(url for (url,) in session.query(FailedFetch.url)) == sorted(broken)
+
+    # Nothing else to scrape, but the saved posts are retried and stored
+    broken.clear()
+    make_scraper(synthetic_site).run_full_scrape(categories=[])
+    session.expire_all()
+    assert session.query(FailedFetch).count() == 0
+    assert sorted(url for (url,) in session.query(Post.url)) == urls
+
+
+def listing_page(url, number):
+    return url.rstrip('/').endswith(f'/page/{number}')
+
+
+@pytest.mark.parametrize('incremental', [True, False])
+def test_failed_listing_pages_are_retried_within_the_run(synthetic_server, synthetic_site, make_scraper, session,
+                                                         incremental):
+    make_scraper(synthetic_site).run_full_scrape(categories=[CATEGORY])
+    synthetic_server.site.categories[CATEGORY]['base_count'] += 15
+
+    scraper = make_scraper(synthetic_site)
+    attempts = {}
+
+    def fail(url):
+        attempts[url] = attempts.get(url, 0) + 1
+        return listing_page(url, 2) and attempts[url] == 1
+    failing_fetches(scraper, fail)
+    scraper.run_full_scrape(incremental=incremental, categories=[CATEGORY])
+
+    assert any(listing_page(url, 2) for url in attempts)
+    assert session.query(ScrapeLog).order_by(ScrapeLog.id.desc()).first().status == 'success'
+    assert session.query(Post).count() == synthetic_server.site.count(CATEGORY)
+    assert session.query(FailedFetch).count() == 0
+
+
+def test_listing_pages_failing_all_run_are_walked_first_next_run(synthetic_server, synthetic_site, make_scraper,
+                                                                 session):
+    make_scraper(synthetic_site).run_full_scrape(categories=[CATEGORY])
+    synthetic_server.site.categories[CATEGORY]['base_count'] += 15
+
+    scraper = make_scraper(synthetic_site)
+    failing_fetches(scraper, lambda url: listing_page(url, 2))
+    scraper.run_full_scrape(categories=[CATEGORY])
+    assert session.query(ScrapeLog).order_by(ScrapeLog.id.desc()).first().status == 'partial'
+    assert session.query(Post).count() < synthetic_server.site.count(CATEGORY)
+    [failed] = session.query(FailedFetch).all()
+    assert listing_page(failed.url, 2)
+
+    make_scraper(synthetic_site).run_full_scrape(categories=[CATEGORY])
+    session.expire_all()
+    assert session.query(ScrapeLog).order_by(ScrapeLog.id.desc()).first().status == 'success'
+    assert session.query(Post).count() == synthetic_server.site.count(CATEGORY)
+    assert session.query(FailedFetch).count() == 0
@@ -0,0 +1,160 @@
+import threading
+from datetime import datetime
+
+from database.models import Attachment, Category, Post, PostCategory
+from scraper.fingerprint import post_fingerprint
+from scraper.writer import PostBatchWriter, build_post_record, link_post_categories
+
+
+def make_category(session, slug='farmaka', category_type='farmaka'):
+    category = Category(name=slug, slug=slug, url=f'https://example.org/{slug}/', category_type=category_type)
+    session.add(category)
+    session.commit()
+    return category
+
+
+def record(number, content='Κείμενο', attachments=('a.pdf',), title=None):
+    return build_post_record(
+        {
+            'url': f'https://example.org/post-{number}/',
+            'title': title or f'Post {number}',
+            'excerpt': 'Περίληψη',
+            'publish_date': datetime(2024, 1, number % 28 + 1),
+        },
+        {
+            'content': content,
+            'meta_description': '',
+            'tags': '',
+            'attachments': [
+                {'file_url': f'https://example.org/files/{name}', 'file_name': name, 'file_type': name.split('.')[-1]}
+                for name in attachments
+            ],
+        },
+    )
+
+
+def test_new_posts_are_inserted_with_attachments(session):
+    category = make_category(session)
+    results = PostBatchWriter(session, batch_size=2).write([record(n) for n in range(5)], category)
+    session.commit()
+
+    assert set(results.values()) == {'new'}
+    assert session.query(Post).count() == 5
+    assert session.query(Attachment).count() == 5
+    post = session.query(Post).filter_by(url='https://example.org/post-3/').one()
+    assert post.category_id == category.id
+    assert post.content_hash == record(3)['content_hash']
+
+
+def test_unchanged_posts_are_not_written(session):
+    category = make_category(session)
+    PostBatchWriter(session).write([record(1)], category)
+    session.commit()
+    last_modified = session.query(Post.last_modified).scalar()
+
+    results = PostBatchWriter(session).write([record(1)], category)
+    session.commit()
+    assert results == {'https://example.org/post-1/': 'unchanged'}
+    assert session.query(Post.last_modified).scalar() == last_modified
+
+
+def test_changed_post_is_updated_in_place(session):
+    category = make_category(session)
+    other = make_category(session, 'kallintika', 'kallintika')
+    PostBatchWriter(session).write([record(1, attachments=('a.pdf', 'b.pdf'))], category)
+    session.commit()
+    post = session.query(Post).one()
+    post_id, scraped_at = post.id, post.scraped_at
+    kept_id = session.query(Attachment.id).filter(Attachment.file_url.like('%a.pdf')).scalar()
+    # Metadata filled in later by the attachment probe
+    session.query(Attachment).filter_by(id=kept_id).update({'file_size': 1234})
+    session.commit()
+
+    changed = record(1, content='Νέο κείμενο', attachments=('a.pdf', 'c.docx'))
+    results = PostBatchWriter(session).write([changed], other)
+    session.commit()
+    session.expire_all()
+
+    assert results == {'https://example.org/post-1/': 'updated'}
+    post = session.query(Post).one()
+    assert (post.id, post.content, post.content_hash) == (post_id, 'Νέο κείμενο', changed['content_hash'])
+    # The category the post was first found in and its first scrape time are kept
+    assert post.category_id == category.id
+    assert post.scraped_at == scraped_at
+    files = {att.file_url.rsplit('/', 1)[-1]: att for att in session.query(Attachment)}
+    assert sorted(files) == ['a.pdf', 'c.docx']
+    assert files['a.pdf'].id == kept_id
+    assert files['a.pdf'].file_size == 1234
+
+
+def test_last_record_of_a_url_wins(session):
+    category = make_category(session)
+    results = PostBatchWriter(session).write([record(1, content='first'), record(1, content='second')], category)
+    session.commit()
+    assert results == {'https://example.org/post-1/': 'new'}
+    assert session.query(Post.content).scalar() == 'second'
+
+
+def test_missing_fingerprint_is_backfilled(session):
+    category = make_category(session)
+    legacy = record(1)
+    session.add(Post(
+        url=legacy['url'], title=legacy['title'], excerpt=legacy['excerpt'], content=legacy['content'],
+        meta_description='', tags='', category_id=category.id, category_type=category.category_type,
+        attachments=[Attachment(file_url=att['file_url'], file_name=att['file_name'], file_type=att['file_type'])
+                     for att in legacy['attachments']],
+    ))
+    session.commit()
+
+    results = PostBatchWriter(session).write([legacy], category)
+    session.commit()
+    assert results == {legacy['url']: 'unchanged'}
+    assert session.query(Post.content_hash).scalar() == post_fingerprint(
+        legacy['title'], legacy['excerpt'], legacy['content'], '', '', legacy['attachments']
+    )
+
+
+def test_concurrent_writers_upsert_the_same_posts(db_manager):
+    session = db_manager.get_session()
+    category_id = make_category(session).id
+    session.close()
+    errors = []
+
+    def write(version):
+        session = db_manager.get_session()
+        try:
+            category = session.get(Category, category_id)
+            for start in range(0, 20, 5):
+                PostBatchWriter(session).write(
+                    [record(n, content=f'v{version}') for n in range(start, start + 5)], category
+                )
+                session.commit()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=write, args=(version,)) for version in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    session = db_manager.get_session()
+    assert errors == []
+    assert session.query(Post).count() == 20
+    assert session.query(Attachment).count() == 20
+    session.close()
+
+
+def test_link_post_categories_only_adds_missing_links(session):
+    first = make_category(session)
+    second = make_category(session, 'anakliseis-farmaka', 'farmaka')
+    PostBatchWriter(session).write([record(1), record(2)], first)
+    session.commit()
+
+    urls = ['https://example.org/post-1/', 'https://example.org/post-2/', 'https://example.org/unknown/']
+    assert link_post_categories(session, {url: [first.id] for url in urls}) == 2
+    assert link_post_categories(session, {urls[0]: [first.id, second.id]}) == 1
+    session.commit()
+    assert session.query(PostCategory).count() == 3